@@ -15,6 +15,8 @@ if os.path.exists(os.path.join(data_path, 'transactions.csv')):
 
 binaries = []
 hiddenimports = ['PySide6.QtWebEngineWidgets', 'plotly.graph_objects', 'plotly.subplots', 'pandas', 'yfinance', 'numpy', 'plotly']
+# main_app imports the analysis and chart modules lazily (inside functions), so list them explicitly
+hiddenimports += ['analysis_core', 'chart_view', 'downsample', 'figure_names', 'figure_payload', 'holdings', 'price_data', 'price_matrix', 'profiling', 'reference_data', 'snapshots']
 
 # Collect PySide6 and plotly dependencies
 tmp_ret = collect_all('PySide6')
@@ -5,16 +5,28 @@ Refactored for GUI integration - returns data and Plotly figures
 """
 
 import pandas as pd
-import yfinance as yf
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import json
 import os
-from typing import Tuple, Dict, List
+import threading
+from collections.abc import Mapping
+from typing import Callable, Tuple, Dict, List, Union
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from downsample import downsample_figure
+from figure_names import FIGURE_NAMES
+from figure_payload import compact_figure, figure_payload_json
+from holdings import HoldingsCache, PortfolioHoldings
+from price_data import PriceCache, get_price_provider, merge_fetch_status
+from price_matrix import PriceMatrixStore
+from reference_data import ReferencePack
+from profiling import RunProfiler, format_run_stats
+from transactions_store import SQLiteTransactionStore, is_sqlite_ledger
+
 # Note: data directory should already exist with transactions.csv
 # We don't create it here to avoid permission issues when running as executable
 # Output directory for figs can be created on-demand if needed
@@ -28,6 +40,9 @@ V = {
     'Utilities': 'VPU'
 }
 
+# Series every analysis needs whatever the portfolio, kept in the shared reference pack
+REFERENCE_TICKERS = sorted(set(V.values()) | {'^GSPC'})
+
 # Sector name mapping
 sector_map = {
     'Technology': 'Technology',
@@ -60,6 +75,53 @@ SECTOR_COLORS = {
     'Cash': '#ff9896'
 }
 
+# Pipeline stages reported to generate_portfolio_analysis's progress_callback, in order
+ANALYSIS_STAGES = ['download', 'holdings', 'weights', 'stats', 'figures']
+
+
+class AnalysisCancelled(Exception):
+    """Raised by a progress callback to stop generate_portfolio_analysis at a stage checkpoint"""
+
+
+def _entry_marker_trace(returns: pd.Series, entries: List[Tuple]) -> go.Scatter:
+    """
+    Build one marker trace for all entry points on a return series
+    
+    Args:
+        returns: Cumulative return series the markers sit on
+        entries: List of (entry_date, tickers) tuples
+    
+    Returns:
+        A single Scatter trace with per-point labels, or None if nothing can be placed
+    """
+    if not entries or len(returns) == 0:
+        return None
+    
+    # Resolve every entry to its nearest date in the series in one lookup
+    entry_dates = pd.DatetimeIndex([pd.Timestamp(d) for d, _ in entries])
+    positions = returns.index.get_indexer(entry_dates, method='nearest')
+    placed = positions >= 0
+    if not placed.any():
+        return None
+    positions = positions[placed]
+    
+    labels = [', '.join(tickers) if tickers else 'Entry' for (_, tickers), ok in zip(entries, placed) if ok]
+    date_strs = entry_dates[placed].strftime('%Y-%m-%d')
+    
+    return go.Scatter(
+        x=returns.index[positions],
+        y=returns.to_numpy()[positions],
+        mode='markers+text',
+        text=labels,
+        customdata=list(zip(date_strs, labels)),
+        textposition='top center',
+        textfont=dict(size=9, color='#FF0000'),
+        marker=dict(symbol='triangle-up', size=12, color='#FF0000', line=dict(width=2, color='white')),
+        name='Entries',
+        showlegend=False,
+        hovertemplate='Date: %{customdata[0]}<br>Ticker: %{customdata[1]}<br>Return: %{y:.2f}%<extra></extra>'
+    )
+
 
 def generate_comparison_plot(returns_data: Dict, sector: str = None, comparison_type: str = 'ETF_vs_Stocks', period: str = 'General', transaction_dates: Dict = None) -> go.Figure:
     """
@@ -110,14 +172,10 @@ def generate_comparison_plot(returns_data: Dict, sector: str = None, comparison_
         excess_returns = portfolio_returns - benchmark_returns
         final_excess = round(excess_returns.iloc[-1], 2) if len(excess_returns) > 0 else 0
         
-        # Round returns to 2 decimal places
-        benchmark_returns_rounded = benchmark_returns.round(2)
-        portfolio_returns_rounded = portfolio_returns.round(2)
-        
         # Plot benchmark (ETF)
         fig.add_trace(go.Scatter(
             x=benchmark_returns.index,
-            y=benchmark_returns_rounded.values,
+            y=benchmark_returns.to_numpy(),
             name=f'{sector} ETF (Benchmark)',
             line=dict(color='#2E86AB', width=2, dash='dash'),
             mode='lines',
@@ -127,7 +185,7 @@ def generate_comparison_plot(returns_data: Dict, sector: str = None, comparison_
         # Plot portfolio (Sector Aggregate: ETF + stocks)
         fig.add_trace(go.Scatter(
             x=portfolio_returns.index,
-            y=portfolio_returns_rounded.values,
+            y=portfolio_returns.to_numpy(),
             name=f'{sector} Sector Aggregate (Portfolio) | Excess: {final_excess:.2f}%',
             line=dict(color='#F18F01', width=3),
             mode='lines',
@@ -136,41 +194,10 @@ def generate_comparison_plot(returns_data: Dict, sector: str = None, comparison_
         
         # Mark entry points for this sector with ticker labels
         if sector in transaction_dates:
-            entry_date_tickers = transaction_dates[sector]
-            # entry_date_tickers is a dict: {date: [ticker1, ticker2, ...]}
-            for entry_date, tickers in entry_date_tickers.items():
-                # Find nearest date in returns index
-                if period == 'General':
-                    date_series = portfolio_returns.index
-                else:
-                    date_series = portfolio_returns.index
-                
-                # Find closest date
-                try:
-                    date_idx = date_series.get_indexer([pd.Timestamp(entry_date)], method='nearest')[0]
-                    if date_idx >= 0 and date_idx < len(date_series):
-                        entry_idx = date_series[date_idx]
-                        if entry_idx in portfolio_returns.index:
-                            entry_return = portfolio_returns.loc[entry_idx]
-                            # Create ticker label string
-                            ticker_label = ', '.join(tickers) if tickers else 'Entry'
-                            date_str = pd.Timestamp(entry_date).strftime("%Y-%m-%d")
-                            hover_text = f'Date: {date_str}<br>Ticker: {ticker_label}<br>Return: %{{y:.2f}}%'
-                            
-                            fig.add_trace(go.Scatter(
-                                x=[entry_idx],
-                                y=[entry_return],
-                                mode='markers+text',
-                                text=ticker_label,
-                                textposition='top center',
-                                textfont=dict(size=9, color='#FF0000'),
-                                marker=dict(symbol='triangle-up', size=12, color='#FF0000', line=dict(width=2, color='white')),
-                                name=f'Entry: {date_str}',
-                                showlegend=False,
-                                hovertemplate=hover_text + '<extra></extra>'
-                            ))
-                except:
-                    pass
+            # transaction_dates[sector] is a dict: {date: [ticker1, ticker2, ...]}
+            entry_trace = _entry_marker_trace(portfolio_returns, list(transaction_dates[sector].items()))
+            if entry_trace is not None:
+                fig.add_trace(entry_trace)
     
     elif comparison_type == 'Equity_vs_SP500':
         # S&P 500 is the benchmark, Equity portfolio is the portfolio
@@ -187,14 +214,10 @@ def generate_comparison_plot(returns_data: Dict, sector: str = None, comparison_
         excess_returns = portfolio_returns - benchmark_returns
         final_excess = round(excess_returns.iloc[-1], 2) if len(excess_returns) > 0 else 0
         
-        # Round returns to 2 decimal places
-        benchmark_returns_rounded = benchmark_returns.round(2)
-        portfolio_returns_rounded = portfolio_returns.round(2)
-        
         # Plot benchmark (S&P 500)
         fig.add_trace(go.Scatter(
             x=benchmark_returns.index,
-            y=benchmark_returns_rounded.values,
+            y=benchmark_returns.to_numpy(),
             name='S&P 500 (Benchmark)',
             line=dict(color='#d62728', width=2, dash='dash'),
             mode='lines',
@@ -204,7 +227,7 @@ def generate_comparison_plot(returns_data: Dict, sector: str = None, comparison_
         # Plot portfolio (Equity)
         fig.add_trace(go.Scatter(
             x=portfolio_returns.index,
-            y=portfolio_returns_rounded.values,
+            y=portfolio_returns.to_numpy(),
             name=f'Equity Portfolio | Excess: {final_excess:.2f}%',
             line=dict(color='#1f77b4', width=3),
             mode='lines',
@@ -221,32 +244,9 @@ def generate_comparison_plot(returns_data: Dict, sector: str = None, comparison_
         # Sort by date
         all_transactions.sort(key=lambda x: x[0])
         
-        for entry_date, tickers in all_transactions:
-            try:
-                date_idx = portfolio_returns.index.get_indexer([pd.Timestamp(entry_date)], method='nearest')[0]
-                if date_idx >= 0 and date_idx < len(portfolio_returns.index):
-                    entry_idx = portfolio_returns.index[date_idx]
-                    if entry_idx in portfolio_returns.index:
-                        entry_return = portfolio_returns.loc[entry_idx]
-                        # Create ticker label string
-                        ticker_label = ', '.join(tickers) if tickers else 'Entry'
-                        date_str = pd.Timestamp(entry_date).strftime("%Y-%m-%d")
-                        hover_text = f'Date: {date_str}<br>Ticker: {ticker_label}<br>Return: %{{y:.2f}}%'
-                        
-                        fig.add_trace(go.Scatter(
-                            x=[entry_idx],
-                            y=[entry_return],
-                            mode='markers+text',
-                            text=ticker_label,
-                            textposition='top center',
-                            textfont=dict(size=9, color='#FF0000'),
-                            marker=dict(symbol='triangle-up', size=12, color='#FF0000', line=dict(width=2, color='white')),
-                            name=f'Entry: {date_str}',
-                            showlegend=False,
-                            hovertemplate=hover_text + '<extra></extra>'
-                        ))
-            except:
-                pass
+        entry_trace = _entry_marker_trace(portfolio_returns, all_transactions)
+        if entry_trace is not None:
+            fig.add_trace(entry_trace)
     
     fig.update_layout(
         title=title,
@@ -261,17 +261,93 @@ def generate_comparison_plot(returns_data: Dict, sector: str = None, comparison_
     return fig
 
 
-def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv') -> Tuple[str, Dict, pd.DataFrame, pd.DataFrame, Dict]:
+class ComparisonFigureCache:
     """
-    Main analysis function - generates portfolio analysis and returns results
+    Memoizes generate_comparison_plot figures and their JSON for one analysis result
     
-    Returns:
-        report_text (str): Formatted text report
-        figures (dict): Dictionary of Plotly figure objects
-        summary_df (pd.DataFrame): Statistics summary
-        ytd_df (pd.DataFrame): YTD sector breakdown
+    Entries are keyed by (comparison_type, sector, period) and tied to the version of
+    the returns data they were built from; setting new returns data bumps the version
+    and drops every cached figure. Safe to fill from a background thread with prewarm().
+    With max_points set, the cached JSON has its line traces LTTB-downsampled while
+    get() still returns the full-resolution figure.
     """
     
+    PERIODS = ('General', 'YTD')
+    
+    def __init__(self, returns_data: Dict = None, max_points: int = None):
+        self.max_points = max_points
+        self._lock = threading.Lock()
+        self._figures = {}
+        self.version = 0
+        self.returns_data = None
+        self.set_returns_data(returns_data)
+    
+    def set_returns_data(self, returns_data: Dict):
+        """Switch to a new analysis result, invalidating all cached figures"""
+        with self._lock:
+            self.returns_data = returns_data
+            self.version += 1
+            self._figures = {}
+    
+    def clear(self):
+        """Drop the analysis result and all cached figures"""
+        self.set_returns_data(None)
+    
+    @staticmethod
+    def key(comparison_type: str, sector: str, period: str) -> Tuple:
+        # The sector only matters for the ETF vs Stocks comparison
+        return comparison_type, sector if comparison_type == 'ETF_vs_Stocks' else None, period
+    
+    def _entry(self, comparison_type: str, sector: str, period: str, with_json: bool) -> Dict:
+        key = self.key(comparison_type, sector, period)
+        with self._lock:
+            version, returns_data = self.version, self.returns_data
+            entry = self._figures.get(key)
+        if returns_data is None:
+            raise ValueError("No analysis results available")
+        if entry is None:
+            fig = generate_comparison_plot(returns_data, sector=key[1], comparison_type=comparison_type,
+                                           period=period,
+                                           transaction_dates=returns_data.get('transaction_dates', {}))
+            entry = {'figure': fig}
+        if with_json and 'json' not in entry:
+            entry['json'] = figure_payload_json(downsample_figure(entry['figure'], self.max_points))
+        with self._lock:
+            # Don't store figures built from returns data that was replaced meanwhile
+            if version == self.version:
+                self._figures[key] = entry
+        return entry
+    
+    def get(self, comparison_type: str, sector: str, period: str) -> go.Figure:
+        """Return the comparison figure, building it on first use"""
+        return self._entry(comparison_type, sector, period, with_json=False)['figure']
+    
+    def get_json(self, comparison_type: str, sector: str, period: str) -> str:
+        """Return the comparison figure serialized with figure_payload_json() (downsampled to max_points)"""
+        return self._entry(comparison_type, sector, period, with_json=True)['json']
+    
+    def prewarm(self):
+        """Build and serialize every sector x period combination for the current result"""
+        with self._lock:
+            version, returns_data = self.version, self.returns_data
+        if returns_data is None:
+            return
+        selections = [('Equity_vs_SP500', None, period) for period in self.PERIODS]
+        selections += [('ETF_vs_Stocks', sector, period)
+                       for sector in returns_data.get('sector_returns', {}) for period in self.PERIODS]
+        for comparison_type, sector, period in selections:
+            if version != self.version:
+                # A new analysis result arrived - stop warming the old one
+                return
+            self._entry(comparison_type, sector, period, with_json=True)
+
+
+def load_transactions(transactions_file: str = 'data/transactions.csv') -> pd.DataFrame:
+    """
+    Load and validate a transactions CSV or SQLite ledger (.db/.sqlite, see SQLiteTransactionStore)
+    
+    Relative paths are resolved for both development and the PyInstaller executable.
+    """
     # Handle data path for both development and PyInstaller executable
     import sys
     if getattr(sys, 'frozen', False):
@@ -290,7 +366,10 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
     
     # Load data
     try:
-        df = pd.read_csv(transactions_file, parse_dates=['invest_date'])
+        if is_sqlite_ledger(transactions_file):
+            df = SQLiteTransactionStore(transactions_file, create=False).read()
+        else:
+            df = pd.read_csv(transactions_file, parse_dates=['invest_date'])
         if df.empty:
             raise ValueError("Transaction data file is empty")
         required_columns = ['sector', 'ticker', 'invest_date', 'amount_invested']
@@ -302,111 +381,381 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
     except Exception as e:
         raise RuntimeError(f"Error loading transaction data: {str(e)}")
     
-    # Determine start date
-    start_date = df['invest_date'].min()
+    return df
+
+
+def portfolio_tickers(df: pd.DataFrame) -> List[str]:
+    """Tickers needed to analyze a portfolio: its own tickers (not the Cash rows), the sector ETFs and ^GSPC"""
+    priced = df[(df['sector'] != 'Cash') & (df['ticker'] != 'CASH')]
+    return list(set(priced['ticker'].tolist()) | set(V.values()) | {'^GSPC'})
+
+
+def price_start_dates(df: pd.DataFrame, buffer_days: int = 10) -> Dict[str, pd.Timestamp]:
+    """
+    First date each of a portfolio's tickers needs prices from (see portfolio_tickers)
+    
+    The sector ETFs and ^GSPC are benchmarks over the whole analysis period, so they
+    start at the portfolio's first transaction. Every other ticker only has units
+    (and value) from its own first transaction. The buffer leaves room for the
+    nearest trading day of a transaction that falls on a holiday or weekend.
+    """
+    buffer = pd.Timedelta(days=buffer_days)
+    portfolio_start = df['invest_date'].min() - buffer
+    first_dates = (df.groupby('ticker')['invest_date'].min() - buffer).to_dict()
+    starts = {ticker: first_dates.get(ticker, portfolio_start) for ticker in portfolio_tickers(df)}
+    for ticker in set(V.values()) | {'^GSPC'}:
+        starts[ticker] = portfolio_start
+    return starts
+
+
+def price_requests(tickers: List[str], start_date, end_date) -> Dict[Tuple, List[str]]:
+    """{(start, end): tickers} requests for load_prices' start_date (a date or {ticker: date})"""
+    if not isinstance(start_date, dict):
+        return {(pd.Timestamp(start_date), pd.Timestamp(end_date)): list(tickers)}
+    # One request per distinct start date, all fetched together
+    requests = {}
+    for ticker in tickers:
+        requests.setdefault((pd.Timestamp(start_date[ticker]), pd.Timestamp(end_date)), []).append(ticker)
+    return requests
+
+
+def resolve_price_provider(use_cache: bool = True, cache_dir: str = None, price_provider=None):
+    """The provider load_prices reads from: price_provider, wrapped in a PriceCache if enabled"""
+    provider = get_price_provider(price_provider)
+    if use_cache and provider.cacheable:
+        try:
+            provider = PriceCache(provider, cache_dir)
+        except OSError:
+            # Cache directory not writable - fall back to a direct download
+            pass
+    return provider
+
+
+def price_matrix_store(provider) -> PriceMatrixStore:
+    """Price matrix kept next to a PriceCache's files, or None for uncached providers"""
+    if not isinstance(provider, PriceCache):
+        return None
+    try:
+        return PriceMatrixStore(os.path.join(provider.cache_dir, 'matrix'))
+    except OSError:
+        return None
+
+
+def reference_pack(provider) -> ReferencePack:
+    """Reference pack kept next to a PriceCache's files, or None for uncached providers"""
+    if not isinstance(provider, PriceCache):
+        return None
+    try:
+        return ReferencePack(REFERENCE_TICKERS, os.path.join(provider.cache_dir, 'reference'))
+    except OSError:
+        return None
+
+
+def price_data_version(use_cache: bool = True, cache_dir: str = None, price_provider=None) -> str:
+    """Version of the price data an analysis with these settings would use (see PriceProvider.data_version)"""
+    return resolve_price_provider(use_cache, cache_dir, price_provider).data_version()
+
+
+def cached_prices_stale(transactions_file: Union[str, pd.DataFrame], end_date=None, use_cache: bool = True,
+                        cache_dir: str = None, price_provider=None) -> bool:
+    """
+    Whether a portfolio's prices are cached but would still need a download to be current
+    
+    This is when an analysis with cached_prices_only=True is worth showing while the
+    prices are refreshed: the cache holds prices for some of its tickers, and a
+    normal run would download missing ranges (typically the days since the last run).
+    
+    Args:
+        transactions_file: Path to the transactions ledger, or the transactions already
+            loaded from it (see load_transactions)
+    """
+    provider = resolve_price_provider(use_cache, cache_dir, price_provider)
+    if not isinstance(provider, PriceCache):
+        return False
+    if end_date is None:
+        end_date = pd.Timestamp.now().normalize()
+    if isinstance(transactions_file, pd.DataFrame):
+        df = transactions_file
+    else:
+        df = load_transactions(transactions_file)
+    tickers = portfolio_tickers(df)
+    if not any(provider.coverage(ticker) is not None for ticker in tickers):
+        return False
+    return bool(provider.missing_requests(price_requests(tickers, price_start_dates(df), end_date)))
+
+
+def load_prices(tickers: List[str], start_date, end_date=None, use_cache: bool = True,
+                cache_dir: str = None, price_provider=None, return_status: bool = False,
+                cached_only: bool = False):
+    """
+    Fetch Adj Close prices on a business-day calendar, forward filled
     
-    # Use present day as end date
-    end_date = pd.Timestamp.now().normalize()
+    Tickers that could not be fetched are missing from the frame; only a fetch
+    that returns no prices at all raises.
     
-    # Download prices
-    all_tickers = list(set(df['ticker'].tolist()) | set(V.values()) | {'^GSPC'})
+    Args:
+        tickers: Tickers to fetch
+        start_date: First date to fetch, or {ticker: first date} to fetch each ticker from
+            its own date (see price_start_dates)
+        end_date: Last date to fetch, exclusive (defaults to today)
+        use_cache: Reuse locally cached prices and only download missing date ranges;
+            the sector ETFs and ^GSPC come from the shared reference pack (see reference_pack)
+            and repeated requests are answered from the price matrix (see price_matrix_store)
+        cache_dir: Price cache directory (defaults to price_data.DEFAULT_CACHE_DIR)
+        price_provider: PriceProvider instance, 'yfinance' (default) or a path to
+            a CSV/Parquet price fixture file or directory
+        return_status: Also return the per-ticker fetch status (see PriceProvider.last_status)
+        cached_only: Only use prices already in the price cache, without downloading; tickers
+            with nothing cached are reported as failed (see PriceCache.fetch_cached)
+    
+    Returns:
+        px, or (px, status) with return_status
+    """
+    if end_date is None:
+        # Use present day as end date
+        end_date = pd.Timestamp.now().normalize()
+    
+    provider = resolve_price_provider(use_cache, cache_dir, price_provider)
+    requests = price_requests(tickers, start_date, end_date)
+    matrix = price_matrix_store(provider)
+    pack = reference_pack(provider)
     try:
-        px = yf.download(all_tickers, start=start_date - pd.Timedelta(days=10), end=end_date,
-                         progress=False, auto_adjust=False)['Adj Close'].asfreq('B').ffill()
+        if cached_only and matrix is None:
+            raise ValueError("Cached prices need the price cache (use_cache=True)")
+        frames, status = [], {}
+        
+        # Reference series come from the shared pack (rebuilt at most once a day); only
+        # what it does not hold goes to the matrix and the provider
+        if pack is not None:
+            try:
+                reference_px, status = pack.read(requests, provider, refresh=not cached_only)
+            except OSError:
+                # Pack directory not writable - fetch the reference series with the others
+                reference_px, status = pd.DataFrame(), {}
+            if not reference_px.columns.empty:
+                frames.append(reference_px)
+            requests = {rng: [ticker for ticker in range_tickers if ticker not in reference_px.columns]
+                        for rng, range_tickers in requests.items()}
+            requests = {rng: range_tickers for rng, range_tickers in requests.items() if range_tickers}
+        
+        if requests:
+            # The matrix of the previous load answers repeated requests without touching the cache
+            # files; tickers recorded as failed are never in it, so they do not count against it
+            failures = provider.known_failures(requests) if matrix is not None else {}
+            matrix_requests = {rng: [ticker for ticker in range_tickers if ticker not in failures]
+                               for rng, range_tickers in requests.items()}
+            matrix_requests = {rng: range_tickers for rng, range_tickers in matrix_requests.items() if range_tickers}
+            px = None
+            if matrix is not None and matrix_requests:
+                px = matrix.read(matrix_requests, provider.data_version())
+            if px is not None:
+                merge_fetch_status(status, {ticker: {'status': 'cached'} for ticker in px.columns})
+                merge_fetch_status(status, failures)
+            else:
+                fetched = provider.fetch_cached(requests) if cached_only else provider.fetch_ranges(requests)
+                fetched_frames = [frame for frame in fetched.values() if not frame.columns.empty]
+                px = pd.concat(fetched_frames, axis=1).sort_index() if fetched_frames else pd.DataFrame()
+                px = px.reindex(columns=sorted(px.columns)).asfreq('B') if fetched_frames else px
+                merge_fetch_status(status, provider.last_status)
+                # Cached-only loads may stop short of the requested ranges, so they are not recorded
+                if matrix is not None and not cached_only and not px.empty:
+                    ranges = {ticker: rng for rng, range_tickers in requests.items() for ticker in range_tickers}
+                    try:
+                        matrix.write(px, ranges, provider.data_version())
+                    except OSError:
+                        pass
+            if not px.columns.empty:
+                frames.append(px)
+        
+        if not frames:
+            raise ValueError("No price data downloaded")
+        px = pd.concat(frames, axis=1).sort_index()
+        px = px.reindex(columns=sorted(px.columns)).asfreq('B').ffill()
         if px.empty:
             raise ValueError("No price data downloaded")
     except Exception as e:
         raise RuntimeError(f"Error downloading price data: {str(e)}")
+    if return_status:
+        return px, status
+    return px
+
+
+def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv', use_cache: bool = True,
+                                cache_dir: str = None, price_provider=None,
+                                progress_callback: Callable[[str], None] = None, profile: bool = None,
+                                trace_memory: bool = None, lazy_figures: bool = False,
+                                holdings_cache: HoldingsCache = None,
+                                cached_prices_only: bool = False,
+                                transactions: pd.DataFrame = None) -> Tuple[str, Dict, pd.DataFrame, pd.DataFrame, Dict]:
+    """
+    Main analysis function - generates portfolio analysis and returns results
     
-    # Find the nearest trading day
-    start_idx = px.index.get_indexer([pd.Timestamp(start_date)], method='nearest')[0]
-    actual_start = px.index[start_idx]
-    px = px.loc[actual_start:]
-    
-    # Initialize units
-    units = pd.DataFrame(0.0, index=px.index, columns=px.columns)
-    
-    # Track transaction dates with ticker info by sector (for stock entries only, not ETFs)
-    # Structure: {sector: {date: [ticker1, ticker2, ...]}}
-    transaction_dates_by_sector = {}
+    Args:
+        transactions_file: Path to the transactions CSV
+        use_cache: Reuse locally cached prices and only download missing date ranges
+        cache_dir: Price cache directory (defaults to price_data.DEFAULT_CACHE_DIR)
+        price_provider: PriceProvider instance, 'yfinance' (default) or a path to
+            a CSV/Parquet price fixture file or directory
+        progress_callback: Called with each stage name in ANALYSIS_STAGES as it starts;
+            it may raise AnalysisCancelled to stop the analysis at that checkpoint
+        profile: Capture a cProfile summary of the run (default: SMIC_PROFILE env var)
+        trace_memory: Record peak traced memory per stage (default: SMIC_TRACE_MEMORY env var)
+        lazy_figures: Build each figure on first access instead of up front (see LazyFigures)
+        holdings_cache: Reuse the previous run's holdings when transactions were only appended
+            (see analyze_portfolio)
+        cached_prices_only: Analyze with the cached prices only, without downloading
+            (see cached_prices_stale); the report then starts with the date they run to
+        transactions: Transactions already loaded from transactions_file, to skip loading them again
     
-    # Process each position
-    df_sorted = df.sort_values('invest_date')
-    for _, row in df_sorted.iterrows():
-        try:
-            dt_idx = px.index.get_indexer([pd.Timestamp(row['invest_date'])], method='nearest')[0]
-            dt = px.index[dt_idx]
-        except:
-            dt = px.index[px.index.get_loc(pd.Timestamp(row['invest_date']), method='nearest')]
+    Returns:
+        report_text (str): Formatted text report
+        figures (dict): Dictionary of Plotly figure objects
+        summary_df (pd.DataFrame): Statistics summary
+        ytd_df (pd.DataFrame): YTD sector breakdown
+        returns_data (dict): Return time series and transaction dates for the comparison charts,
+            plus the stage timing record under 'run_stats', the per-ticker price fetch
+            status under 'price_status' and the last price date (YYYY-MM-DD) under 'prices_as_of'
+    """
+    profiler = RunProfiler(profile=profile, trace_memory=trace_memory).start()
+    try:
+        profiler.stage('load')
+        df = transactions if transactions is not None else load_transactions(transactions_file)
         
-        ticker = row['ticker']
-        sector = row['sector']
-        usd = row['amount_invested']
-        shares = row.get('shares', 0)
+        # Download prices
+        profiler.stage('download')
+        if progress_callback is not None:
+            progress_callback('download')
+        # Each ticker is only fetched from the first date the analysis needs it
+        tickers = portfolio_tickers(df)
+        px, price_status = load_prices(tickers, price_start_dates(df),
+                                       use_cache=use_cache, cache_dir=cache_dir, price_provider=price_provider,
+                                       return_status=True, cached_only=cached_prices_only)
         
-        # Skip cash - handled separately
-        if sector == 'Cash' or ticker == 'CASH':
-            continue
-            
-        if pd.isna(usd) or usd <= 0:
-            continue
+        report_text, figures, summary_df, ytd_df, returns_data = analyze_portfolio(
+            df, px, progress_callback=progress_callback, profiler=profiler,
+            lazy_figures=lazy_figures, holdings_cache=holdings_cache)
         
-        if ticker not in px.columns:
-            continue
+        # Tickers without any prices (not even cached ones) are left out of the analysis
+        excluded = sorted(set(tickers) - set(px.columns))
+        if excluded:
+            report_text += f"\n\nPrices unavailable (excluded): {', '.join(excluded)}"
+        prices_as_of = px.index[-1].strftime('%Y-%m-%d')
+        if cached_prices_only:
+            report_text = f"Prices as of {prices_as_of} (cached, not refreshed)\n\n" + report_text
+        returns_data['price_status'] = price_status
+        returns_data['prices_as_of'] = prices_as_of
+        return report_text, figures, summary_df, ytd_df, returns_data
+    finally:
+        profiler.finish()
 
-        # Initial ETFs or Fixed Income
-        if ticker in V.values() or sector == 'Fixed_Income':
-            if shares > 0:
-                units.loc[dt:, ticker] += shares
-            else:
-                units.loc[dt:, ticker] += usd / px.loc[dt, ticker]
 
-        # Stock purchase = swap from ETF
-        else:
-            sector_key = sector_map.get(sector)
-            if not sector_key:
-                sec_clean = sector.replace('_', ' ')
-                if sec_clean in V:
-                    sector_key = sec_clean
-                else:
-                    first = sector.split('_')[0]
-                    for v_key in V.keys():
-                        if v_key.startswith(first):
-                            sector_key = v_key
-                            break
-            
-            if sector_key and sector_key in V:
-                etf = V[sector_key]
-                if etf in px.columns:
-                    etf_price = px.loc[dt, etf]
-                    
-                    # Track transaction date and ticker for this stock entry
-                    invest_date = pd.Timestamp(row['invest_date']).normalize()
-                    if sector_key not in transaction_dates_by_sector:
-                        transaction_dates_by_sector[sector_key] = {}
-                    if invest_date not in transaction_dates_by_sector[sector_key]:
-                        transaction_dates_by_sector[sector_key][invest_date] = []
-                    transaction_dates_by_sector[sector_key][invest_date].append(ticker)
-                    
-                    # Buy stock
-                    if shares > 0:
-                        units.loc[dt:, ticker] += shares
-                    else:
-                        stock_price = px.loc[dt, ticker]
-                        if not (pd.isna(stock_price) or stock_price <= 0):
-                            units.loc[dt:, ticker] += usd / stock_price
-                        else:
-                            continue
-                    
-                    # Sell ETF
-                    if not (pd.isna(etf_price) or etf_price <= 0):
-                        units.loc[dt:, etf] -= usd / etf_price
-
-    units = units.ffill().fillna(0)
+def generate_batch_analysis(transactions_files: List[str], use_cache: bool = True, cache_dir: str = None,
+                            price_provider=None, build_figures: bool = False) -> Tuple[Dict[str, Tuple], Dict[str, str]]:
+    """
+    Analyze many portfolios against one shared price frame
+    
+    The union of all portfolios' tickers is fetched once, each ticker from the
+    earliest date any portfolio needs it, and each portfolio is evaluated on its
+    own columns of that frame.
+    
+    Args:
+        transactions_files: Paths to transactions CSVs, one per portfolio
+        use_cache, cache_dir, price_provider: As for generate_portfolio_analysis
+        build_figures: Also build the Plotly figures for every portfolio
+    
+    Returns:
+        results (dict): transactions file -> generate_portfolio_analysis result tuple, with the
+            price status of the portfolio's own tickers
+        errors (dict): transactions file -> error message for portfolios that failed
+    """
+    ledgers = {}
+    errors = {}
+    for transactions_file in transactions_files:
+        try:
+            ledgers[transactions_file] = load_transactions(transactions_file)
+        except Exception as e:
+            errors[transactions_file] = str(e)
+    if not ledgers:
+        return {}, errors
+    
+    tickers_by_file = {path: portfolio_tickers(df) for path, df in ledgers.items()}
+    all_tickers = sorted(set().union(*tickers_by_file.values()))
+    start_dates = {}
+    for df in ledgers.values():
+        for ticker, start in price_start_dates(df).items():
+            start_dates[ticker] = min(start_dates.get(ticker, start), start)
+    px, price_status = load_prices(all_tickers, start_dates, use_cache=use_cache, cache_dir=cache_dir,
+                                   price_provider=price_provider, return_status=True)
+    prices_as_of = px.index[-1].strftime('%Y-%m-%d')
+    
+    results = {}
+    for path, df in ledgers.items():
+        try:
+            tickers = set(tickers_by_file[path])
+            columns = [t for t in px.columns if t in tickers]
+            report_text, figures, summary_df, ytd_df, returns_data = analyze_portfolio(
+                df, px[columns], build_figures=build_figures)
+            # Same exclusion note and price status as a single run, for this portfolio's tickers
+            excluded = sorted(tickers - set(px.columns))
+            if excluded:
+                report_text += f"\n\nPrices unavailable (excluded): {', '.join(excluded)}"
+            returns_data['price_status'] = {t: s for t, s in price_status.items() if t in tickers}
+            returns_data['prices_as_of'] = prices_as_of
+            results[path] = (report_text, figures, summary_df, ytd_df, returns_data)
+        except Exception as e:
+            errors[path] = str(e)
+    return results, errors
+
+
+def analyze_portfolio(df: pd.DataFrame, px: pd.DataFrame, progress_callback: Callable[[str], None] = None,
+                      build_figures: bool = True, profiler: RunProfiler = None,
+                      lazy_figures: bool = False,
+                      holdings_cache: HoldingsCache = None) -> Tuple[str, Dict, pd.DataFrame, pd.DataFrame, Dict]:
+    """
+    Analyze a loaded transaction log against a price frame
+    
+    Args:
+        df: Transactions as returned by load_transactions
+        px: Business-day prices covering the portfolio's tickers from its first transaction
+        progress_callback: Called with each stage name after 'download' as it starts
+        build_figures: Build the Plotly figures (an empty dict is returned otherwise)
+        profiler: RunProfiler to record stage timings in (a timer-only one is created if None)
+        lazy_figures: Return the figures as a LazyFigures mapping built on first access
+        holdings_cache: HoldingsCache holding the previous run's holdings; if df only adds
+            rows to that run's transactions and px only adds trading days to its prices,
+            holdings are updated from the first new date instead of rebuilt
+    
+    Returns:
+        Same tuple as generate_portfolio_analysis
+    """
+    if profiler is None:
+        profiler = RunProfiler(profile=False, trace_memory=False).start()
+    
+    def report_stage(stage: str):
+        profiler.stage(stage)
+        if progress_callback is not None:
+            progress_callback(stage)
+    
+    start_date = df['invest_date'].min()
+    
+    # Find the nearest trading day
+    start_idx = px.index.get_indexer([pd.Timestamp(start_date)], method='nearest')[0]
+    actual_start = px.index[start_idx]
+    px = px.loc[actual_start:]
+    
+    # Build daily units held from the transaction log, and the market value of every
+    # ETF sleeve, stock sleeve and Fixed Income (updated incrementally when possible)
+    report_stage('holdings')
+    if holdings_cache is not None:
+        holdings = holdings_cache.get(df, px, V, sector_map)
+    else:
+        holdings = PortfolioHoldings.build(df, px, V, sector_map)
+    group_values = holdings.group_values
+    transaction_dates_by_sector = holdings.transaction_dates
     
     # Add cash to portfolio value
     cash_val = df[df['sector'] == 'Cash']['amount_invested'].sum()
-    invested_value = (units * px).sum(axis=1)
+    invested_value = holdings.invested_value
     portfolio_value = invested_value + cash_val
     
     if (portfolio_value <= 0).any():
@@ -422,24 +771,16 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
     benchmark_cumulative_return = (benchmark_value / initial_value - 1) * 100
     
     # Calculate sector weights
+    report_stage('weights')
     weights = pd.DataFrame(index=px.index)
     
     for sector_name, v_key in sector_map.items():
         if v_key in V:
-            etf = V[v_key]
-            tickers = df[df['sector'] == sector_name]['ticker'].tolist()
-            sector_value = units[etf] * px[etf]
-            for t in tickers:
-                if t in units.columns and t in px.columns and t != etf:
-                    sector_value += units[t] * px[t]
+            sector_value = group_values[f'{sector_name}_ETF'] + group_values[f'{sector_name}_Stocks']
             weights[sector_name] = (sector_value / portfolio_value * 100).fillna(0)
     
     # Fixed Income
-    fi_tickers = df[df['sector'] == 'Fixed_Income']['ticker'].tolist()
-    fi_value = pd.Series(0.0, index=px.index)
-    for t in fi_tickers:
-        if t in units.columns and t in px.columns:
-            fi_value += units[t] * px[t]
+    fi_value = group_values['Fixed Income']
     weights['Fixed Income'] = (fi_value / portfolio_value * 100).fillna(0)
     
     # Cash
@@ -461,6 +802,7 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
         weights = weights.div(weights.sum(axis=1), axis=0) * 100
     
     # Calculate statistics
+    report_stage('stats')
     initial = portfolio_value.iloc[0]
     final = portfolio_value.iloc[-1]
     benchmark_initial = benchmark_value.iloc[0]
@@ -475,10 +817,6 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
     cagr = ((final / initial) ** (1 / years) - 1) * 100
     benchmark_cagr = ((benchmark_final / benchmark_initial) ** (1 / years) - 1) * 100
     
-    initial_weights = pd.Series(index=weights.columns)
-    for sec in weights.columns:
-        initial_weights[sec] = weights[sec].iloc[0]
-    
     absolute_change = final - initial
     benchmark_absolute_change = benchmark_final - benchmark_initial
     
@@ -493,13 +831,8 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
     
     for sector_name, v_key in sector_map.items():
         if v_key in V:
-            etf = V[v_key]
-            etf_value = units[etf] * px[etf] if etf in units.columns and etf in px.columns else pd.Series(0.0, index=px.index)
-            tickers = df[df['sector'] == sector_name]['ticker'].tolist()
-            stocks_value = pd.Series(0.0, index=px.index)
-            for t in tickers:
-                if t in units.columns and t in px.columns and t != etf:
-                    stocks_value += units[t] * px[t]
+            etf_value = group_values[f'{sector_name}_ETF']
+            stocks_value = group_values[f'{sector_name}_Stocks']
             etf_weight = (etf_value / portfolio_value * 100).fillna(0)
             stocks_weight = (stocks_value / portfolio_value * 100).fillna(0)
             sector_etf_stocks[f'{sector_name}_ETF'] = etf_weight
@@ -604,12 +937,8 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
                     etf_benchmark_returns = pd.Series(0.0, index=px.index)
                 
                 # Sector aggregate portfolio: ETF holdings + individual stocks combined
-                etf_value = units[etf] * px[etf] if etf in units.columns else pd.Series(0.0, index=px.index)
-                tickers = df[df['sector'] == sector_name]['ticker'].tolist()
-                stocks_value = pd.Series(0.0, index=px.index)
-                for t in tickers:
-                    if t in units.columns and t in px.columns and t != etf:
-                        stocks_value += units[t] * px[t]
+                etf_value = group_values[f'{sector_name}_ETF']
+                stocks_value = group_values[f'{sector_name}_Stocks']
                 
                 # Total sector value (ETF + stocks)
                 sector_aggregate_value = etf_value + stocks_value
@@ -716,16 +1045,26 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
     }
     
     # Create Plotly figures
-    figures = {}
+    if build_figures:
+        report_stage('figures')
+        figures = build_analysis_figures(weights, sector_etf_stocks, ytd_df, portfolio_value, benchmark_value,
+                                         portfolio_cumulative_return, benchmark_cumulative_return,
+                                         lazy=lazy_figures)
+    else:
+        figures = {}
     
-    # 1. Sector Allocation (Stacked Area Chart)
+    returns_data['run_stats'] = profiler.finish().record()
+    
+    return report_text, figures, summary_df, ytd_df, returns_data
+
+
+def _sector_allocation_figure(weights: pd.DataFrame, **_) -> go.Figure:
+    """Sector Allocation (stacked area chart)"""
     fig_sector = go.Figure()
     for col in weights.columns:
-        # Round weights to 2 decimal places
-        rounded_weights = weights[col].round(2)
         fig_sector.add_trace(go.Scatter(
             x=weights.index,
-            y=rounded_weights,
+            y=weights[col].to_numpy(),
             name=col,
             stackgroup='one',
             fillcolor=SECTOR_COLORS.get(col, '#808080'),
@@ -742,9 +1081,13 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
         showlegend=True,
         yaxis=dict(tickformat='.2f')
     )
-    figures['sector_allocation'] = fig_sector
-    
-    # 2. Portfolio Value and Cumulative Returns
+    return fig_sector
+
+
+def _performance_figure(portfolio_value: pd.Series, benchmark_value: pd.Series,
+                        portfolio_cumulative_return: pd.Series, benchmark_cumulative_return: pd.Series,
+                        **_) -> go.Figure:
+    """Portfolio Value and Cumulative Returns against the S&P 500"""
     fig_performance = make_subplots(
         rows=2, cols=1,
         subplot_titles=('Portfolio Value', 'Cumulative Returns'),
@@ -752,20 +1095,15 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
         shared_xaxes=True
     )
     
-    # Portfolio Value - round to 2 decimal places
-    portfolio_value_rounded = portfolio_value.round(2)
-    benchmark_value_rounded = benchmark_value.round(2)
-    portfolio_cumulative_return_rounded = portfolio_cumulative_return.round(2)
-    benchmark_cumulative_return_rounded = benchmark_cumulative_return.round(2)
-    
+    # Portfolio Value (2-decimal display comes from the hovertemplates and tick formats)
     fig_performance.add_trace(
-        go.Scatter(x=portfolio_value.index, y=portfolio_value_rounded.values, name='SMIC Portfolio',
+        go.Scatter(x=portfolio_value.index, y=portfolio_value.to_numpy(), name='SMIC Portfolio',
                   line=dict(color='#1f77b4', width=3),
                   hovertemplate='$%{y:,.2f}<extra></extra>'),
         row=1, col=1
     )
     fig_performance.add_trace(
-        go.Scatter(x=benchmark_value.index, y=benchmark_value_rounded.values, name='S&P 500',
+        go.Scatter(x=benchmark_value.index, y=benchmark_value.to_numpy(), name='S&P 500',
                   line=dict(color='#d62728', width=3, dash='dash'),
                   hovertemplate='$%{y:,.2f}<extra></extra>'),
         row=1, col=1
@@ -773,13 +1111,13 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
     
     # Cumulative Returns
     fig_performance.add_trace(
-        go.Scatter(x=portfolio_cumulative_return.index, y=portfolio_cumulative_return_rounded.values,
+        go.Scatter(x=portfolio_cumulative_return.index, y=portfolio_cumulative_return.to_numpy(),
                   name='SMIC Portfolio', line=dict(color='#1f77b4', width=3),
                   hovertemplate='%{y:.2f}%<extra></extra>'),
         row=2, col=1
     )
     fig_performance.add_trace(
-        go.Scatter(x=benchmark_cumulative_return.index, y=benchmark_cumulative_return_rounded.values,
+        go.Scatter(x=benchmark_cumulative_return.index, y=benchmark_cumulative_return.to_numpy(),
                   name='S&P 500', line=dict(color='#d62728', width=3, dash='dash'),
                   hovertemplate='%{y:.2f}%<extra></extra>'),
         row=2, col=1
@@ -789,9 +1127,11 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
     fig_performance.update_yaxes(title_text="USD", row=1, col=1, tickformat='$,.2f')
     fig_performance.update_yaxes(title_text="Return (%)", row=2, col=1, tickformat='.2f')
     fig_performance.update_layout(height=800, showlegend=True, hovermode='x unified')
-    figures['performance'] = fig_performance
-    
-    # 3. ETF vs Stocks (Stacked Area Subplots)
+    return fig_performance
+
+
+def _etf_vs_stocks_figure(sector_etf_stocks: pd.DataFrame, **_) -> go.Figure:
+    """ETF vs Stocks weights by sector (stacked area subplots)"""
     fig_etf_vs_stocks = make_subplots(
         rows=2, cols=1,
         subplot_titles=('ETF Weights by Sector', 'Individual Stocks Weights by Sector'),
@@ -804,9 +1144,8 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
     etf_df = sector_etf_stocks[etf_cols].copy()
     etf_df.columns = [col.replace('_ETF', '') for col in etf_df.columns]
     for col in etf_df.columns:
-        rounded_etf = etf_df[col].round(2)
         fig_etf_vs_stocks.add_trace(go.Scatter(
-            x=etf_df.index, y=rounded_etf, name=col,
+            x=etf_df.index, y=etf_df[col].to_numpy(), name=col,
             stackgroup='one', fillcolor=SECTOR_COLORS.get(col, '#808080'),
             mode='lines', line=dict(width=0.5, color=SECTOR_COLORS.get(col, '#808080')),
             hovertemplate='%{y:.2f}%<extra></extra>'
@@ -817,9 +1156,8 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
     stocks_df = sector_etf_stocks[stocks_cols].copy()
     stocks_df.columns = [col.replace('_Stocks', '') for col in stocks_df.columns]
     for col in stocks_df.columns:
-        rounded_stocks = stocks_df[col].round(2)
         fig_etf_vs_stocks.add_trace(go.Scatter(
-            x=stocks_df.index, y=rounded_stocks, name=col,
+            x=stocks_df.index, y=stocks_df[col].to_numpy(), name=col,
             stackgroup='two', fillcolor=SECTOR_COLORS.get(col, '#808080'),
             mode='lines', line=dict(width=0.5, color=SECTOR_COLORS.get(col, '#808080')),
             hovertemplate='%{y:.2f}%<extra></extra>'
@@ -829,9 +1167,11 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
     fig_etf_vs_stocks.update_yaxes(title_text="Weight (%)", row=1, col=1, tickformat='.2f')
     fig_etf_vs_stocks.update_yaxes(title_text="Weight (%)", row=2, col=1, tickformat='.2f')
     fig_etf_vs_stocks.update_layout(height=800, showlegend=True, hovermode='x unified')
-    figures['etf_vs_stocks'] = fig_etf_vs_stocks
-    
-    # 4. ETF vs Stocks (Grouped Bar Chart)
+    return fig_etf_vs_stocks
+
+
+def _bar_comparison_figure(ytd_df: pd.DataFrame, **_) -> go.Figure:
+    """ETF vs Stocks weights at the end of the period (grouped bar chart)"""
     sectors = ytd_df['Sector'].tolist()
     etf_ends = [round(x, 2) for x in ytd_df['ETF_Weight_End (%)'].tolist()]
     stocks_ends = [round(x, 2) for x in ytd_df['Stocks_Weight_End (%)'].tolist()]
@@ -850,9 +1190,12 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
         height=600,
         yaxis=dict(tickformat='.2f')
     )
-    figures['bar_comparison'] = fig_bar_comparison
-    
-    # 5. Weight Drift Over Time (Line Chart)
+    return fig_bar_comparison
+
+
+def _weight_drift_figure(weights: pd.DataFrame, **_) -> go.Figure:
+    """Weight Drift over time (line chart)"""
+    initial_weights = weights.iloc[0]
     weight_drift = weights.copy()
     for col in weight_drift.columns:
         if col in initial_weights:
@@ -864,10 +1207,9 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
     for col in weight_drift.columns:
         max_drift = abs(weight_drift[col]).max()
         if max_drift > 0.5: # Only plot meaningful drift
-            rounded_drift = weight_drift[col].round(2)
             fig_weight_drift.add_trace(go.Scatter(
                 x=weight_drift.index,
-                y=rounded_drift,
+                y=weight_drift[col].to_numpy(),
                 name=col,
                 mode='lines',
                 line=dict(width=2.5, color=SECTOR_COLORS.get(col, '#808080')),
@@ -882,6 +1224,318 @@ def generate_portfolio_analysis(transactions_file: str = 'data/transactions.csv'
         height=600,
         yaxis=dict(tickformat='.2f')
     )
-    figures['weight_drift'] = fig_weight_drift
+    return fig_weight_drift
+
+
+_FIGURE_BUILDERS = {
+    'sector_allocation': _sector_allocation_figure,
+    'performance': _performance_figure,
+    'etf_vs_stocks': _etf_vs_stocks_figure,
+    'bar_comparison': _bar_comparison_figure,
+    'weight_drift': _weight_drift_figure
+}
+
+
+class LazyFigures(Mapping):
+    """
+    Read-only mapping of FIGURE_NAMES to figures that are built on first access
     
-    return report_text, figures, summary_df, ytd_df, returns_data
+    Holds the analysis series the figures are drawn from; each figure is built once
+    and kept. Safe to access from several threads.
+    """
+    
+    def __init__(self, **inputs):
+        self._inputs = inputs
+        self._figures = {}
+        self._lock = threading.Lock()
+    
+    def __getitem__(self, name: str) -> go.Figure:
+        return self.build(name)
+    
+    def build(self, name: str) -> go.Figure:
+        """Build a figure now unless it was built already, and return it"""
+        if name not in _FIGURE_BUILDERS:
+            raise KeyError(name)
+        with self._lock:
+            fig = self._figures.get(name)
+            if fig is None:
+                fig = _FIGURE_BUILDERS[name](**self._inputs)
+                self._figures[name] = fig
+        return fig
+    
+    def __contains__(self, name) -> bool:
+        # Mapping's default would build the figure to answer
+        return name in _FIGURE_BUILDERS
+    
+    def __iter__(self):
+        return iter(FIGURE_NAMES)
+    
+    def __len__(self) -> int:
+        return len(FIGURE_NAMES)
+    
+    def is_built(self, name: str) -> bool:
+        """Whether a figure has been built already"""
+        return name in self._figures
+    
+    @property
+    def inputs(self) -> Dict:
+        """Keyword arguments the figures are built from (see build_analysis_figures)"""
+        return dict(self._inputs)
+
+
+def build_analysis_figures(weights: pd.DataFrame, sector_etf_stocks: pd.DataFrame, ytd_df: pd.DataFrame,
+                           portfolio_value: pd.Series, benchmark_value: pd.Series,
+                           portfolio_cumulative_return: pd.Series,
+                           benchmark_cumulative_return: pd.Series, lazy: bool = False) -> Dict[str, go.Figure]:
+    """
+    Build the Plotly figures shown in the Analysis & Results tab
+    
+    Args:
+        lazy: Return a LazyFigures mapping that builds each figure on first access
+    
+    Returns:
+        Dictionary of figures keyed by 'sector_allocation', 'performance',
+        'etf_vs_stocks', 'bar_comparison' and 'weight_drift'
+    """
+    figures = LazyFigures(weights=weights, sector_etf_stocks=sector_etf_stocks, ytd_df=ytd_df,
+                          portfolio_value=portfolio_value, benchmark_value=benchmark_value,
+                          portfolio_cumulative_return=portfolio_cumulative_return,
+                          benchmark_cumulative_return=benchmark_cumulative_return)
+    return figures if lazy else dict(figures)
+
+
+def returns_timeseries(returns_data: Dict, period: str = 'General') -> pd.DataFrame:
+    """
+    Flatten the time series in returns_data into one DataFrame for export.
+    
+    Args:
+        returns_data: Dictionary returned by generate_portfolio_analysis
+        period: 'General' (since beginning) or 'YTD' (year to date)
+    
+    Returns:
+        DataFrame indexed by date with equity, benchmark and per-sector return columns
+    """
+    if period == 'General':
+        columns = {
+            'Equity_Value': returns_data['equity_value'],
+            'Benchmark_Value': returns_data['benchmark_value'],
+            'Equity_Return (%)': returns_data['equity_returns'],
+            'Benchmark_Return (%)': returns_data['benchmark_returns']
+        }
+        sector_returns = returns_data['sector_returns']
+    else:
+        columns = {
+            'Equity_Return (%)': returns_data['equity_ytd_returns'],
+            'Benchmark_Return (%)': returns_data['benchmark_ytd_returns']
+        }
+        sector_returns = returns_data['sector_ytd_returns']
+    for sector_name, series in sector_returns.items():
+        columns[f'{sector_name}_ETF_Benchmark (%)'] = series['ETF_Benchmark']
+        columns[f'{sector_name}_Sector_Aggregate (%)'] = series['Sector_Aggregate']
+    timeseries = pd.DataFrame(columns)
+    timeseries.index.name = 'Date'
+    return timeseries
+
+
+def write_analysis_outputs(out_dir: str, report_text: str, figures: Dict, summary_df: pd.DataFrame,
+                           ytd_df: pd.DataFrame, returns_data: Dict, include_plotlyjs='directory',
+                           max_points: int = None) -> List[str]:
+    """
+    Write analysis results to a directory.
+    
+    Writes the text report, summary and YTD CSVs, the return time series, one
+    standalone HTML file per figure, and the run timing record and per-ticker
+    price fetch status as JSON.
+    
+    Args:
+        out_dir: Output directory (created if missing)
+        include_plotlyjs: Passed to Figure.write_html ('directory' writes plotly.min.js
+            once next to the figures, 'cdn' links to the CDN, True inlines it)
+        max_points: LTTB-downsample line traces in the HTML figures to this many points
+    
+    Returns:
+        List of written file paths
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    
+    report_path = os.path.join(out_dir, 'smic_report.txt')
+    with open(report_path, 'w') as f:
+        f.write(report_text + "\n")
+    written.append(report_path)
+    
+    tables = {
+        'smic_statistics_summary.csv': (summary_df, False),
+        'smic_sector_etf_vs_stocks_ytd.csv': (ytd_df, False),
+        'smic_returns_timeseries.csv': (returns_timeseries(returns_data, 'General'), True),
+        'smic_returns_timeseries_ytd.csv': (returns_timeseries(returns_data, 'YTD'), True)
+    }
+    for file_name, (table, with_index) in tables.items():
+        path = os.path.join(out_dir, file_name)
+        table.to_csv(path, index=with_index)
+        written.append(path)
+    
+    for fig_name, fig in figures.items():
+        path = os.path.join(out_dir, f'smic_{fig_name}.html')
+        compact_figure(downsample_figure(fig, max_points)).write_html(path, include_plotlyjs=include_plotlyjs)
+        written.append(path)
+    
+    if returns_data.get('run_stats'):
+        path = os.path.join(out_dir, 'smic_run_stats.json')
+        with open(path, 'w') as f:
+            json.dump(returns_data['run_stats'], f, indent=2)
+        written.append(path)
+    
+    if returns_data.get('price_status'):
+        path = os.path.join(out_dir, 'smic_price_status.json')
+        with open(path, 'w') as f:
+            json.dump(returns_data['price_status'], f, indent=1, sort_keys=True)
+        written.append(path)
+    
+    return written
+
+
+def main(argv: List[str] = None) -> int:
+    """Command-line entry point: python -m analysis_core run --transactions ... --out DIR"""
+    import argparse
+    import sys
+    
+    parser = argparse.ArgumentParser(prog='python -m analysis_core',
+                                     description='SMIC portfolio analysis without the GUI')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    run_parser = subparsers.add_parser('run', help='Run the portfolio analysis and write reports')
+    run_parser.add_argument('--transactions', default='data/transactions.csv',
+                            help='Transactions CSV or SQLite ledger (.db) (default: data/transactions.csv)')
+    run_parser.add_argument('--out', required=True, help='Output directory')
+    run_parser.add_argument('--prices', default=None,
+                            help="Price source: 'yfinance' (default) or a CSV/Parquet fixture file or directory")
+    run_parser.add_argument('--cache-dir', default=None, help='Price cache directory')
+    run_parser.add_argument('--no-cache', action='store_true', help='Download all prices instead of using the cache')
+    run_parser.add_argument('--plotlyjs', choices=['directory', 'cdn', 'inline'], default='directory',
+                            help='How figures load plotly.js (default: directory)')
+    run_parser.add_argument('--max-points', type=int, default=None,
+                            help='Downsample line traces in the HTML figures to this many points')
+    run_parser.add_argument('--profile', action='store_true', help='Capture a cProfile summary of the run')
+    run_parser.add_argument('--trace-memory', action='store_true', help='Record peak memory per stage')
+    run_parser.add_argument('--quiet', action='store_true', help='Do not print progress or the report')
+    
+    batch_parser = subparsers.add_parser('batch', help='Analyze many transaction files with one price download')
+    batch_parser.add_argument('--transactions', nargs='+', required=True, help='Transactions CSVs, one per portfolio')
+    batch_parser.add_argument('--out', required=True,
+                              help='Output directory (one subdirectory per transactions file)')
+    batch_parser.add_argument('--prices', default=None,
+                              help="Price source: 'yfinance' (default) or a CSV/Parquet fixture file or directory")
+    batch_parser.add_argument('--cache-dir', default=None, help='Price cache directory')
+    batch_parser.add_argument('--no-cache', action='store_true', help='Download all prices instead of using the cache')
+    batch_parser.add_argument('--figures', action='store_true', help='Also write HTML figures for every portfolio')
+    batch_parser.add_argument('--max-points', type=int, default=None,
+                              help='Downsample line traces in the HTML figures to this many points')
+    batch_parser.add_argument('--quiet', action='store_true', help='Do not print progress')
+    
+    ledger_parser = subparsers.add_parser('ledger', help='Copy transactions between a CSV and a SQLite ledger')
+    ledger_parser.add_argument('action', choices=['import', 'export'],
+                               help='import: CSV into the database (replacing it); export: database to CSV')
+    ledger_parser.add_argument('--csv', default='data/transactions.csv',
+                               help='Transactions CSV (default: data/transactions.csv)')
+    ledger_parser.add_argument('--db', default='data/transactions.db',
+                               help='SQLite ledger (default: data/transactions.db)')
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == 'batch':
+        return _run_batch(args)
+    if args.command == 'ledger':
+        return _run_ledger(args)
+    
+    def print_stage(stage: str):
+        if not args.quiet:
+            print(f"[{stage}]", file=sys.stderr)
+    
+    try:
+        report_text, figures, summary_df, ytd_df, returns_data = generate_portfolio_analysis(
+            args.transactions, use_cache=not args.no_cache, cache_dir=args.cache_dir,
+            price_provider=args.prices, progress_callback=print_stage,
+            profile=args.profile or None, trace_memory=args.trace_memory or None)
+        include_plotlyjs = True if args.plotlyjs == 'inline' else args.plotlyjs
+        written = write_analysis_outputs(args.out, report_text, figures, summary_df, ytd_df,
+                                         returns_data, include_plotlyjs=include_plotlyjs,
+                                         max_points=args.max_points)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    
+    if not args.quiet:
+        print(report_text)
+        print("\n" + format_run_stats(returns_data.get('run_stats')))
+        print(f"\nWrote {len(written)} files to {args.out}", file=sys.stderr)
+    return 0
+
+
+def batch_output_names(transactions_files: List[str]) -> Dict[str, str]:
+    """
+    Output directory name for each transactions file of a batch
+    
+    The file name without extension, prefixed with its parent directory's name when
+    several files share it, and numbered if that is still not unique.
+    """
+    stems = {path: os.path.splitext(os.path.basename(path))[0] for path in transactions_files}
+    counts = pd.Series(list(stems.values())).value_counts()
+    names = {}
+    for path, stem in stems.items():
+        name = stem
+        if counts[stem] > 1:
+            parent = os.path.basename(os.path.dirname(os.path.abspath(path)))
+            name = f"{parent}_{stem}" if parent else stem
+        unique, n = name, 1
+        while unique in names.values():
+            n += 1
+            unique = f"{name}-{n}"
+        names[path] = unique
+    return names
+
+
+def _run_batch(args) -> int:
+    """Handle the 'batch' command"""
+    import sys
+    
+    try:
+        # Portfolios with the same file name in different directories get their own outputs
+        out_names = batch_output_names(args.transactions)
+        results, errors = generate_batch_analysis(args.transactions, use_cache=not args.no_cache,
+                                                  cache_dir=args.cache_dir, price_provider=args.prices,
+                                                  build_figures=args.figures)
+        for path, (report_text, figures, summary_df, ytd_df, returns_data) in results.items():
+            out_dir = os.path.join(args.out, out_names[path])
+            write_analysis_outputs(out_dir, report_text, figures, summary_df, ytd_df, returns_data,
+                                   max_points=args.max_points)
+            if not args.quiet:
+                print(f"{path}: wrote {out_dir}", file=sys.stderr)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    
+    for path, message in errors.items():
+        print(f"{path}: Error: {message}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def _run_ledger(args) -> int:
+    """Handle the 'ledger' command"""
+    import sys
+    
+    try:
+        if args.action == 'import':
+            count = SQLiteTransactionStore(args.db).import_csv(args.csv)
+            print(f"Imported {count} transactions from {args.csv} into {args.db}", file=sys.stderr)
+        else:
+            count = SQLiteTransactionStore(args.db, create=False).export_csv(args.csv)
+            print(f"Exported {count} transactions from {args.db} to {args.csv}", file=sys.stderr)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
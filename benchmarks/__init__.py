@@ -0,0 +1,4 @@
+"""
+SMIC Portfolio Analysis Benchmarks
+Synthetic ledgers/price fixtures and stage timings for analysis_core
+"""
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark runner for analysis_core
+Times every stage of generate_portfolio_analysis and each generate_comparison_plot
+variant on synthetic portfolios of increasing size, and records results to JSON
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --sizes 1000x10 10000x500 --years 5
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<older>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import pandas as pd
+
+from analysis_core import generate_comparison_plot, generate_portfolio_analysis
+from benchmarks.synthetic import write_synthetic_portfolio
+
+# (transactions, tickers) pairs
+DEFAULT_SIZES = ['1000x10', '10000x500', '100000x5000']
+FULL_GRID = [f'{n}x{t}' for n in (1000, 10000, 100000) for t in (10, 500, 5000)]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(RESULTS_DIR)).decode().strip()
+    except Exception:
+        return 'unknown'
+
+
+def run_case(n_transactions: int, n_tickers: int, years: float, swap_ratio: float, seed: int,
+             work_dir: str) -> Dict:
+    """Generate one synthetic portfolio and time the analysis and comparison plots on it"""
+    case_dir = os.path.join(work_dir, f'{n_transactions}x{n_tickers}')
+    generate_started = time.perf_counter()
+    transactions_path, prices_path = write_synthetic_portfolio(
+        case_dir, n_transactions, n_tickers, years, swap_ratio=swap_ratio, seed=seed)
+    generate_seconds = time.perf_counter() - generate_started
+
+    _, figures, _, _, returns_data = generate_portfolio_analysis(
+        transactions_path, use_cache=False, price_provider=prices_path)
+    run_stats = returns_data['run_stats']
+
+    comparison = {}
+    sector = next(iter(returns_data['sector_returns']), None)
+    for comparison_type in ('ETF_vs_Stocks', 'Equity_vs_SP500'):
+        for period in ('General', 'YTD'):
+            started = time.perf_counter()
+            generate_comparison_plot(returns_data, sector=sector, comparison_type=comparison_type, period=period,
+                                     transaction_dates=returns_data.get('transaction_dates', {}))
+            comparison[f'{comparison_type}/{period}'] = time.perf_counter() - started
+
+    return {
+        'transactions': n_transactions,
+        'tickers': n_tickers,
+        'years': years,
+        'swap_ratio': swap_ratio,
+        'generate_seconds': generate_seconds,
+        'stages': {s['name']: s['seconds'] for s in run_stats['stages']},
+        'analysis_seconds': run_stats['total_seconds'],
+        'comparison_seconds': comparison
+    }
+
+
+def print_case(case: Dict, baseline: Dict = None):
+    """Print one case, with the ratio to a baseline case when given"""
+    def fmt(name, seconds, base):
+        ratio = f'  ({seconds / base:5.2f}x)' if base else ''
+        return f"    {name:<38}{seconds:>9.3f} s{ratio}"
+
+    print(f"{case['transactions']} transactions x {case['tickers']} tickers, {case['years']} years")
+    base_stages = (baseline or {}).get('stages', {})
+    for name, seconds in case['stages'].items():
+        print(fmt(name, seconds, base_stages.get(name)))
+    print(fmt('analysis total', case['analysis_seconds'], (baseline or {}).get('analysis_seconds')))
+    base_comparison = (baseline or {}).get('comparison_seconds', {})
+    for name, seconds in case['comparison_seconds'].items():
+        print(fmt(f'comparison {name}', seconds, base_comparison.get(name)))
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark analysis_core on synthetic portfolios')
+    parser.add_argument('--sizes', nargs='+', default=None,
+                        help=f"TRANSACTIONSxTICKERS cases (default: {' '.join(DEFAULT_SIZES)})")
+    parser.add_argument('--full-grid', action='store_true', help='Run every combination of 1k/10k/100k x 10/500/5000')
+    parser.add_argument('--years', type=float, default=20, help='History length in years (default: 20)')
+    parser.add_argument('--swap-ratio', type=float, default=0.8, help='Share of transactions that are stock swaps')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--output', default=None, help='Results JSON (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', default=None, help='Earlier results JSON to compare against')
+    args = parser.parse_args(argv)
+
+    sizes = FULL_GRID if args.full_grid else (args.sizes or DEFAULT_SIZES)
+    baseline_cases = {}
+    if args.compare:
+        with open(args.compare) as f:
+            for case in json.load(f)['cases']:
+                baseline_cases[(case['transactions'], case['tickers'], case['years'])] = case
+
+    revision = _git_revision()
+    results = {
+        'revision': revision,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cases': []
+    }
+    with tempfile.TemporaryDirectory(prefix='smic_bench_') as work_dir:
+        for size in sizes:
+            n_transactions, n_tickers = (int(x) for x in size.lower().split('x'))
+            case = run_case(n_transactions, n_tickers, args.years, args.swap_ratio, args.seed, work_dir)
+            results['cases'].append(case)
+            print_case(case, baseline_cases.get((n_transactions, n_tickers, args.years)))
+            sys.stdout.flush()
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{revision}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
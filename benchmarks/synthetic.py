@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Synthetic portfolio generator for benchmarks
+Builds a transaction ledger in the data/transactions.csv schema and a matching
+Adj Close price fixture readable by price_data.FilePriceProvider
+"""
+
+import os
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from analysis_core import V
+
+FIXED_INCOME_TICKER = 'BSV'
+BENCHMARK_TICKER = '^GSPC'
+TRANSACTION_COLUMNS = ['sector', 'ticker', 'invest_date', 'shares', 'purchase_price', 'amount_invested']
+
+
+def synthetic_prices(tickers, start, end, seed: int = 0) -> pd.DataFrame:
+    """
+    Geometric Brownian motion Adj Close prices on business days in [start, end).
+    
+    Returns:
+        DataFrame indexed by Date with one float64 column per ticker
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(pd.Timestamp(start), pd.Timestamp(end) - pd.Timedelta(days=1), name='Date')
+    drift = rng.normal(0.0003, 0.0002, len(tickers))
+    vol = rng.uniform(0.008, 0.03, len(tickers))
+    log_returns = rng.standard_normal((len(dates), len(tickers))) * vol + drift
+    start_prices = rng.uniform(20, 400, len(tickers))
+    prices = start_prices * np.exp(np.cumsum(log_returns, axis=0))
+    return pd.DataFrame(prices, index=dates, columns=list(tickers))
+
+
+def synthetic_ledger(n_transactions: int, n_tickers: int, years: float, swap_ratio: float = 0.8,
+                     seed: int = 0, end=None) -> pd.DataFrame:
+    """
+    Synthetic transaction ledger.
+    
+    The portfolio opens with a purchase of every sector ETF, a fixed income fund and
+    cash on the first day. The remaining transactions are spread uniformly over the
+    period; a swap_ratio share of them are ETF-to-stock swaps into n_tickers synthetic
+    stocks, the rest are additional sector ETF purchases.
+    
+    Args:
+        n_transactions: Total number of ledger rows
+        n_tickers: Number of distinct synthetic stock tickers
+        years: Length of the history ending at `end` (default: today)
+        swap_ratio: Share of non-initial transactions that are stock swaps
+        seed: Random seed
+    """
+    if n_tickers < 1:
+        raise ValueError("n_tickers must be at least 1")
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.now().normalize()
+    start = (end - pd.Timedelta(days=int(years * 365.25))).normalize()
+    sectors = list(V.keys())
+    n_rest = max(n_transactions - len(sectors) - 2, 0)
+
+    # Size the opening ETF positions so swaps rarely drive them negative
+    etf_amount = 1_000_000.0 + 3 * 1_000.0 * n_rest / len(sectors)
+    initial = [{'sector': s, 'ticker': V[s], 'invest_date': start, 'amount_invested': etf_amount} for s in sectors]
+    initial.append({'sector': 'Fixed_Income', 'ticker': FIXED_INCOME_TICKER, 'invest_date': start,
+                    'amount_invested': 500_000.0})
+    initial.append({'sector': 'Cash', 'ticker': 'CASH', 'invest_date': start, 'amount_invested': 100_000.0})
+
+    stock_sectors = np.array(sectors)[np.arange(n_tickers) % len(sectors)]
+    stock_names = np.array([f'S{i:05d}' for i in range(n_tickers)])
+    is_swap = rng.random(n_rest) < swap_ratio
+    stock_idx = rng.integers(0, n_tickers, n_rest)
+    etf_sector = np.array(sectors)[rng.integers(0, len(sectors), n_rest)]
+    days = rng.integers(0, max((end - start).days, 1), n_rest)
+
+    rest = pd.DataFrame({
+        'sector': np.where(is_swap, stock_sectors[stock_idx], etf_sector),
+        'ticker': np.where(is_swap, stock_names[stock_idx], pd.Series(etf_sector).map(V).to_numpy()),
+        'invest_date': start + pd.to_timedelta(days, unit='D'),
+        'amount_invested': np.round(rng.uniform(100, 2000, n_rest), 2)
+    })
+
+    ledger = pd.concat([pd.DataFrame(initial), rest], ignore_index=True)
+    ledger['shares'] = np.nan
+    ledger['purchase_price'] = np.nan
+    ledger['invest_date'] = pd.to_datetime(ledger['invest_date']).dt.strftime('%Y-%m-%d')
+    return ledger[TRANSACTION_COLUMNS]
+
+
+def write_synthetic_portfolio(out_dir: str, n_transactions: int, n_tickers: int, years: float,
+                              swap_ratio: float = 0.8, seed: int = 0) -> Tuple[str, str]:
+    """
+    Write a synthetic ledger and its price fixture to out_dir.
+    
+    Returns:
+        (transactions_csv_path, price_fixture_path)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    ledger = synthetic_ledger(n_transactions, n_tickers, years, swap_ratio=swap_ratio, seed=seed)
+    tickers = sorted(set(ledger['ticker']) - {'CASH'} | set(V.values()) | {FIXED_INCOME_TICKER, BENCHMARK_TICKER})
+    start = pd.Timestamp(ledger['invest_date'].min()) - pd.Timedelta(days=15)
+    end = pd.Timestamp.now().normalize()
+    prices = synthetic_prices(tickers, start, end, seed=seed)
+
+    transactions_path = os.path.join(out_dir, 'transactions.csv')
+    ledger.to_csv(transactions_path, index=False)
+    try:
+        prices_path = os.path.join(out_dir, 'prices.parquet')
+        prices.to_parquet(prices_path)
+    except ImportError:
+        prices_path = os.path.join(out_dir, 'prices.csv')
+        prices.to_csv(prices_path)
+    return transactions_path, prices_path
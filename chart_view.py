@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+SMIC Portfolio Analysis Chart View
+QWebEngineView hosting one persistent Plotly page; new figures are pushed into
+it with Plotly.react instead of reloading a full HTML document. Long line traces
+are downsampled and refined to full resolution for the visible range on zoom,
+and updated figures whose line traces only changed at the end send just that end
+"""
+
+import json
+import os
+import re
+
+import plotly
+from plotly.offline import get_plotlyjs_version
+from PySide6.QtCore import QObject, QUrl, Slot
+from PySide6.QtWebChannel import QWebChannel
+from PySide6.QtWebEngineWidgets import QWebEngineView
+
+from downsample import DEFAULT_MAX_POINTS, downsample_figure, needs_downsampling
+from figure_payload import figure_payload_json, figure_tail
+
+# Page loaded once per view; {plotly_src} is the local plotly.min.js (or the CDN as a fallback)
+CHART_PAGE_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<style>
+  html, body {{ margin: 0; padding: 0; height: 100%; }}
+  #chart {{ width: 100%; height: 100%; }}
+</style>
+<script src="{plotly_src}"></script>
+<script src="qrc:///qtwebchannel/qwebchannel.js"></script>
+</head>
+<body>
+<div id="chart"></div>
+<script>
+var bridge = null;
+var listening = false;
+if (typeof QWebChannel !== 'undefined' && typeof qt !== 'undefined') {{
+  new QWebChannel(qt.webChannelTransport, function(channel) {{ bridge = channel.objects.chartBridge; }});
+}}
+function decodeArray(spec) {{
+  var bin = atob(spec.bdata), bytes = new Uint8Array(bin.length);
+  for (var i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+  return spec.dtype === 'f4' ? new Float32Array(bytes.buffer) : new Float64Array(bytes.buffer);
+}}
+// Payloads from figure_payload_json share x arrays between traces by reference
+function resolveArrays(fig) {{
+  var shared = {{}};
+  for (var key in (fig.arrays || {{}})) shared[key] = decodeArray(fig.arrays[key]);
+  (fig.data || []).forEach(function(trace) {{
+    if (trace.x && trace.x.ref !== undefined) trace.x = shared[trace.x.ref];
+  }});
+}}
+// Figures with the same revision keep the user's zoom/pan state across redraws
+function renderFigure(fig, revision) {{
+  resolveArrays(fig);
+  var layout = fig.layout || {{}};
+  layout.uirevision = revision;
+  Plotly.react('chart', fig.data || [], layout, {{responsive: true}}).then(function(gd) {{
+    if (!listening) {{
+      gd.on('plotly_relayout', function(ev) {{ if (bridge) bridge.relayout(JSON.stringify(ev)); }});
+      listening = true;
+    }}
+  }});
+}}
+// plotly.js keeps {{dtype, bdata}} specs in gd.data and the decoded array in their _inputArray
+function traceArray(values) {{
+  if (values && values._inputArray) return values._inputArray;
+  if (values && values.bdata !== undefined) return decodeArray(values);
+  return values;
+}}
+// Replace the end of some traces: keep[i] leading points, then x[i]/y[i] appended
+function updateTails(tail) {{
+  var gd = document.getElementById('chart');
+  var renamed = Object.keys(tail.names);
+  if (renamed.length) {{
+    Plotly.restyle(gd, {{name: renamed.map(function(i) {{ return tail.names[i]; }})}}, renamed.map(Number));
+  }}
+  if (!tail.indices.length) return;
+  tail.indices.forEach(function(index, i) {{
+    var trace = gd.data[index];
+    trace.x = Array.prototype.slice.call(traceArray(trace.x), 0, tail.keep[i]);
+    trace.y = Array.prototype.slice.call(traceArray(trace.y), 0, tail.keep[i]);
+  }});
+  Plotly.extendTraces(gd, {{x: tail.x, y: tail.y}}, tail.indices);
+}}
+</script>
+</body>
+</html>
+"""
+
+
+def plotly_js_dir() -> str:
+    """Directory of the plotly.min.js bundled with the plotly package (also collected by PyInstaller)"""
+    return os.path.join(os.path.dirname(plotly.__file__), 'package_data')
+
+
+def chart_page_html() -> str:
+    """Chart page HTML using the local plotly.min.js when available"""
+    if os.path.exists(os.path.join(plotly_js_dir(), 'plotly.min.js')):
+        plotly_src = 'plotly.min.js'
+    else:
+        plotly_src = f'https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js'
+    return CHART_PAGE_HTML.format(plotly_src=plotly_src)
+
+
+def relayout_x_range(event: dict):
+    """
+    Visible x range from a plotly_relayout event.
+
+    Returns:
+        (x0, x1) for a zoom or pan, 'full' when the x axis was autoscaled, or None
+        if the event did not change the x axis
+    """
+    bounds = {}
+    for key, value in event.items():
+        match = re.fullmatch(r'xaxis\d*\.(range|autorange|range\[(0|1)\])', key)
+        if match is None:
+            continue
+        if match.group(1) == 'autorange':
+            if value:
+                return 'full'
+        elif match.group(2) is None:
+            return tuple(value)
+        else:
+            bounds[int(match.group(2))] = value
+    if len(bounds) == 2:
+        return bounds[0], bounds[1]
+    return None
+
+
+class ChartBridge(QObject):
+    """Receives relayout (zoom/pan) events from the chart page over the web channel"""
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.view = view
+
+    @Slot(str)
+    def relayout(self, payload: str):
+        self.view.refine(json.loads(payload))
+
+
+class ChartView(QWebEngineView):
+    """
+    Chart widget that loads its Plotly page once and redraws figures incrementally.
+
+    Line traces longer than max_points are LTTB-downsampled before they are sent to
+    the page. The full-resolution figure is kept, so zooming in re-sends the visible
+    range at full resolution (or downsampled again if it still exceeds the budget).
+    """
+
+    def __init__(self, parent=None, max_points: int = DEFAULT_MAX_POINTS):
+        super().__init__(parent)
+        self.max_points = max_points
+        self._page_ready = False
+        self._pending_json = None
+        self._figure = None
+        # Full-resolution figure on display, when known (see update_figure)
+        self._shown = None
+        self._revision = 0
+        self._bridge = ChartBridge(self)
+        self._channel = QWebChannel(self)
+        self._channel.registerObject('chartBridge', self._bridge)
+        self.page().setWebChannel(self._channel)
+        self.loadFinished.connect(self._on_load_finished)
+        # Base URL points at plotly's package data so the page loads plotly.min.js from disk
+        self.setHtml(chart_page_html(), QUrl.fromLocalFile(plotly_js_dir() + os.sep))
+
+    def _on_load_finished(self, ok):
+        self._page_ready = ok
+        if ok and self._pending_json is not None:
+            fig_json, self._pending_json = self._pending_json, None
+            self._render(fig_json)
+
+    def _render(self, fig_json: str):
+        self.page().runJavaScript(f"renderFigure({fig_json}, {self._revision});")
+
+    def set_figure(self, fig):
+        """Display a Plotly figure"""
+        self.set_figure_json(figure_payload_json(downsample_figure(fig, self.max_points)), figure=fig)
+
+    def set_figure_json(self, fig_json: str, figure=None, keep_view: bool = False):
+        """
+        Display a figure already serialized with figure_payload_json() or Figure.to_json()
+
+        Args:
+            fig_json: Figure JSON, already downsampled to max_points if needed
+            figure: The full-resolution figure, used to refine the visible range on zoom
+            keep_view: Keep the current zoom/pan (for a new version of the same chart)
+        """
+        # Only figures that were actually reduced need refining on zoom
+        self._figure = figure if figure is not None and needs_downsampling(figure, self.max_points) else None
+        self._shown = figure
+        if not keep_view:
+            self._revision += 1
+        if self._page_ready:
+            self._render(fig_json)
+        else:
+            # Page still loading - show the latest figure once it is ready
+            self._pending_json = fig_json
+
+    def update_figure(self, fig, fig_json: str = None):
+        """
+        Display a new version of the figure on display, keeping the zoom/pan.
+
+        When only the end of its line traces changed (see figure_tail) and nothing is
+        downsampled, just the changed points are sent; otherwise the figure is redrawn,
+        from fig_json when given (figure_payload_json of the downsampled figure).
+        """
+        previous = self._shown
+        tail = None
+        if previous is not None and self._page_ready and self._pending_json is None \
+                and not needs_downsampling(previous, self.max_points) and not needs_downsampling(fig, self.max_points):
+            tail = figure_tail(previous, fig)
+        if tail is None:
+            if fig_json is None:
+                fig_json = figure_payload_json(downsample_figure(fig, self.max_points))
+            self.set_figure_json(fig_json, figure=fig, keep_view=previous is not None)
+            return
+        self._shown = fig
+        if tail['indices'] or tail['names']:
+            self.page().runJavaScript(f"updateTails({json.dumps(tail)});")
+
+    def refine(self, event: dict):
+        """Redraw the line traces for the x range of a relayout event"""
+        if self._figure is None or not self._page_ready:
+            return
+        x_range = relayout_x_range(event)
+        if x_range is None:
+            return
+        try:
+            fig = downsample_figure(self._figure, self.max_points, None if x_range == 'full' else x_range)
+        except (TypeError, ValueError):
+            # Ranges on non-date axes that don't parse - keep the current drawing
+            return
+        self._render(figure_payload_json(fig))
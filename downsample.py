@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+SMIC Portfolio Analysis Downsampling Module
+Largest-Triangle-Three-Buckets (LTTB) downsampling of long Plotly line traces,
+optionally restricted to a visible x range for zoom refinement
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Points kept per line trace when figures are sent to a chart view
+DEFAULT_MAX_POINTS = 2000
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """
+    Pick the indices of n_out points that best preserve the shape of a line.
+
+    The first and last points are always kept. The points in between are split into
+    n_out - 2 equal buckets and each bucket keeps the point forming the largest
+    triangle with the previously kept point and the average of the next bucket.
+
+    Args:
+        x: Numeric x values (increasing)
+        y: Numeric y values, same length as x (NaN is treated as 0 when choosing points)
+        n_out: Number of points to keep
+
+    Returns:
+        Sorted integer index array into x/y
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+
+    # Bucket i covers [edges[i], edges[i + 1]); the final "next bucket" is the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    bounds = np.append(edges, n)
+    counts = np.diff(bounds)
+    avg_x = np.add.reduceat(x, edges) / counts
+    avg_y = np.add.reduceat(y, edges) / counts
+
+    out = np.empty(n_out, dtype=int)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def _numeric_x(x) -> np.ndarray:
+    """x values as floats (datetimes become nanoseconds since the epoch)"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    if x.dtype == object:
+        return pd.DatetimeIndex(x).asi8.astype(float)
+    return x.astype(float)
+
+
+def _is_line_trace(trace) -> bool:
+    """Only plain line/area scatter traces are downsampled; markers, text and bars are kept as is"""
+    if trace.type not in ('scatter', 'scattergl') or trace.x is None or trace.y is None:
+        return False
+    if trace.customdata is not None or not (trace.text is None or isinstance(trace.text, str)):
+        return False
+    return trace.stackgroup is not None or trace.mode in (None, 'lines')
+
+
+def _visible_slice(x_num: np.ndarray, x_range: Optional[Tuple[float, float]]) -> slice:
+    """Positions inside x_range plus one point on each side so lines reach the plot edges"""
+    if x_range is None:
+        return slice(0, len(x_num))
+    lo = max(int(np.searchsorted(x_num, x_range[0], side='left')) - 1, 0)
+    hi = min(int(np.searchsorted(x_num, x_range[1], side='right')) + 1, len(x_num))
+    return slice(lo, hi)
+
+
+def parse_x_range(x_range) -> Optional[Tuple[float, float]]:
+    """Convert an (x0, x1) pair of dates or numbers to the numeric scale used by _numeric_x"""
+    if x_range is None:
+        return None
+    x0, x1 = x_range
+    if isinstance(x0, (int, float)) and isinstance(x1, (int, float)):
+        return float(x0), float(x1)
+    return float(pd.Timestamp(x0).value), float(pd.Timestamp(x1).value)
+
+
+def needs_downsampling(fig: go.Figure, max_points: int = DEFAULT_MAX_POINTS) -> bool:
+    """Whether any line trace of the figure has more than max_points points"""
+    return bool(max_points) and any(_is_line_trace(trace) and len(trace.x) > max_points for trace in fig.data)
+
+
+def downsample_figure(fig: go.Figure, max_points: int = DEFAULT_MAX_POINTS, x_range=None) -> go.Figure:
+    """
+    Downsample the line traces of a figure with LTTB.
+
+    Traces in the same stack group share one set of points (chosen from the stack
+    total) so stacked areas stay aligned. With x_range only the visible part of each
+    line is kept, which gives full resolution once a zoomed window fits the budget.
+
+    Args:
+        fig: Figure at full resolution (not modified)
+        max_points: Maximum points per line trace; falsy disables downsampling
+        x_range: Optional (x0, x1) visible range (dates or numbers)
+
+    Returns:
+        The same figure if nothing needed reducing, otherwise a new figure
+    """
+    if not max_points:
+        return fig
+    visible = parse_x_range(x_range)
+
+    # Group line traces that must share points: stack groups per axis, other traces alone
+    groups: Dict[Tuple, List[int]] = {}
+    for i, trace in enumerate(fig.data):
+        if _is_line_trace(trace):
+            key = ('stack', trace.xaxis, trace.stackgroup) if trace.stackgroup is not None else ('trace', i)
+            groups.setdefault(key, []).append(i)
+
+    updates = {}
+    for members in groups.values():
+        x_num = _numeric_x(fig.data[members[0]].x)
+        if any(len(fig.data[i].x) != len(x_num) for i in members):
+            # Stacked traces on different x grids - fall back to one group per trace
+            for i in members:
+                updates.update(_downsample_group(fig, [i], _numeric_x(fig.data[i].x), max_points, visible))
+        else:
+            updates.update(_downsample_group(fig, members, x_num, max_points, visible))
+
+    if not updates:
+        return fig
+    data = []
+    for i, trace in enumerate(fig.data):
+        if i in updates:
+            props = trace.to_plotly_json()
+            props['x'], props['y'] = updates[i]
+            trace = type(trace)(props)
+        data.append(trace)
+    return go.Figure(data=data, layout=fig.layout)
+
+
+def _downsample_group(fig: go.Figure, members: List[int], x_num: np.ndarray, max_points: int,
+                      visible: Optional[Tuple[float, float]]) -> Dict[int, Tuple]:
+    window = _visible_slice(x_num, visible)
+    n = window.stop - window.start
+    if n <= max_points and n == len(x_num):
+        return {}
+    ys = [np.asarray(fig.data[i].y, dtype=float)[window] for i in members]
+    total = np.nansum(ys, axis=0) if len(ys) > 1 else ys[0]
+    keep = lttb_indices(x_num[window], total, max_points)
+    return {i: (np.asarray(fig.data[i].x)[window][keep], y[keep]) for i, y in zip(members, ys)}
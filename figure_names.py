@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+"""
+SMIC Portfolio Analysis Figure Names
+Names of the figures shown in the Analysis & Results tab, shared by the analysis
+engine and the GUI (which builds its window without importing analysis_core)
+"""
+
+# Figures shown in the Analysis & Results tab, in tab order
+FIGURE_NAMES = ['sector_allocation', 'performance', 'etf_vs_stocks', 'bar_comparison', 'weight_drift']
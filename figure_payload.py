@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+SMIC Portfolio Analysis Figure Payload Module
+Compact figure serialization: dates as epoch-millisecond typed arrays shared
+between traces, values as float32 where that keeps 2-decimal precision
+"""
+
+import base64
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.utils import PlotlyJSONEncoder
+
+# float32 keeps 2-decimal values exact (to display precision) below this magnitude
+FLOAT32_MAX_ABS = 1e4
+
+
+def _epoch_ms(x) -> np.ndarray:
+    """Datetime-like x values as float64 milliseconds since the epoch, or None for other data"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ms]').astype(np.int64).astype(np.float64)
+    if x.dtype.kind in 'OU' and len(x) and isinstance(x[0], (datetime, np.datetime64, str)):
+        try:
+            return pd.DatetimeIndex(x).values.astype('datetime64[ms]').astype(np.int64).astype(np.float64)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def _compact_values(y) -> np.ndarray:
+    """Numeric y values as float32 when they are small enough, otherwise float64"""
+    y = np.asarray(y)
+    if y.dtype.kind not in 'fiu':
+        return None
+    y = y.astype(np.float64, copy=False)
+    finite = y[np.isfinite(y)]
+    if finite.size == 0 or np.abs(finite).max() < FLOAT32_MAX_ABS:
+        return y.astype(np.float32)
+    return y
+
+
+def compact_figure(fig: go.Figure) -> go.Figure:
+    """
+    Re-encode a figure's trace data for smaller serialized output.
+
+    Date x values become epoch milliseconds (their axes are set to type 'date', so the
+    chart looks the same) and numeric y values become float32 when small enough.
+    Plotly serializes both as base64 typed arrays instead of ISO strings and decimals.
+
+    Args:
+        fig: Figure to encode (not modified)
+
+    Returns:
+        A new figure, or the same figure if no trace could be compacted
+    """
+    data = []
+    date_axes = set()
+    changed = False
+    for trace in fig.data:
+        if trace.type in ('scatter', 'scattergl', 'bar') and trace.x is not None:
+            props = trace.to_plotly_json()
+            x_ms = _epoch_ms(trace.x)
+            if x_ms is not None:
+                props['x'] = x_ms
+                date_axes.add('xaxis' + (trace.xaxis or 'x')[1:])
+            if trace.y is not None:
+                y = _compact_values(trace.y)
+                if y is not None:
+                    props['y'] = y
+            trace = type(trace)(props)
+            changed = True
+        data.append(trace)
+    if not changed:
+        return fig
+    out = go.Figure(data=data, layout=fig.layout)
+    out.update_layout({axis: {'type': 'date'} for axis in date_axes})
+    return out
+
+
+def _typed_array(values: np.ndarray) -> dict:
+    """Plotly's base64 typed-array encoding (decoded natively by plotly.js)"""
+    dtype = {np.dtype(np.float32): 'f4', np.dtype(np.float64): 'f8'}[values.dtype]
+    return {'dtype': dtype, 'bdata': base64.b64encode(np.ascontiguousarray(values).tobytes()).decode('ascii')}
+
+
+def figure_payload(fig: go.Figure) -> dict:
+    """
+    Plotly JSON-compatible dict of a figure with compact, shared x arrays.
+
+    Encodes like compact_figure, but builds the dict directly (no figure validation)
+    and stores identical date arrays once under 'arrays'; each trace refers to its
+    array as {'ref': key} and the chart page decodes every shared array once.
+    """
+    layout = fig.layout.to_plotly_json()
+    data = []
+    arrays = {}
+    keys = {}
+    for trace in fig.data:
+        props = trace.to_plotly_json()
+        if trace.type in ('scatter', 'scattergl', 'bar') and trace.x is not None:
+            x_ms = _epoch_ms(trace.x)
+            if x_ms is not None:
+                spec = _typed_array(x_ms)
+                key = keys.setdefault(spec['bdata'], str(len(keys)))
+                arrays[key] = spec
+                props['x'] = {'ref': key}
+                layout.setdefault('xaxis' + (trace.xaxis or 'x')[1:], {})['type'] = 'date'
+            if trace.y is not None:
+                y = _compact_values(trace.y)
+                if y is not None:
+                    props['y'] = _typed_array(y)
+        data.append(props)
+    return {'data': data, 'layout': layout, 'arrays': arrays}
+
+
+def figure_payload_json(fig: go.Figure) -> str:
+    """Serialize figure_payload(fig) for the chart page's renderFigure()"""
+    return json.dumps(figure_payload(fig), cls=PlotlyJSONEncoder, separators=(',', ':'))
+
+
+def _changed_from(old: np.ndarray, new: np.ndarray) -> int:
+    """Length of the common prefix of two arrays (values equal within float noise, NaN == NaN)"""
+    n = min(len(old), len(new))
+    if old.dtype.kind == 'f' or new.dtype.kind == 'f':
+        same = np.isclose(old[:n], new[:n], rtol=1e-9, atol=1e-12, equal_nan=True)
+    else:
+        same = old[:n] == new[:n]
+    differs = np.flatnonzero(~same)
+    return int(differs[0]) if differs.size else n
+
+
+def figure_tail(old: go.Figure, new: go.Figure) -> dict:
+    """
+    What changed from one version of a figure to the next, when only the end of its line traces did.
+
+    This is the case when an analysis is rerun with prices for more recent days:
+    the traces keep their earlier points and gain (or revise) the last ones.
+
+    Returns:
+        None unless both figures have the same layout and traces, apart from the x/y
+        data of date-axis scatter traces and trace names. Otherwise {'indices': [...],
+        'keep': [...], 'x': [[...]], 'y': [[...]], 'names': {index: name}}: for each
+        changed trace, the number of leading points to keep and the epoch-millisecond x
+        and y values replacing the rest (NaN as None), plus the traces renamed (e.g.
+        legends showing the latest return)
+    """
+    if len(old.data) != len(new.data) or old.layout.to_plotly_json() != new.layout.to_plotly_json():
+        return None
+    tail = {'indices': [], 'keep': [], 'x': [], 'y': [], 'names': {}}
+    for i, (old_trace, new_trace) in enumerate(zip(old.data, new.data)):
+        if old_trace.type != new_trace.type:
+            return None
+        old_props, new_props = old_trace.to_plotly_json(), new_trace.to_plotly_json()
+        old_x, new_x = old_props.pop('x', None), new_props.pop('x', None)
+        old_y, new_y = old_props.pop('y', None), new_props.pop('y', None)
+        if old_props.pop('name', None) != new_props.get('name'):
+            tail['names'][i] = new_props.get('name')
+        new_props.pop('name', None)
+        if json.dumps(old_props, cls=PlotlyJSONEncoder, sort_keys=True) != \
+                json.dumps(new_props, cls=PlotlyJSONEncoder, sort_keys=True):
+            return None
+        if old_x is None and new_x is None and old_y is None and new_y is None:
+            continue
+        if old_trace.type not in ('scatter', 'scattergl') or old_x is None or new_x is None:
+            return None
+        old_x, new_x = _epoch_ms(old_x), _epoch_ms(new_x)
+        old_y, new_y = np.asarray(old_y), np.asarray(new_y)
+        if old_x is None or new_x is None or old_y.dtype.kind not in 'fiu' or new_y.dtype.kind not in 'fiu' \
+                or len(old_x) != len(old_y) or len(new_x) != len(new_y):
+            return None
+        old_y, new_y = old_y.astype(np.float64), new_y.astype(np.float64)
+        keep = min(_changed_from(old_x, new_x), _changed_from(old_y, new_y))
+        if keep == len(old_x) == len(new_x):
+            continue
+        tail['indices'].append(i)
+        tail['keep'].append(keep)
+        tail['x'].append(new_x[keep:].tolist())
+        tail['y'].append([None if np.isnan(v) else v for v in new_y[keep:].tolist()])
+    return tail
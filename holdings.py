@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+SMIC Portfolio Analysis Holdings Engine
+Turns the transaction log into daily units held per ticker
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def resolve_sector_key(sector, sector_etfs: Dict[str, str], sector_map: Dict[str, str]) -> Optional[str]:
+    """
+    Map a transaction's sector name to a key of sector_etfs.
+
+    Tries the explicit sector_map first, then the name with underscores replaced by
+    spaces, then the first ETF sector sharing the same leading word.
+    """
+    sector = str(sector)
+    sector_key = sector_map.get(sector)
+    if not sector_key:
+        sec_clean = sector.replace('_', ' ')
+        if sec_clean in sector_etfs:
+            sector_key = sec_clean
+        else:
+            first = sector.split('_')[0]
+            for v_key in sector_etfs.keys():
+                if v_key.startswith(first):
+                    sector_key = v_key
+                    break
+    return sector_key
+
+
+def transaction_deltas(transactions: pd.DataFrame, px: pd.DataFrame, sector_etfs: Dict[str, str],
+                       sector_map: Dict[str, str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict]:
+    """
+    Unit changes caused by each transaction, as sparse (row, column, units) entries.
+
+    ETF and Fixed_Income purchases add units directly. A stock purchase is a swap:
+    the stock is bought and the same dollar amount of its sector ETF is sold.
+    Every transaction is placed at its nearest trading day.
+
+    Args:
+        transactions: Transaction log (sector, ticker, invest_date, amount_invested, optional shares)
+        px: Daily prices indexed by trading day with one column per ticker
+        sector_etfs: Mapping of sector key to sector ETF ticker
+        sector_map: Mapping of transaction sector name to sector key
+
+    Returns:
+        rows, cols, units (np.ndarray): Positions in px and unit changes of every entry
+        transaction_dates (dict): {sector_key: {date: [ticker, ...]}} for stock entries
+    """
+    dates = px.index
+    tickers = px.columns
+    prices = px.to_numpy(dtype=float)
+    df = transactions.sort_values('invest_date', kind='stable')
+
+    # Nearest trading day and price column for every transaction at once
+    row_pos = dates.get_indexer(pd.DatetimeIndex(df['invest_date']), method='nearest')
+    ticker_arr = df['ticker'].to_numpy(dtype=object)
+    sector_arr = df['sector'].to_numpy(dtype=object)
+    col_pos = tickers.get_indexer(ticker_arr)
+    usd = pd.to_numeric(df['amount_invested'], errors='coerce').to_numpy(dtype=float)
+    if 'shares' in df.columns:
+        shares = pd.to_numeric(df['shares'], errors='coerce').to_numpy(dtype=float)
+    else:
+        shares = np.zeros(len(df))
+    has_shares = shares > 0
+
+    # Cash is handled separately; skip rows without a usable amount or price column
+    valid = ((sector_arr != 'Cash') & (ticker_arr != 'CASH') & (usd > 0)
+             & (col_pos >= 0) & (row_pos >= 0))
+    safe_rows = np.where(row_pos >= 0, row_pos, 0)
+    price = prices[safe_rows, np.where(col_pos >= 0, col_pos, 0)]
+
+    # Initial ETFs or Fixed Income
+    is_direct = np.isin(ticker_arr, list(sector_etfs.values())) | (sector_arr == 'Fixed_Income')
+    direct = valid & is_direct
+    with np.errstate(divide='ignore', invalid='ignore'):
+        direct_units = np.where(has_shares, shares, usd / price)
+
+    # Stock purchase = swap from ETF
+    sector_keys = {s: resolve_sector_key(s, sector_etfs, sector_map) for s in pd.unique(sector_arr)}
+    sector_etf_pos = {s: tickers.get_loc(sector_etfs[k]) if k in sector_etfs and sector_etfs[k] in tickers else -1
+                      for s, k in sector_keys.items()}
+    row_keys = pd.Series(sector_arr).map(sector_keys).to_numpy(dtype=object)
+    etf_pos = pd.Series(sector_arr).map(sector_etf_pos).to_numpy(dtype=int)
+    swap = valid & ~is_direct & (etf_pos >= 0)
+    price_ok = ~np.isnan(price) & (price > 0)
+    bought = swap & (has_shares | price_ok)
+    etf_price = prices[safe_rows, np.where(etf_pos >= 0, etf_pos, 0)]
+    sold = bought & ~np.isnan(etf_price) & (etf_price > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stock_units = np.where(has_shares, shares, usd / price)
+        etf_units = -usd / etf_price
+
+    delta_rows = np.concatenate([row_pos[direct], row_pos[bought], row_pos[sold]])
+    delta_cols = np.concatenate([col_pos[direct], col_pos[bought], etf_pos[sold]])
+    delta_vals = np.concatenate([direct_units[direct], stock_units[bought], etf_units[sold]])
+    finite = np.isfinite(delta_vals)
+
+    # Track transaction dates with ticker info by sector (for stock entries only, not ETFs)
+    # Structure: {sector: {date: [ticker1, ticker2, ...]}}
+    transaction_dates = {}
+    date_codes, entry_dates = pd.factorize(pd.DatetimeIndex(df['invest_date'].to_numpy()[swap]).normalize())
+    entry_dates = list(entry_dates)
+    for sector_key, code, ticker in zip(row_keys[swap].tolist(), date_codes.tolist(), ticker_arr[swap].tolist()):
+        transaction_dates.setdefault(sector_key, {}).setdefault(entry_dates[code], []).append(ticker)
+
+    return delta_rows[finite], delta_cols[finite], delta_vals[finite], transaction_dates
+
+
+def build_units(transactions: pd.DataFrame, px: pd.DataFrame, sector_etfs: Dict[str, str],
+                sector_map: Dict[str, str]) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Build daily units held per ticker from the transaction log.
+
+    The entries of transaction_deltas() go into a (date x ticker) delta matrix and
+    units are the cumulative sum of that matrix.
+
+    Args:
+        transactions: Transaction log (sector, ticker, invest_date, amount_invested, optional shares)
+        px: Daily prices indexed by trading day with one column per ticker
+        sector_etfs: Mapping of sector key to sector ETF ticker
+        sector_map: Mapping of transaction sector name to sector key
+
+    Returns:
+        units (pd.DataFrame): Units held, same shape as px
+        transaction_dates (dict): {sector_key: {date: [ticker, ...]}} for stock entries
+    """
+    rows, cols, vals, transaction_dates = transaction_deltas(transactions, px, sector_etfs, sector_map)
+    delta = np.zeros(px.shape)
+    np.add.at(delta, (rows, cols), vals)
+    units = pd.DataFrame(np.cumsum(delta, axis=0, out=delta), index=px.index, columns=px.columns)
+    return units, transaction_dates
+
+
+def build_membership(transactions: pd.DataFrame, tickers, sector_etfs: Dict[str, str],
+                     sector_map: Dict[str, str]) -> pd.DataFrame:
+    """
+    Build the ticker -> group incidence matrix used to aggregate holdings values.
+
+    Columns are '<sector>_ETF' and '<sector>_Stocks' for every sector in sector_map
+    that has a sector ETF, followed by 'Fixed Income'. A ticker is counted once per
+    group however many transactions it has, so all group market values come out of
+    one matrix product: values (date x ticker) @ membership (ticker x group).
+
+    Args:
+        transactions: Transaction log (sector, ticker, ...)
+        tickers: Tickers of the holdings value frame (rows of the matrix)
+        sector_etfs: Mapping of sector key to sector ETF ticker
+        sector_map: Mapping of transaction sector name to sector key
+
+    Returns:
+        DataFrame of 0/1 floats indexed by ticker with one column per group
+    """
+    tickers = pd.Index(tickers)
+    sector_tickers = transactions.groupby('sector')['ticker'].unique()
+
+    groups = {}
+    for sector_name, v_key in sector_map.items():
+        if v_key in sector_etfs:
+            etf = sector_etfs[v_key]
+            groups[f'{sector_name}_ETF'] = [etf]
+            groups[f'{sector_name}_Stocks'] = [t for t in sector_tickers.get(sector_name, []) if t != etf]
+    groups['Fixed Income'] = list(sector_tickers.get('Fixed_Income', []))
+
+    membership = np.zeros((len(tickers), len(groups)))
+    for j, members in enumerate(groups.values()):
+        rows = tickers.get_indexer(members)
+        membership[rows[rows >= 0], j] = 1.0
+    return pd.DataFrame(membership, index=tickers, columns=list(groups))
+
+
+def _merge_transaction_dates(transaction_dates: Dict, new_dates: Dict) -> Dict:
+    """Add new {sector_key: {date: [ticker, ...]}} entries, keeping each sector's dates in order"""
+    merged = {}
+    for sector_key in list(transaction_dates) + [k for k in new_dates if k not in transaction_dates]:
+        entries = {date: list(tickers) for date, tickers in transaction_dates.get(sector_key, {}).items()}
+        for date, tickers in new_dates.get(sector_key, {}).items():
+            entries.setdefault(date, []).extend(tickers)
+        merged[sector_key] = dict(sorted(entries.items()))
+    return merged
+
+
+class PortfolioHoldings:
+    """
+    Units, market values and group values of a transaction log over a price frame.
+
+    Built once with build(); when transactions are appended, append() updates only
+    the rows from the first new transaction's trading day onward and only the
+    columns it touches (the bought ticker, the sector ETF it is swapped from) plus
+    the group aggregates, instead of rebuilding every ticker's history. When the
+    price frame gains trading days at the end, extend_prices() adds just those rows.
+    """
+
+    def __init__(self, transactions: pd.DataFrame, px: pd.DataFrame, units: np.ndarray,
+                 membership: pd.DataFrame, transaction_dates: Dict):
+        self.transactions = transactions
+        self.px = px
+        self.membership = membership
+        self.transaction_dates = transaction_dates
+        self._prices = px.to_numpy(dtype=float)
+        self._units = units
+        self._values = self._market_values(units, self._prices)
+        self._group_values = self._values @ membership.to_numpy()
+        self._invested = self._values.sum(axis=1)
+
+    @staticmethod
+    def _market_values(units: np.ndarray, prices: np.ndarray) -> np.ndarray:
+        values = units * prices
+        values[np.isnan(values)] = 0.0
+        return values
+
+    @classmethod
+    def build(cls, transactions: pd.DataFrame, px: pd.DataFrame, sector_etfs: Dict[str, str],
+              sector_map: Dict[str, str]) -> 'PortfolioHoldings':
+        """Holdings of a full transaction log (see build_units and build_membership)"""
+        rows, cols, vals, transaction_dates = transaction_deltas(transactions, px, sector_etfs, sector_map)
+        units = np.zeros(px.shape)
+        np.add.at(units, (rows, cols), vals)
+        np.cumsum(units, axis=0, out=units)
+        membership = build_membership(transactions, px.columns, sector_etfs, sector_map)
+        return cls(transactions, px, units, membership, transaction_dates)
+
+    @property
+    def units(self) -> pd.DataFrame:
+        """Units held per ticker (date x ticker)"""
+        return pd.DataFrame(self._units.copy(), index=self.px.index, columns=self.px.columns)
+
+    @property
+    def holdings_value(self) -> pd.DataFrame:
+        """Market value per ticker (date x ticker), 0 where there is no price"""
+        return pd.DataFrame(self._values.copy(), index=self.px.index, columns=self.px.columns)
+
+    @property
+    def group_values(self) -> pd.DataFrame:
+        """Market value per membership group (date x group)"""
+        return pd.DataFrame(self._group_values.copy(), index=self.px.index, columns=self.membership.columns)
+
+    @property
+    def invested_value(self) -> pd.Series:
+        """Total market value of all holdings per date"""
+        return pd.Series(self._invested.copy(), index=self.px.index)
+
+    def extends(self, transactions: pd.DataFrame, px: pd.DataFrame) -> bool:
+        """
+        Whether transactions/px can be reached with extend_prices() and append(): the
+        transaction log is this one with rows added at the end, and px is this price
+        frame, possibly with rows added at the end.
+
+        New price rows are only accepted while every current transaction is dated on or
+        before the last current trading day; later ones would move to a new trading day.
+        """
+        n, m = len(self.transactions), len(self.px)
+        if not (len(transactions) >= n
+                and list(transactions.columns) == list(self.transactions.columns)
+                and transactions.iloc[:n].reset_index(drop=True).equals(self.transactions.reset_index(drop=True))
+                and len(px) >= m and px.columns.equals(self.px.columns)
+                and px.index[:m].equals(self.px.index) and px.iloc[:m].equals(self.px)):
+            return False
+        if len(px) == m:
+            return True
+        return m > 0 and (n == 0 or pd.to_datetime(self.transactions['invest_date']).max() <= self.px.index[-1])
+
+    def extend_prices(self, px: pd.DataFrame):
+        """
+        Add the trading days px has beyond the current price frame (see extends).
+
+        No transaction falls on the new days, so their units are the last day's units.
+        """
+        m = len(self.px)
+        if len(px) == m:
+            return
+        prices = px.to_numpy(dtype=float)
+        units = np.repeat(self._units[-1:], len(px) - m, axis=0)
+        values = self._market_values(units, prices[m:])
+        self.px = px
+        self._prices = prices
+        self._units = np.concatenate([self._units, units])
+        self._values = np.concatenate([self._values, values])
+        self._group_values = np.concatenate([self._group_values, values @ self.membership.to_numpy()])
+        self._invested = np.concatenate([self._invested, values.sum(axis=1)])
+
+    def append(self, new_transactions: pd.DataFrame, sector_etfs: Dict[str, str], sector_map: Dict[str, str]):
+        """
+        Add transactions in place, recomputing only what they change.
+
+        Args:
+            new_transactions: Rows appended to the transaction log, same columns
+            sector_etfs: Mapping of sector key to sector ETF ticker
+            sector_map: Mapping of transaction sector name to sector key
+        """
+        if new_transactions.empty:
+            return
+        rows, cols, vals, new_dates = transaction_deltas(new_transactions, self.px, sector_etfs, sector_map)
+
+        # Groups are unions of tickers, so adding rows can only switch memberships on
+        old_membership = self.membership.to_numpy()
+        membership = np.maximum(old_membership, build_membership(
+            new_transactions, self.px.columns, sector_etfs, sector_map).to_numpy())
+        regrouped = np.flatnonzero((membership != old_membership).any(axis=1))
+
+        touched = np.union1d(cols, regrouped).astype(int)
+        if len(touched):
+            # A ticker that changed groups moves its whole history; otherwise only rows from the first new entry change
+            first = 0 if len(regrouped) else int(rows.min())
+            old_values = self._values[first:, touched]
+
+            delta = np.zeros((len(self.px) - first, len(touched)))
+            np.add.at(delta, (rows - first, np.searchsorted(touched, cols)), vals)
+            self._units[first:, touched] += np.cumsum(delta, axis=0)
+            new_values = self._market_values(self._units[first:, touched], self._prices[first:, touched])
+            self._values[first:, touched] = new_values
+
+            self._group_values[first:] += new_values @ membership[touched] - old_values @ old_membership[touched]
+            self._invested[first:] += (new_values - old_values).sum(axis=1)
+
+        self.membership = pd.DataFrame(membership, index=self.membership.index, columns=self.membership.columns)
+        self.transaction_dates = _merge_transaction_dates(self.transaction_dates, new_dates)
+        self.transactions = pd.concat([self.transactions, new_transactions], ignore_index=True)
+
+
+class HoldingsCache:
+    """
+    Keeps the holdings of the last analyzed transaction log.
+
+    When the next analysis runs with transactions appended to that log, on the same
+    prices or with trading days added at their end, its holdings are updated with
+    PortfolioHoldings.extend_prices() and append() instead of being rebuilt from scratch.
+    """
+
+    def __init__(self):
+        self.holdings = None
+        # 'full' or 'incremental', for the last get() call
+        self.last_update = None
+
+    def get(self, transactions: pd.DataFrame, px: pd.DataFrame, sector_etfs: Dict[str, str],
+            sector_map: Dict[str, str]) -> PortfolioHoldings:
+        """Holdings of transactions over px, updated incrementally when possible"""
+        holdings = self.holdings
+        if holdings is not None and holdings.extends(transactions, px):
+            self.holdings = None
+            holdings.extend_prices(px)
+            holdings.append(transactions.iloc[len(holdings.transactions):], sector_etfs, sector_map)
+            self.last_update = 'incremental'
+        else:
+            holdings = PortfolioHoldings.build(transactions, px, sector_etfs, sector_map)
+            self.last_update = 'full'
+        self.holdings = holdings
+        return holdings
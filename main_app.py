@@ -6,24 +6,34 @@ Professional desktop application with PySide6 and Plotly
 
 import sys
 import os
+import time
+
+# Startup is timed from here, before the Qt imports (see MainWindow.record_startup_time)
+STARTUP_STARTED = time.perf_counter()
+
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QLineEdit, QTextEdit, QDateEdit, QTabWidget,
     QMessageBox, QFileDialog, QComboBox
 )
-from PySide6.QtWebEngineWidgets import QWebEngineView
-from PySide6.QtCore import Qt, QDate, QUrl, QCoreApplication
+from PySide6.QtCore import Qt, QDate, QCoreApplication, QObject, QRunnable, QThread, QThreadPool, QTimer, Signal, Slot
 from PySide6.QtGui import QFont
-import pandas as pd
 from datetime import datetime
 
-# Import our analysis core
+# Import our analysis core lazily: analysis_core pulls in pandas, plotly and yfinance,
+# and chart_view starts Chromium, so both are imported when first needed
 try:
-    from analysis_core import generate_portfolio_analysis, generate_comparison_plot
-except ImportError:
-    print("Error: analysis_core.py not found. Make sure it's in the same directory.")
+    from figure_names import FIGURE_NAMES
+    from profiling import add_stage, format_run_stats
+    from transactions_store import append_transaction
+except ImportError as e:
+    print(f"Error: could not import the application modules ({e}). "
+          "Make sure they are in the same directory as main_app.py.")
     sys.exit(1)
 
+# Ledger used by the form and the analysis: a CSV, or a SQLite database (.db) for large ledgers
+TRANSACTIONS_FILE = os.environ.get('SMIC_TRANSACTIONS_FILE', 'data/transactions.csv')
+
 
 class TransactionForm(QWidget):
     """Widget for adding new transactions"""
@@ -142,21 +152,9 @@ class TransactionForm(QWidget):
             'amount_invested': float(amount)
         }
         
-        # Check if CSV exists
-        csv_file = 'data/transactions.csv'
-        if os.path.exists(csv_file):
-            df = pd.read_csv(csv_file)
-        else:
-            # Create new DataFrame with headers
-            df = pd.DataFrame(columns=['sector', 'ticker', 'invest_date', 'shares', 
-                                      'purchase_price', 'amount_invested'])
-        
-        # Append new row
-        df = pd.concat([df, pd.DataFrame([row_data])], ignore_index=True)
-        
-        # Save to CSV
+        # Append the row to the ledger (created with headers if missing); the file is not re-read
         try:
-            df.to_csv(csv_file, index=False)
+            append_transaction(row_data, TRANSACTIONS_FILE)
             QMessageBox.information(self, "Success", 
                                   f"Transaction saved successfully!\n\n"
                                   f"Sector: {sector}\n"
@@ -177,15 +175,337 @@ class TransactionForm(QWidget):
         self.amount_input.clear()
 
 
+class AnalysisWorker(QObject):
+    """Runs the portfolio analysis and the first chart's JSON serialization off the GUI thread"""
+    
+    progress = Signal(str)
+    # Results computed from the cached prices, delivered before the prices are refreshed
+    preliminary = Signal(object)
+    finished = Signal(object)
+    failed = Signal(str)
+    cancelled = Signal()
+    # Problems that do not stop the analysis (shown in the status bar)
+    warning = Signal(str)
+    
+    # Status label text for each analysis stage
+    STAGE_LABELS = {
+        'download': 'Downloading prices...',
+        'cached_prices': 'Loading cached prices...',
+        'refresh': 'Refreshing prices...',
+        'holdings': 'Building holdings...',
+        'weights': 'Calculating weights...',
+        'stats': 'Calculating statistics...',
+        'figures': 'Building charts...',
+        'render': 'Rendering charts...'
+    }
+    
+    def __init__(self, transactions_file, first_chart=None, save_snapshot=True, holdings_cache=None,
+                 stale_while_revalidate=True):
+        super().__init__()
+        self.transactions_file = transactions_file
+        # Holdings of the previous run, updated incrementally when transactions were only appended
+        self.holdings_cache = holdings_cache
+        # Chart rendered before results are delivered (the visible chart tab)
+        self.first_chart = first_chart
+        # Persist the results so the next start can show them immediately (see SnapshotLoader)
+        self.save_snapshot = save_snapshot
+        # When the cached prices are out of date, deliver results from them before downloading
+        self.stale_while_revalidate = stale_while_revalidate
+        self._cancel_requested = False
+    
+    def cancel(self):
+        """Request cancellation; takes effect at the next stage checkpoint"""
+        self._cancel_requested = True
+    
+    def checkpoint(self, stage):
+        """Report a stage and stop if cancellation was requested"""
+        if self._cancel_requested:
+            from analysis_core import AnalysisCancelled
+            raise AnalysisCancelled(stage)
+        self.progress.emit(stage)
+    
+    @Slot()
+    def run(self):
+        try:
+            # Heavy imports happen here, on the worker thread, the first time an analysis runs
+            from analysis_core import AnalysisCancelled, cached_prices_stale, load_transactions
+            from holdings import HoldingsCache
+        except Exception as e:
+            self.failed.emit(f"Could not load the analysis modules: {e}")
+            return
+        
+        try:
+            # Hash the inputs before the run so a file edited meanwhile is not recorded as analyzed
+            transactions_digest = None
+            if self.save_snapshot:
+                from snapshots import transactions_hash
+                transactions_digest = transactions_hash(self.transactions_file)
+        
+            if self.holdings_cache is None:
+                self.holdings_cache = HoldingsCache()
+            # Loaded once for the staleness check and both analysis passes
+            transactions = load_transactions(self.transactions_file)
+        
+            # Stale-while-revalidate: show results from the cached prices, then refresh them
+            download_stage = 'download'
+            if self.stale_while_revalidate and cached_prices_stale(transactions):
+                download_stage = 'refresh'
+                try:
+                    self.preliminary.emit(self.analyze(transactions, cached_prices_only=True,
+                                                       download_stage='cached_prices'))
+                except AnalysisCancelled:
+                    raise
+                except Exception as e:
+                    # Only a preview - the run with refreshed prices below reports real errors
+                    self.warning.emit(f"Could not analyze with cached prices: {e}")
+        
+            results = self.analyze(transactions, download_stage=download_stage)
+            self.finished.emit(results)
+        except AnalysisCancelled:
+            self.cancelled.emit()
+            return
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        
+        if transactions_digest is not None:
+            self.write_snapshot(transactions_digest, *results)
+    
+    def analyze(self, transactions, cached_prices_only=False, download_stage='download'):
+        """
+        Run the analysis and serialize the first chart
+        
+        Args:
+            transactions: Transactions loaded from transactions_file
+            cached_prices_only: Use the cached prices without downloading
+            download_stage: Stage reported while the prices are loaded (see STAGE_LABELS)
+        
+        Returns:
+            Results tuple as delivered by the finished signal
+        """
+        from analysis_core import generate_portfolio_analysis
+        from downsample import DEFAULT_MAX_POINTS, downsample_figure
+        from figure_payload import figure_payload_json
+        
+        def progress(stage):
+            self.checkpoint(download_stage if stage == 'download' else stage)
+        
+        # Figures are built lazily: only the visible chart is built here, the rest on demand
+        report_text, figures, summary_df, ytd_df, returns_data = generate_portfolio_analysis(
+            self.transactions_file, progress_callback=progress, lazy_figures=True,
+            holdings_cache=self.holdings_cache, cached_prices_only=cached_prices_only,
+            transactions=transactions)
+        
+        # Build and serialize the first chart here so the GUI thread only pushes its JSON
+        self.checkpoint('render')
+        render_started = time.perf_counter()
+        chart_json = {}
+        if self.first_chart in figures:
+            fig = figures[self.first_chart]
+            chart_json[self.first_chart] = figure_payload_json(downsample_figure(fig, DEFAULT_MAX_POINTS))
+        
+        add_stage(returns_data.get('run_stats'), 'render', time.perf_counter() - render_started)
+        
+        return report_text, figures, chart_json, summary_df, ytd_df, returns_data
+    
+    def write_snapshot(self, transactions_digest, report_text, figures, chart_json, summary_df, ytd_df, returns_data):
+        """Save the results as the warm-start snapshot (after they were delivered)"""
+        try:
+            from analysis_core import price_data_version
+            from snapshots import SnapshotStore, snapshot_key
+            # The price version is taken after the run, once the cache holds the prices it used
+            price_version = price_data_version()
+            SnapshotStore().save(
+                snapshot_key(transactions_digest, price_version), self.transactions_file, price_version,
+                report_text, summary_df, ytd_df, returns_data,
+                figure_inputs=figures.inputs, figure_json=chart_json)
+        except Exception as e:
+            # Snapshots only speed up the next start; never fail an analysis over one
+            self.warning.emit(f"Could not save analysis snapshot: {e}")
+
+
+class SnapshotLoader(QObject):
+    """Loads the last saved analysis results off the GUI thread at startup"""
+    
+    # (results tuple as delivered by AnalysisWorker.finished, snapshot metadata, inputs unchanged)
+    loaded = Signal(object, object, bool)
+    done = Signal()
+    
+    def __init__(self, transactions_file, first_chart=None):
+        super().__init__()
+        self.transactions_file = transactions_file
+        self.first_chart = first_chart
+    
+    @Slot()
+    def run(self):
+        try:
+            if not os.path.exists(self.transactions_file):
+                return
+            from analysis_core import build_analysis_figures, price_data_version
+            from snapshots import SnapshotStore, snapshot_key, transactions_hash
+            
+            store = SnapshotStore()
+            meta = store.latest(self.transactions_file)
+            snapshot = store.load(meta['key']) if meta is not None else None
+            if snapshot is None:
+                return
+            current_key = snapshot_key(transactions_hash(self.transactions_file), price_data_version())
+            
+            figures = build_analysis_figures(**snapshot['figure_inputs'], lazy=True)
+            chart_json = {name: fig_json for name, fig_json in snapshot['figure_json'].items() if name in figures}
+            # Build the visible chart here, as the analysis worker does
+            for name in list(chart_json) + [self.first_chart]:
+                if name in figures:
+                    figures.build(name)
+            
+            results = (snapshot['report_text'], figures, chart_json,
+                       snapshot['summary_df'], snapshot['ytd_df'], snapshot['returns_data'])
+            self.loaded.emit(results, snapshot['meta'], meta['key'] == current_key)
+        except Exception as e:
+            # An unreadable snapshot just means a cold start
+            print(f"Warning: could not load analysis snapshot: {e}")
+        finally:
+            self.done.emit()
+
+
+class LazyChartView(QWidget):
+    """
+    Placeholder for a ChartView that creates the web view the first time it is shown
+    
+    Each ChartView starts Chromium renderer infrastructure, so views in tabs the user
+    never opens are never created. Figures set before then are kept (only the latest)
+    and drawn once the view exists.
+    """
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.view = None
+        self._pending = None
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.ensure_view()
+    
+    def ensure_view(self):
+        """Create the ChartView (if needed) and draw any pending figure"""
+        if self.view is None:
+            from chart_view import ChartView
+            self.view = ChartView(self)
+            self.layout().addWidget(self.view)
+            if self._pending is not None:
+                method, args = self._pending
+                self._pending = None
+                getattr(self.view, method)(*args)
+        return self.view
+    
+    def set_figure(self, fig):
+        """Display a Plotly figure (see ChartView.set_figure)"""
+        if self.view is None:
+            self._pending = ('set_figure', (fig,))
+        else:
+            self.view.set_figure(fig)
+    
+    def set_figure_json(self, fig_json, figure=None):
+        """Display a serialized figure (see ChartView.set_figure_json)"""
+        if self.view is None:
+            self._pending = ('set_figure_json', (fig_json, figure))
+        else:
+            self.view.set_figure_json(fig_json, figure=figure)
+    
+    def update_figure(self, fig, fig_json=None):
+        """Display a new version of the figure on display (see ChartView.update_figure)"""
+        if self.view is None:
+            self._pending = ('set_figure', (fig,)) if fig_json is None else ('set_figure_json', (fig_json, fig))
+        else:
+            self.view.update_figure(fig, fig_json=fig_json)
+
+
+class ChartRenderTask(QRunnable):
+    """Builds and serializes one analysis chart on the thread pool"""
+    
+    def __init__(self, figures, fig_name, rendered, failed):
+        super().__init__()
+        self.figures = figures
+        self.fig_name = fig_name
+        # Signals of the window: (figures, name, figure, JSON) and (figures, name, error)
+        self.rendered = rendered
+        self.failed = failed
+    
+    def run(self):
+        try:
+            from downsample import DEFAULT_MAX_POINTS, downsample_figure
+            from figure_payload import figure_payload_json
+            fig = self.figures[self.fig_name]
+            fig_json = figure_payload_json(downsample_figure(fig, DEFAULT_MAX_POINTS))
+        except Exception as e:
+            self.failed.emit(self.figures, self.fig_name, str(e))
+            return
+        self.rendered.emit(self.figures, self.fig_name, fig, fig_json)
+
+
+class ComparisonPrewarmTask(QRunnable):
+    """Builds every comparison figure for the current result in the background"""
+    
+    def __init__(self, cache):
+        super().__init__()
+        self.cache = cache
+    
+    def run(self):
+        try:
+            self.cache.prewarm()
+        except Exception:
+            # Prewarming is best effort; figures are built on demand otherwise
+            pass
+
+
 class MainWindow(QMainWindow):
     """Main application window"""
     
+    # Analysis charts built and serialized by ChartRenderTask, delivered to the GUI thread
+    chart_rendered = Signal(object, str, object, object)
+    chart_render_failed = Signal(object, str, str)
+    
+    # Build all comparison figures in the background after each analysis
+    PREWARM_COMPARISONS = True
+    # Delay between rendering hidden chart tabs after the visible one is shown
+    IDLE_RENDER_DELAY_MS = 50
+    
     def __init__(self):
         super().__init__()
         # Store dataframes for export
         self.summary_df = None
         self.ytd_df = None
         self.returns_data = None
+        # Comparison figures memoized per (comparison type, sector, period); created with the first result
+        self.comparison_cache = None
+        self.shown_comparison = None
+        # Holdings of the last analysis, reused when transactions are appended (see holdings.HoldingsCache)
+        self.holdings_cache = None
+        # Analysis charts of the last result and the ones not rendered yet
+        self.figures = None
+        self.pending_charts = []
+        # Drawn charts (and the comparison selection) showing an earlier version of the current
+        # result, updated in place when next rendered
+        self.updated_charts = set()
+        self.updated_comparison = None
+        # Last price date of results shown from cached prices while the analysis refreshes them
+        self.cached_prices_as_of = None
+        self.idle_render_timer = QTimer(self)
+        self.idle_render_timer.setSingleShot(True)
+        self.idle_render_timer.setInterval(self.IDLE_RENDER_DELAY_MS)
+        self.idle_render_timer.timeout.connect(self.render_next_pending_chart)
+        self.chart_rendered.connect(self.on_chart_rendered)
+        self.chart_render_failed.connect(self.on_chart_render_failed)
+        # Background analysis thread and worker (None when idle)
+        self.analysis_thread = None
+        self.analysis_worker = None
+        # Startup snapshot loading thread and loader (None when idle)
+        self.snapshot_thread = None
+        self.snapshot_loader = None
+        # Seconds from process start (main_app import) to the first event loop pass after show()
+        self.startup_seconds = None
         self.init_ui()
         
     def init_ui(self):
@@ -236,6 +556,11 @@ class MainWindow(QMainWindow):
         self.run_button.clicked.connect(self.run_analysis)
         controls_layout.addWidget(self.run_button)
         
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_analysis)
+        self.cancel_button.setEnabled(False)  # Enabled only while analysis runs
+        controls_layout.addWidget(self.cancel_button)
+        
         # Export buttons
         self.export_summary_button = QPushButton("Export Summary CSV")
         self.export_summary_button.clicked.connect(self.export_summary)
@@ -273,32 +598,40 @@ class MainWindow(QMainWindow):
         right_panel.addWidget(QLabel("Interactive Charts:"))
         
         chart_tabs = QTabWidget()
+        self.chart_tabs = chart_tabs
         
         # Sector Allocation Chart
-        self.sector_chart_view = QWebEngineView()
+        self.sector_chart_view = LazyChartView()
         self.sector_chart_view.setMinimumSize(600, 500)
         chart_tabs.addTab(self.sector_chart_view, "Sector Allocation")
         
         # Performance Chart
-        self.performance_chart_view = QWebEngineView()
+        self.performance_chart_view = LazyChartView()
         self.performance_chart_view.setMinimumSize(600, 500)
         chart_tabs.addTab(self.performance_chart_view, "Performance")
         
         # ETF vs Stocks (Area)
-        self.etf_chart_view = QWebEngineView()
+        self.etf_chart_view = LazyChartView()
         self.etf_chart_view.setMinimumSize(600, 500)
         chart_tabs.addTab(self.etf_chart_view, "ETF vs Stocks (Time)")
         
         # ETF vs Stocks (Bar)
-        self.bar_chart_view = QWebEngineView()
+        self.bar_chart_view = LazyChartView()
         self.bar_chart_view.setMinimumSize(600, 500)
         chart_tabs.addTab(self.bar_chart_view, "ETF vs Stocks (Final)")
         
         # Weight Drift
-        self.drift_chart_view = QWebEngineView()
+        self.drift_chart_view = LazyChartView()
         self.drift_chart_view.setMinimumSize(600, 500)
         chart_tabs.addTab(self.drift_chart_view, "Weight Drift")
         
+        # Charts are rendered when their tab is first shown (see render_chart)
+        self.chart_views = dict(zip(FIGURE_NAMES, [
+            self.sector_chart_view, self.performance_chart_view, self.etf_chart_view,
+            self.bar_chart_view, self.drift_chart_view
+        ]))
+        chart_tabs.currentChanged.connect(self.on_chart_tab_changed)
+        
         right_panel.addWidget(chart_tabs)
         results_split.addLayout(right_panel, 1)
         
@@ -343,7 +676,7 @@ class MainWindow(QMainWindow):
         layout.addLayout(controls_layout)
         
         # Chart view
-        self.comparison_chart_view = QWebEngineView()
+        self.comparison_chart_view = LazyChartView()
         self.comparison_chart_view.setMinimumSize(1200, 700)
         layout.addWidget(self.comparison_chart_view)
         
@@ -379,99 +712,295 @@ class MainWindow(QMainWindow):
             else:  # "YTD (Year to Date)"
                 period = "YTD"
             
-            # Generate plot with transaction dates
-            transaction_dates = self.returns_data.get('transaction_dates', {})
-            fig = generate_comparison_plot(
-                self.returns_data,
-                sector=sector,
-                comparison_type=comparison_type,
-                period=period,
-                transaction_dates=transaction_dates
-            )
+            # Skip redraws when the effective selection did not change
+            key = (self.comparison_cache.version, self.comparison_cache.key(comparison_type, sector, period))
+            if key == self.shown_comparison:
+                return
             
-            # Display plot
-            html = fig.to_html(include_plotlyjs='cdn')
-            self.comparison_chart_view.setHtml(html, QUrl())
-            QApplication.processEvents()
+            # Display plot (built once per selection and analysis result)
+            if key[1] == self.updated_comparison:
+                # Same selection with refreshed prices - send only the changed end of the lines
+                self.comparison_chart_view.update_figure(self.comparison_cache.get(comparison_type, sector, period))
+            else:
+                fig_json = self.comparison_cache.get_json(comparison_type, sector, period)
+                fig = self.comparison_cache.get(comparison_type, sector, period)
+                self.comparison_chart_view.set_figure_json(fig_json, figure=fig)
+            self.updated_comparison = None
+            self.shown_comparison = key
             
         except Exception as e:
             QMessageBox.warning(self, "Plot Update Error", 
                               f"Could not update comparison plot: {str(e)}")
     
     def run_analysis(self):
-        """Run the portfolio analysis"""
+        """Start the portfolio analysis on a background thread"""
+        if self.analysis_thread is not None:
+            return
+        
+        # Check if transaction file exists
+        if not os.path.exists(TRANSACTIONS_FILE):
+            QMessageBox.warning(self, "File Not Found", 
+                              f"Transaction file not found: {TRANSACTIONS_FILE}\n\n"
+                              "Please add transactions first.")
+            self.status_label.setText("Status: Error - No transaction file")
+            self.status_label.setStyleSheet("color: red; font-weight: bold;")
+            return
+        
         self.status_label.setText("Status: Running analysis...")
         self.status_label.setStyleSheet("color: orange; font-weight: bold;")
         self.run_button.setEnabled(False)
-        QApplication.processEvents()
+        self.cancel_button.setEnabled(True)
         
-        try:
-            # Check if transaction file exists
-            if not os.path.exists('data/transactions.csv'):
-                QMessageBox.warning(self, "File Not Found", 
-                                  "Transaction file not found: data/transactions.csv\n\n"
-                                  "Please add transactions first.")
-                self.status_label.setText("Status: Error - No transaction file")
-                self.status_label.setStyleSheet("color: red; font-weight: bold;")
-                self.run_button.setEnabled(True)
-                return
-            
-            # Run analysis
-            report_text, figures, summary_df, ytd_df, returns_data = generate_portfolio_analysis('data/transactions.csv')
-            
-            # Store dataframes and returns data for export
-            self.summary_df = summary_df
-            self.ytd_df = ytd_df
-            self.returns_data = returns_data
-            self.export_summary_button.setEnabled(True)
-            self.export_ytd_button.setEnabled(True)
-            
-            # Update sector dropdown with available sectors
-            if returns_data and 'sector_returns' in returns_data:
-                available_sectors = list(returns_data['sector_returns'].keys())
-                self.sector_combo.clear()
-                self.sector_combo.addItems(available_sectors)
-            
-            # Display report
-            self.report_text.setPlainText(report_text)
-            
-            # Display charts - ensure they load properly
-            chart_views = {
-                'sector_allocation': self.sector_chart_view,
-                'performance': self.performance_chart_view,
-                'etf_vs_stocks': self.etf_chart_view,
-                'bar_comparison': self.bar_chart_view,
-                'weight_drift': self.drift_chart_view
-            }
-            
-            for fig_name, chart_view in chart_views.items():
-                if fig_name in figures:
-                    try:
-                        html = figures[fig_name].to_html(include_plotlyjs='cdn')
-                        # Use setHtml with empty QUrl for CDN resources (CDN loads via HTTP)
-                        chart_view.setHtml(html, QUrl())
-                        QApplication.processEvents()  # Allow GUI to update
-                    except Exception as e:
-                        # Silently continue if one chart fails, but log it
-                        QMessageBox.warning(self, "Chart Load Warning", 
-                                          f"Could not load {fig_name} chart: {str(e)}")
-            
-            self.status_label.setText("Status: Analysis complete!")
+        self.analysis_thread = QThread(self)
+        self.analysis_worker = AnalysisWorker(TRANSACTIONS_FILE, first_chart=self.current_chart_name(),
+                                              holdings_cache=self.holdings_cache)
+        self.analysis_worker.moveToThread(self.analysis_thread)
+        self.analysis_thread.started.connect(self.analysis_worker.run)
+        self.analysis_worker.progress.connect(self.on_analysis_progress)
+        self.analysis_worker.preliminary.connect(self.on_analysis_preliminary)
+        self.analysis_worker.finished.connect(self.on_analysis_finished)
+        self.analysis_worker.failed.connect(self.on_analysis_failed)
+        self.analysis_worker.cancelled.connect(self.on_analysis_cancelled)
+        self.analysis_worker.warning.connect(self.on_analysis_warning)
+        for signal in (self.analysis_worker.finished, self.analysis_worker.failed, self.analysis_worker.cancelled):
+            signal.connect(self.analysis_thread.quit)
+        self.analysis_thread.finished.connect(self.on_analysis_thread_finished)
+        self.analysis_thread.start()
+    
+    def cancel_analysis(self):
+        """Ask the running analysis to stop at its next checkpoint"""
+        if self.analysis_worker is not None:
+            self.analysis_worker.cancel()
+            self.cancel_button.setEnabled(False)
+            self.status_label.setText("Status: Cancelling...")
+            self.status_label.setStyleSheet("color: orange; font-weight: bold;")
+    
+    def on_analysis_progress(self, stage):
+        """Show the current analysis stage in the status label"""
+        if self.analysis_worker is not None and self.cancel_button.isEnabled():
+            label = AnalysisWorker.STAGE_LABELS.get(stage, stage)
+            if self.cached_prices_as_of is not None:
+                label += f" (showing prices as of {self.cached_prices_as_of})"
+            self.status_label.setText(f"Status: {label}")
+    
+    def load_snapshot(self):
+        """Show the last saved results, if any, while checking whether they are still current"""
+        if self.snapshot_thread is not None or self.analysis_thread is not None:
+            return
+        
+        self.snapshot_thread = QThread(self)
+        self.snapshot_loader = SnapshotLoader(TRANSACTIONS_FILE, first_chart=self.current_chart_name())
+        self.snapshot_loader.moveToThread(self.snapshot_thread)
+        self.snapshot_thread.started.connect(self.snapshot_loader.run)
+        self.snapshot_loader.loaded.connect(self.on_snapshot_loaded)
+        self.snapshot_loader.done.connect(self.snapshot_thread.quit)
+        self.snapshot_thread.finished.connect(self.on_snapshot_thread_finished)
+        self.snapshot_thread.start()
+    
+    def on_snapshot_loaded(self, results, meta, current):
+        """Display saved results, then rerun the analysis if its inputs changed since"""
+        # A run started (or finished) meanwhile supersedes the snapshot
+        if self.analysis_thread is not None or self.returns_data is not None:
+            return
+        
+        self.show_results(results)
+        if current:
+            self.status_label.setText(f"Status: Showing saved results ({meta['created'].replace('T', ' ')})")
             self.status_label.setStyleSheet("color: green; font-weight: bold;")
-            
-            # Update comparison plot if returns data is available
-            if self.returns_data is not None:
-                self.update_comparison_plot()
-            
+        else:
+            # Transactions or price data changed - keep the saved results visible while updating
+            self.run_analysis()
+    
+    def on_snapshot_thread_finished(self):
+        """Release the snapshot loading thread"""
+        self.snapshot_loader.deleteLater()
+        self.snapshot_thread.deleteLater()
+        self.snapshot_loader = None
+        self.snapshot_thread = None
+    
+    def on_analysis_preliminary(self, results):
+        """Display results computed from the cached prices while the worker refreshes them"""
+        self.show_results(results)
+        self.cached_prices_as_of = results[5].get('prices_as_of')
+        self.status_label.setText(f"Status: Showing prices as of {self.cached_prices_as_of} - refreshing prices...")
+        self.status_label.setStyleSheet("color: orange; font-weight: bold;")
+    
+    def on_analysis_finished(self, results):
+        """Display results delivered by the analysis worker"""
+        # After a preliminary result only the changed end of each chart is redrawn
+        self.show_results(results, update=self.cached_prices_as_of is not None)
+        self.cached_prices_as_of = None
+        self.status_label.setText("Status: Analysis complete!")
+        self.status_label.setStyleSheet("color: green; font-weight: bold;")
+    
+    def show_results(self, results, update=False):
+        """
+        Display an analysis result (from the analysis worker or a saved snapshot)
+        
+        Args:
+            results: Results tuple as delivered by AnalysisWorker.finished
+            update: The result is a newer version of the one on display (same charts with
+                more recent prices); drawn charts are updated in place, keeping their zoom
+        """
+        report_text, figures, chart_json, summary_df, ytd_df, returns_data = results
+        
+        # Store dataframes and returns data for export
+        self.summary_df = summary_df
+        self.ytd_df = ytd_df
+        self.returns_data = returns_data
+        if self.comparison_cache is None:
+            from analysis_core import ComparisonFigureCache
+            from downsample import DEFAULT_MAX_POINTS
+            self.comparison_cache = ComparisonFigureCache(max_points=DEFAULT_MAX_POINTS)
+        self.comparison_cache.set_returns_data(returns_data)
+        self.export_summary_button.setEnabled(True)
+        self.export_ytd_button.setEnabled(True)
+        
+        # Update sector dropdown with available sectors (without redrawing for every item)
+        if returns_data and 'sector_returns' in returns_data:
+            available_sectors = list(returns_data['sector_returns'].keys())
+            selected_sector = self.sector_combo.currentText()
+            self.sector_combo.blockSignals(True)
+            self.sector_combo.clear()
+            self.sector_combo.addItems(available_sectors)
+            if update and selected_sector in available_sectors:
+                self.sector_combo.setCurrentText(selected_sector)
+            self.sector_combo.blockSignals(False)
+        
+        # Display report with the run timing section
+        run_stats = format_run_stats(returns_data.get('run_stats'))
+        self.report_text.setPlainText(report_text + ("\n\n" + run_stats if run_stats else ""))
+        
+        # Display the chart rendered by the worker; the others follow when shown or when idle
+        drawn = [name for name in FIGURE_NAMES if self.figures is not None and name in self.figures
+                 and name not in self.pending_charts]
+        self.figures = figures
+        self.pending_charts = [name for name in FIGURE_NAMES if name in figures]
+        self.updated_charts = {name for name in drawn if name in figures} if update else set()
+        self.updated_comparison = self.shown_comparison[1] if update and self.shown_comparison else None
+        for fig_name, fig_json in chart_json.items():
+            if fig_name not in self.updated_charts:
+                self.render_chart(fig_name, fig_json)
+        self.render_chart(self.current_chart_name())
+        self.idle_render_timer.start()
+        
+        # Update comparison plot if returns data is available
+        if self.returns_data is not None:
+            self.update_comparison_plot()
+            if self.PREWARM_COMPARISONS:
+                QThreadPool.globalInstance().start(ComparisonPrewarmTask(self.comparison_cache))
+    
+    def current_chart_name(self):
+        """Figure name of the visible chart tab"""
+        return FIGURE_NAMES[self.chart_tabs.currentIndex()]
+    
+    def render_chart(self, fig_name, fig_json=None):
+        """
+        Draw one analysis chart if it has not been drawn for the current result
+        
+        Without fig_json the figure is built and serialized by a ChartRenderTask and
+        drawn when it is done (see on_chart_rendered).
+        """
+        if fig_name not in self.pending_charts:
+            return
+        self.pending_charts.remove(fig_name)
+        if fig_json is None:
+            QThreadPool.globalInstance().start(ChartRenderTask(
+                self.figures, fig_name, self.chart_rendered, self.chart_render_failed))
+            return
+        self.on_chart_rendered(self.figures, fig_name, self.figures[fig_name], fig_json)
+    
+    def on_chart_rendered(self, figures, fig_name, fig, fig_json):
+        """Push a chart built for the current result into its view and start on the next one"""
+        if figures is not self.figures:
+            # Built for a result that has been replaced since
+            return
+        chart_view = self.chart_views[fig_name]
+        try:
+            # Redraw in the view's persistent page (plotly.js is loaded locally once)
+            if fig_name in self.updated_charts:
+                self.updated_charts.discard(fig_name)
+                chart_view.update_figure(fig, fig_json=fig_json)
+            else:
+                chart_view.set_figure_json(fig_json, figure=fig)
         except Exception as e:
-            error_msg = f"Error running analysis:\n\n{str(e)}"
-            QMessageBox.critical(self, "Analysis Error", error_msg)
-            self.status_label.setText("Status: Error occurred")
+            self.on_chart_render_failed(figures, fig_name, str(e))
+            return
+        if self.pending_charts:
+            self.idle_render_timer.start()
+    
+    def on_chart_render_failed(self, figures, fig_name, message):
+        """Report a chart that could not be drawn"""
+        if figures is not self.figures:
+            return
+        if self.pending_charts:
+            self.idle_render_timer.start()
+        # Silently continue if one chart fails, but log it
+        QMessageBox.warning(self, "Chart Load Warning", 
+                          f"Could not load {fig_name} chart: {message}")
+    
+    def on_chart_tab_changed(self, index):
+        """Render a chart tab the first time it is shown"""
+        if 0 <= index < len(FIGURE_NAMES):
+            self.render_chart(FIGURE_NAMES[index])
+    
+    def render_next_pending_chart(self):
+        """Render one hidden chart per idle tick; the next tick starts when it is drawn"""
+        if self.pending_charts:
+            self.render_chart(self.pending_charts[0])
+    
+    def on_analysis_failed(self, message):
+        """Report an analysis error"""
+        error_msg = f"Error running analysis:\n\n{message}"
+        if self.cached_prices_as_of is not None:
+            # Keep the results from the cached prices on display
+            QMessageBox.warning(self, "Price Refresh Error", error_msg)
+            self.status_label.setText(f"Status: Price refresh failed - showing prices as of {self.cached_prices_as_of}")
             self.status_label.setStyleSheet("color: red; font-weight: bold;")
-            self.report_text.setPlainText(error_msg)
-        
-        finally:
-            self.run_button.setEnabled(True)
+            return
+        QMessageBox.critical(self, "Analysis Error", error_msg)
+        self.status_label.setText("Status: Error occurred")
+        self.status_label.setStyleSheet("color: red; font-weight: bold;")
+        self.report_text.setPlainText(error_msg)
+    
+    def on_analysis_warning(self, message):
+        """Show a problem the analysis continued past"""
+        self.statusBar().showMessage(f"Warning: {message}", 10000)
+    
+    def on_analysis_cancelled(self):
+        """Report that the analysis was cancelled"""
+        self.status_label.setText("Status: Analysis cancelled")
+        self.status_label.setStyleSheet("color: gray; font-weight: bold;")
+    
+    def on_analysis_thread_finished(self):
+        """Release the worker thread and re-enable the controls"""
+        self.holdings_cache = self.analysis_worker.holdings_cache
+        self.analysis_worker.deleteLater()
+        self.analysis_thread.deleteLater()
+        self.analysis_worker = None
+        self.analysis_thread = None
+        self.cached_prices_as_of = None
+        self.run_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+    
+    def closeEvent(self, event):
+        """Stop a running analysis before the window closes"""
+        if self.analysis_thread is not None:
+            self.analysis_worker.cancel()
+            self.analysis_thread.quit()
+            self.analysis_thread.wait()
+        if self.snapshot_thread is not None:
+            self.snapshot_thread.quit()
+            self.snapshot_thread.wait()
+        # Stops any comparison prewarm still running
+        if self.comparison_cache is not None:
+            self.comparison_cache.clear()
+        super().closeEvent(event)
+    
+    def record_startup_time(self):
+        """Record startup time; called on the first event loop pass after the window is shown"""
+        self.startup_seconds = time.perf_counter() - STARTUP_STARTED
+        self.statusBar().showMessage(f"Started in {self.startup_seconds:.2f} s", 5000)
     
     def open_transaction_file(self):
         """Open a different transaction file"""
@@ -523,10 +1052,17 @@ def main():
     # Disable hardware acceleration to avoid Vulkan/GPU errors in WSL/headless environments
     # Must set attributes BEFORE creating QApplication
     QCoreApplication.setAttribute(Qt.AA_UseSoftwareOpenGL, True)
+    # Required because QtWebEngineWidgets is imported after the QApplication exists (lazy chart views)
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts, True)
     
     os.environ['QT_QUICK_BACKEND'] = 'software'
     os.environ['QTWEBENGINE_DISABLE_SANDBOX'] = '1'
     
+    # --startup-time prints the startup time and exits (for measuring builds)
+    report_startup = '--startup-time' in sys.argv
+    if report_startup:
+        sys.argv.remove('--startup-time')
+    
     # Additional flags to disable GPU acceleration
     if '--disable-gpu' not in sys.argv:
         sys.argv.append('--disable-gpu')
@@ -536,6 +1072,12 @@ def main():
     
     window = MainWindow()
     window.show()
+    QTimer.singleShot(0, window.record_startup_time)
+    if report_startup:
+        QTimer.singleShot(0, lambda: (print(f"Startup time: {window.startup_seconds:.3f} s"), app.quit()))
+    else:
+        # Warm start: show the last results as soon as the window is up
+        QTimer.singleShot(0, window.load_snapshot)
     
     sys.exit(app.exec())
 
@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+"""
+SMIC Portfolio Analysis Price Data Module
+Pluggable Adj Close price providers (Yahoo Finance, local fixture files) and a
+local per-ticker cache so repeated analyses only ask the provider for date
+ranges that were not fetched before
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+# Parquet is preferred for the cache files; fall back to CSV when no engine is installed
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = 'parquet'
+except ImportError:
+    CACHE_FORMAT = 'csv'
+
+# Cache lives in the user's home directory so it also works for the packaged executable
+DEFAULT_CACHE_DIR = os.environ.get(
+    'SMIC_PRICE_CACHE',
+    os.path.join(os.path.expanduser('~'), '.smic_portfolio', 'price_cache')
+)
+
+# Order of fetch statuses from best to worst (see PriceProvider.last_status)
+STATUS_SEVERITY = {'cached': 0, 'empty': 1, 'ok': 2, 'failed': 3}
+
+
+# Error of a ticker the provider answered for without any prices
+NO_DATA_ERROR = 'no data returned'
+
+
+def merge_fetch_status(status: Dict[str, Dict], new_status: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Merge per-ticker fetch statuses into status, keeping each ticker's worst outcome"""
+    for ticker, ticker_status in new_status.items():
+        current = status.get(ticker)
+        if current is None or STATUS_SEVERITY[ticker_status['status']] >= STATUS_SEVERITY[current['status']]:
+            status[ticker] = ticker_status
+    return status
+
+
+def _ticker_filename(ticker: str, file_format: str) -> str:
+    """File name used for a ticker's price file (shared by the cache and file fixtures)"""
+    safe_name = re.sub(r'[^A-Za-z0-9._^-]', '_', ticker)
+    return f'{safe_name}.{file_format}'
+
+
+class PriceProvider(ABC):
+    """
+    Base class for price sources.
+
+    Subclasses implement fetch(tickers, start, end) and return Adj Close prices
+    as a DataFrame indexed by date with one column per ticker, sorted by ticker.
+    Tickers that could not be fetched are left out of the frame; fetch() then sets
+    last_status to {ticker: {'status': ..., ...}} with status 'ok', 'empty' (no
+    trading days requested), 'cached' or 'failed' (plus 'error' and 'attempts').
+    """
+
+    name = 'base'
+    # Whether results should be stored in the local PriceCache
+    cacheable = True
+    # Per-ticker outcome of the last fetch() (replaced on every call, never mutated)
+    last_status: Dict[str, Dict] = {}
+
+    @abstractmethod
+    def fetch(self, tickers: List[str], start, end) -> pd.DataFrame:
+        """
+        Fetch Adj Close prices.
+
+        Args:
+            tickers: List of ticker symbols
+            start: First date to fetch (inclusive)
+            end: Last date to fetch (exclusive)
+
+        Returns:
+            DataFrame indexed by date with one column per ticker
+        """
+
+    def fetch_ranges(self, requests: Dict[Tuple, List[str]]) -> Dict[Tuple, pd.DataFrame]:
+        """
+        Fetch several date ranges, each for its own tickers.
+
+        The default calls fetch() once per range; providers override it to fetch
+        the ranges together. last_status covers all ranges (worst outcome per ticker).
+
+        Args:
+            requests: {(start, end): [ticker, ...]}
+
+        Returns:
+            {(start, end): DataFrame as returned by fetch()}
+        """
+        frames, status = {}, {}
+        for (start, end), tickers in requests.items():
+            frames[(start, end)] = self.fetch(tickers, start, end)
+            merge_fetch_status(status, self.last_status)
+        self.last_status = status
+        return frames
+
+    def data_version(self) -> str:
+        """
+        Identifier that changes whenever the prices this provider returns may change.
+
+        Live sources gain a trading day every day, so the default is the provider
+        name and today's date.
+        """
+        return f"{self.name}:{pd.Timestamp.now():%Y-%m-%d}"
+
+
+class YFinanceProvider(PriceProvider):
+    """
+    Adj Close prices downloaded from Yahoo Finance.
+
+    The tickers are split into chunks downloaded concurrently on a small thread
+    pool. Tickers that raise or come back without data are retried with
+    exponential backoff; any still missing after the last attempt are reported as
+    'failed' in last_status and left out, so the other tickers are still returned.
+    """
+
+    name = 'yfinance'
+    CHUNK_SIZE = 50
+    MAX_WORKERS = 4
+    RETRIES = 2
+    # Seconds before the first retry, doubled for each further one
+    RETRY_BACKOFF = 1.0
+
+    def __init__(self, chunk_size: int = None, max_workers: int = None, retries: int = None,
+                 retry_backoff: float = None):
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self.retries = self.RETRIES if retries is None else retries
+        self.retry_backoff = self.RETRY_BACKOFF if retry_backoff is None else retry_backoff
+
+    def _download(self, tickers: List[str], start, end) -> pd.DataFrame:
+        # Chunks already run in parallel, so yfinance's own per-ticker threads are turned off
+        data = yf.download(tickers, start=start, end=end, progress=False, auto_adjust=False,
+                           threads=False)['Adj Close']
+        if isinstance(data, pd.Series):
+            data = data.to_frame(name=tickers[0])
+        return data
+
+    def _fetch_chunk(self, tickers: List[str], start, end) -> Tuple[Dict[str, pd.Series], Dict[str, Dict]]:
+        """Download one chunk, retrying the tickers still missing; returns (columns, status)"""
+        columns, status = {}, {}
+        pending, error = list(tickers), None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            try:
+                data, error = self._download(pending, start, end), None
+            except Exception as e:
+                data, error = None, str(e) or type(e).__name__
+            missing = []
+            for ticker in pending:
+                series = data[ticker] if data is not None and ticker in data.columns else None
+                if series is not None and series.notna().any():
+                    columns[ticker] = series
+                    status[ticker] = {'status': 'ok', 'attempts': attempt + 1}
+                else:
+                    missing.append(ticker)
+            pending = missing
+            if not pending:
+                break
+        for ticker in pending:
+            status[ticker] = {'status': 'failed', 'attempts': self.retries + 1,
+                              'error': error or NO_DATA_ERROR}
+        return columns, status
+
+    def fetch(self, tickers: List[str], start, end) -> pd.DataFrame:
+        return self.fetch_ranges({(start, end): tickers})[(start, end)]
+
+    def fetch_ranges(self, requests: Dict[Tuple, List[str]]) -> Dict[Tuple, pd.DataFrame]:
+        """Download every range's chunks on one thread pool (see PriceProvider.fetch_ranges)"""
+        status = {}
+        tasks = []
+        for (start, end), tickers in requests.items():
+            tickers = list(dict.fromkeys(tickers))
+            if len(pd.bdate_range(pd.Timestamp(start), pd.Timestamp(end) - pd.Timedelta(days=1))) == 0:
+                # Weekend-only range: nothing to download (and nothing to retry)
+                merge_fetch_status(status, {ticker: {'status': 'empty'} for ticker in tickers})
+                continue
+            for i in range(0, len(tickers), self.chunk_size):
+                tasks.append(((start, end), tickers[i:i + self.chunk_size]))
+
+        columns = {rng: {} for rng in requests}
+        if tasks:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(tasks)))) as pool:
+                results = list(pool.map(
+                    lambda task: self._fetch_chunk(task[1], pd.Timestamp(task[0][0]), pd.Timestamp(task[0][1])),
+                    tasks))
+            for (rng, _), (chunk_columns, chunk_status) in zip(tasks, results):
+                columns[rng].update(chunk_columns)
+                merge_fetch_status(status, chunk_status)
+        self.last_status = status
+
+        frames = {}
+        for rng, range_columns in columns.items():
+            px = pd.DataFrame(range_columns)
+            px = px.reindex(columns=sorted(px.columns))
+            px.index = pd.DatetimeIndex(px.index, name='Date')
+            frames[rng] = px.sort_index()
+        return frames
+
+
+class FilePriceProvider(PriceProvider):
+    """
+    Adj Close prices read from local fixture files, for offline runs and benchmarks.
+
+    The path is either a single wide CSV/Parquet file (a Date column plus one column
+    per ticker) or a directory with one CSV/Parquet file per ticker, the same layout
+    PriceCache writes.
+    """
+
+    name = 'file'
+    cacheable = False
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Price fixture not found: {path}")
+        self.path = path
+        self._wide = None
+        self._columns = {}
+
+    @staticmethod
+    def _read_file(path: str) -> pd.DataFrame:
+        if path.endswith('.parquet'):
+            frame = pd.read_parquet(path)
+            if not isinstance(frame.index, pd.DatetimeIndex):
+                frame = frame.set_index(frame.columns[0])
+        else:
+            frame = pd.read_csv(path, index_col=0, parse_dates=True)
+        frame.index = pd.DatetimeIndex(frame.index)
+        frame.index.name = 'Date'
+        return frame.sort_index()
+
+    def _ticker_series(self, ticker: str) -> Optional[pd.Series]:
+        if os.path.isfile(self.path):
+            if self._wide is None:
+                self._wide = self._read_file(self.path)
+            return self._wide[ticker] if ticker in self._wide.columns else None
+        if ticker not in self._columns:
+            series = None
+            for file_format in ('parquet', 'csv'):
+                file_path = os.path.join(self.path, _ticker_filename(ticker, file_format))
+                if os.path.exists(file_path):
+                    series = self._read_file(file_path).iloc[:, 0].rename(ticker)
+                    break
+            self._columns[ticker] = series
+        return self._columns[ticker]
+
+    def data_version(self) -> str:
+        """Fixture path plus the size and modification time of its file(s)"""
+        paths = [self.path]
+        if os.path.isdir(self.path):
+            paths = sorted(os.path.join(self.path, name) for name in os.listdir(self.path))
+        stats = [(os.path.basename(p), os.path.getsize(p), os.path.getmtime(p)) for p in paths if os.path.isfile(p)]
+        digest = hashlib.sha256(json.dumps(stats).encode()).hexdigest()[:16]
+        return f"{self.name}:{os.path.abspath(self.path)}:{digest}"
+
+    def fetch(self, tickers: List[str], start, end) -> pd.DataFrame:
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        columns, status = {}, {}
+        for ticker in tickers:
+            series = self._ticker_series(ticker)
+            if series is not None:
+                columns[ticker] = series.loc[(series.index >= start) & (series.index < end)]
+                status[ticker] = {'status': 'ok'}
+            else:
+                status[ticker] = {'status': 'failed', 'error': 'not in price fixture'}
+        self.last_status = status
+        px = pd.DataFrame(columns).sort_index()
+        px = px.reindex(columns=sorted(px.columns))
+        px.index.name = 'Date'
+        return px
+
+
+def get_price_provider(source=None) -> PriceProvider:
+    """
+    Resolve a price source to a provider.
+
+    Args:
+        source: A PriceProvider, None or 'yfinance' for Yahoo Finance, or a path
+            to a fixture file/directory for FilePriceProvider
+    """
+    if isinstance(source, PriceProvider):
+        return source
+    if source is None or source == YFinanceProvider.name:
+        return YFinanceProvider()
+    return FilePriceProvider(source)
+
+
+class PriceCache(PriceProvider):
+    """
+    On-disk Adj Close cache with one file per ticker, wrapping another provider.
+
+    A manifest records the half-open date range [start, end) already requested for
+    each ticker, so a ticker with no trading days in a range is not asked for again.
+
+    Adj Close is re-adjusted over the whole history after every split and dividend,
+    so extending a ticker also re-fetches OVERLAP_DAYS of its cached range. If the
+    overlapping prices no longer match, the ticker's cache is discarded and its full
+    range downloaded again, instead of joining two adjustment bases.
+
+    A ticker with nothing cached that the provider returns no prices for, while it
+    does return others (a delisted or placeholder symbol), is recorded in the
+    manifest as failed until FAILED_RETRY_DAYS later and not requested before then.
+    """
+
+    MANIFEST_FILE = 'manifest.json'
+    OVERLAP_DAYS = 7
+    FAILED_RETRY_DAYS = 7
+    # Relative difference above which cached and re-fetched prices are on different bases
+    ADJUSTMENT_TOLERANCE = 1e-6
+    name = 'cache'
+    cacheable = False
+
+    def __init__(self, provider: PriceProvider = None, cache_dir: str = None):
+        self.provider = provider or YFinanceProvider()
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.cache_dir, self.MANIFEST_FILE)
+
+    def _load_manifest(self) -> Dict:
+        try:
+            with open(self._manifest_path(), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        tmp_path = self._manifest_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _ticker_path(self, ticker: str) -> str:
+        return os.path.join(self.cache_dir, _ticker_filename(ticker, CACHE_FORMAT))
+
+    def _read_ticker(self, ticker: str) -> pd.Series:
+        path = self._ticker_path(ticker)
+        if CACHE_FORMAT == 'parquet':
+            frame = pd.read_parquet(path)
+        else:
+            frame = pd.read_csv(path, index_col=0, parse_dates=True)
+        series = frame.iloc[:, 0] if not frame.empty else pd.Series(dtype=float)
+        series.index = pd.DatetimeIndex(series.index)
+        series.name = ticker
+        return series
+
+    def _write_ticker(self, ticker: str, series: pd.Series):
+        path = self._ticker_path(ticker)
+        tmp_path = path + '.tmp'
+        frame = series.rename('adj_close').to_frame()
+        frame.index.name = 'Date'
+        if CACHE_FORMAT == 'parquet':
+            frame.to_parquet(tmp_path)
+        else:
+            frame.to_csv(tmp_path)
+        os.replace(tmp_path, path)
+
+    def coverage(self, ticker: str) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """Return the cached [start, end) range for a ticker, or None if not cached"""
+        entry = self.manifest.get(ticker)
+        if not entry or 'start' not in entry or not os.path.exists(self._ticker_path(ticker)):
+            return None
+        return pd.Timestamp(entry['start']), pd.Timestamp(entry['end'])
+
+    def failed_until(self, ticker: str) -> Optional[pd.Timestamp]:
+        """Date until which a ticker the provider returned no prices for is not requested again, or None"""
+        entry = self.manifest.get(ticker) or {}
+        if 'failed_until' not in entry or pd.Timestamp(entry['failed_until']) <= pd.Timestamp.now().normalize():
+            return None
+        return pd.Timestamp(entry['failed_until'])
+
+    def known_failures(self, requests: Dict[Tuple, List[str]]) -> Dict[str, Dict]:
+        """{ticker: 'failed' status} for the requested tickers recorded as failed (see failed_until)"""
+        failures = {}
+        for tickers in requests.values():
+            for ticker in tickers:
+                until = self.failed_until(ticker)
+                if until is not None:
+                    failures[ticker] = {'status': 'failed', 'error': NO_DATA_ERROR,
+                                        'retry_after': until.strftime('%Y-%m-%d')}
+        return failures
+
+    def missing_ranges(self, ticker: str, start, end) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        Return the [start, end) ranges of a request not yet covered by the cache, each
+        reaching OVERLAP_DAYS into the cached range (see _adjustment_changed)
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if start >= end or self.failed_until(ticker) is not None:
+            return []
+        covered = self.coverage(ticker)
+        if covered is None:
+            return [(start, end)]
+        cached_start, cached_end = covered
+        overlap = pd.Timedelta(days=self.OVERLAP_DAYS)
+        ranges = []
+        if start < cached_start:
+            ranges.append((start, min(cached_start + overlap, cached_end)))
+        if end > cached_end:
+            ranges.append((max(cached_end - overlap, cached_start), end))
+        return ranges
+
+    def data_version(self) -> str:
+        """Wrapped provider's version plus a digest of the cached ranges"""
+        digest = hashlib.sha256(json.dumps(self.manifest, sort_keys=True).encode()).hexdigest()[:16]
+        return f"{self.provider.data_version()}:{self.name}:{digest}"
+
+    def fetch(self, tickers: List[str], start, end) -> pd.DataFrame:
+        """Return Adj Close prices for tickers over [start, end), fetching only missing ranges"""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        return self.fetch_ranges({(start, end): tickers})[(start, end)]
+
+    def fetch_ranges(self, requests: Dict[Tuple, List[str]]) -> Dict[Tuple, pd.DataFrame]:
+        """
+        Return Adj Close prices for each {(start, end): tickers} request, fetching only missing ranges.
+
+        The ranges missing from the cache are grouped so tickers missing the same
+        range are fetched together, and all of them go to the provider in one
+        fetch_ranges() call. Tickers the provider reports as 'failed' keep their
+        cached range, so they are requested again next time while the others are stored.
+        A ticker with cached prices that comes back without data (a range of exchange
+        holidays) is 'empty' instead, and its range is recorded. Tickers recorded as
+        failed (see failed_until) are reported as 'failed' without asking the provider.
+        """
+        requests = self._normalize_requests(requests)
+        status = {}
+        for tickers in requests.values():
+            merge_fetch_status(status, {ticker: {'status': 'cached'} for ticker in tickers})
+        merge_fetch_status(status, self.known_failures(requests))
+
+        missing = self.missing_requests(requests)
+        if missing:
+            fetched_ranges = self.provider.fetch_ranges(missing)
+            provider_status = dict(self.provider.last_status)
+            for ticker, ticker_status in provider_status.items():
+                if ticker_status['status'] == 'failed' and ticker_status.get('error') == NO_DATA_ERROR \
+                        and self.coverage(ticker) is not None:
+                    provider_status[ticker] = {'status': 'empty', 'attempts': ticker_status.get('attempts')}
+            self._record_failures(provider_status)
+            merge_fetch_status(status, {ticker: provider_status.get(ticker, {'status': 'ok'})
+                                        for range_tickers in missing.values() for ticker in range_tickers})
+            readjusted = {}
+            stores = []
+            for (range_start, range_end), range_tickers in missing.items():
+                fetched = fetched_ranges.get((range_start, range_end))
+                if fetched is None:
+                    fetched = pd.DataFrame()
+                # An all-empty response usually means the provider failed, so only record
+                # coverage for the tickers known to have nothing to return
+                all_empty = fetched.dropna(how='all').empty
+                for ticker in range_tickers:
+                    ticker_status = provider_status.get(ticker, {}).get('status')
+                    if ticker_status == 'failed' or (all_empty and ticker_status != 'empty'):
+                        continue
+                    if self._adjustment_changed(ticker, fetched):
+                        covered = self.coverage(ticker)
+                        previous = readjusted.get(ticker, covered)
+                        readjusted[ticker] = (min(previous[0], range_start), max(previous[1], range_end))
+                    else:
+                        stores.append((ticker, fetched, range_start, range_end))
+            for ticker, fetched, range_start, range_end in stores:
+                if ticker not in readjusted:
+                    self._store(ticker, fetched, range_start, range_end)
+            if readjusted:
+                merge_fetch_status(status, self._refetch(readjusted))
+            self._save_manifest()
+        self.last_status = status
+        return self._read_ranges(requests)
+
+    @staticmethod
+    def _normalize_requests(requests: Dict[Tuple, List[str]]) -> Dict[Tuple, List[str]]:
+        return {(pd.Timestamp(start), pd.Timestamp(end)): list(dict.fromkeys(tickers))
+                for (start, end), tickers in requests.items()}
+
+    def missing_requests(self, requests: Dict[Tuple, List[str]]) -> Dict[Tuple, List[str]]:
+        """
+        The ranges of {(start, end): tickers} requests not covered by the cache, as
+        {(start, end): tickers} grouped so tickers missing the same range are fetched together
+        """
+        missing = {}
+        for (start, end), tickers in self._normalize_requests(requests).items():
+            for ticker in tickers:
+                for rng in self.missing_ranges(ticker, start, end):
+                    range_tickers = missing.setdefault(rng, [])
+                    if ticker not in range_tickers:
+                        range_tickers.append(ticker)
+        return missing
+
+    def fetch_cached(self, requests: Dict[Tuple, List[str]]) -> Dict[Tuple, pd.DataFrame]:
+        """
+        Like fetch_ranges(), but only return what is already cached, without asking the provider.
+
+        Ranges the cache does not cover are left out; tickers with nothing cached are
+        reported as 'failed' in last_status.
+        """
+        requests = self._normalize_requests(requests)
+        status = {}
+        for tickers in requests.values():
+            merge_fetch_status(status, {
+                ticker: {'status': 'cached'} if self.coverage(ticker) is not None
+                else {'status': 'failed', 'error': 'not cached'}
+                for ticker in tickers
+            })
+        self.last_status = status
+        return self._read_ranges(requests)
+
+    def _read_ranges(self, requests: Dict[Tuple, List[str]]) -> Dict[Tuple, pd.DataFrame]:
+        """Cached prices for normalized {(start, end): tickers} requests"""
+        frames = {}
+        for (start, end), tickers in requests.items():
+            columns = {}
+            for ticker in tickers:
+                if self.coverage(ticker) is not None:
+                    series = self._read_ticker(ticker)
+                    columns[ticker] = series.loc[(series.index >= start) & (series.index < end)]
+            px = pd.DataFrame(columns).sort_index()
+            px = px.reindex(columns=sorted(px.columns))
+            # An empty frame would otherwise have a RangeIndex that cannot be compared with dates
+            px.index = pd.DatetimeIndex(px.index, name='Date')
+            frames[(start, end)] = px
+        return frames
+
+    def _adjustment_changed(self, ticker: str, fetched: pd.DataFrame) -> bool:
+        """Whether re-fetched prices differ from the cached ones on the dates both have"""
+        if self.coverage(ticker) is None or ticker not in fetched.columns:
+            return False
+        cached = self._read_ticker(ticker)
+        new_data = fetched[ticker].dropna()
+        common = cached.index.intersection(new_data.index)
+        if common.empty:
+            return False
+        return not np.allclose(new_data.loc[common].to_numpy(dtype=float), cached.loc[common].to_numpy(dtype=float),
+                               rtol=self.ADJUSTMENT_TOLERANCE, atol=0)
+
+    def _refetch(self, ranges: Dict[str, Tuple[pd.Timestamp, pd.Timestamp]]) -> Dict[str, Dict]:
+        """Discard the cache of tickers and download {ticker: (start, end)} from scratch"""
+        requests = {}
+        for ticker, rng in ranges.items():
+            self.manifest.pop(ticker, None)
+            if os.path.exists(self._ticker_path(ticker)):
+                os.remove(self._ticker_path(ticker))
+            requests.setdefault(rng, []).append(ticker)
+        fetched_ranges = self.provider.fetch_ranges(requests)
+        provider_status = self.provider.last_status
+        for (range_start, range_end), range_tickers in requests.items():
+            fetched = fetched_ranges.get((range_start, range_end))
+            if fetched is None or fetched.dropna(how='all').empty:
+                continue
+            for ticker in range_tickers:
+                if provider_status.get(ticker, {}).get('status') != 'failed':
+                    self._store(ticker, fetched, range_start, range_end)
+        return {ticker: provider_status.get(ticker, {'status': 'ok'}) for ticker in ranges}
+
+    def _record_failures(self, provider_status: Dict[str, Dict]):
+        """Record uncached tickers the provider returned no prices for while it returned others"""
+        if not any(ticker_status['status'] == 'ok' for ticker_status in provider_status.values()):
+            # Nothing came back at all: more likely the provider is down than every ticker gone
+            return
+        failed_until = pd.Timestamp.now().normalize() + pd.Timedelta(days=self.FAILED_RETRY_DAYS)
+        for ticker, ticker_status in provider_status.items():
+            if ticker_status['status'] == 'failed' and ticker_status.get('error') == NO_DATA_ERROR \
+                    and self.coverage(ticker) is None:
+                self.manifest[ticker] = {'failed_until': failed_until.strftime('%Y-%m-%d')}
+
+    def _store(self, ticker: str, fetched: pd.DataFrame, range_start: pd.Timestamp, range_end: pd.Timestamp):
+        """Merge a fetched range of one ticker into its cache file and extend its manifest range"""
+        new_data = fetched[ticker].dropna() if ticker in fetched.columns else pd.Series(dtype=float)
+        covered = self.coverage(ticker)
+        if covered is not None:
+            existing = self._read_ticker(ticker)
+            combined = pd.concat([existing, new_data])
+            combined = combined[~combined.index.duplicated(keep='last')].sort_index()
+            new_start, new_end = min(covered[0], range_start), max(covered[1], range_end)
+        else:
+            combined = new_data.sort_index()
+            new_start, new_end = range_start, range_end
+        self._write_ticker(ticker, combined.astype(float))
+        self.manifest[ticker] = {
+            'start': new_start.strftime('%Y-%m-%d'),
+            'end': new_end.strftime('%Y-%m-%d')
+        }
+
+    def clear(self):
+        """Remove all cached prices"""
+        for ticker in list(self.manifest.keys()):
+            path = self._ticker_path(ticker)
+            if os.path.exists(path):
+                os.remove(path)
+        self.manifest = {}
+        self._save_manifest()
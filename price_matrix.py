@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+SMIC Portfolio Analysis Price Matrix Module
+The aligned business-day price matrix (dates x tickers) of the last price load,
+stored as a memory-mapped NumPy file with a JSON sidecar index so a warm start
+opens it zero-copy instead of re-reading and re-aligning per-ticker cache files
+"""
+
+import json
+import os
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Bump when the matrix layout changes; older matrices are then ignored
+MATRIX_FORMAT_VERSION = 2
+
+
+class PriceMatrixStore:
+    """
+    One price matrix on disk: a prices-<id>.npy file plus index.json naming it.
+
+    The matrix holds Adj Close prices on a business-day calendar before forward
+    filling (NaN where a ticker had no trading day or was not requested). It is
+    stored column-major, so each ticker's prices are contiguous and reading a few
+    columns only pages in those. The index records the tickers, the first date and
+    the [start, end) range each ticker was requested for, plus the version of the
+    price data it was built from; read() only answers requests the matrix covers
+    for that same version.
+
+    Every write() creates a new matrix file and then replaces the index, so the
+    index always names the matrix it describes, even with several processes writing.
+    Matrix files no longer named by the index are removed on the next write.
+    """
+
+    MATRIX_PREFIX = 'prices-'
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, matrix_dir: str, dtype: str = 'float64'):
+        self.matrix_dir = matrix_dir
+        self.dtype = np.dtype(dtype)
+        os.makedirs(self.matrix_dir, exist_ok=True)
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.matrix_dir, file_name)
+
+    def _read_index(self) -> Optional[Dict]:
+        try:
+            with open(self._path(self.INDEX_FILE), 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get('format_version') != MATRIX_FORMAT_VERSION or not os.path.exists(self._path(index['matrix_file'])):
+            return None
+        return index
+
+    def write(self, px: pd.DataFrame, ranges: Dict[str, Tuple], data_version: str):
+        """
+        Replace the stored matrix.
+
+        Args:
+            px: Prices on a business-day calendar (asfreq('B')), not forward filled
+            ranges: {ticker: (start, end)} each column was requested for
+            data_version: PriceProvider.data_version() of the source after the load
+        """
+        matrix_file = f'{self.MATRIX_PREFIX}{uuid.uuid4().hex}.npy'
+        tmp_matrix = self._path(matrix_file + '.tmp')
+        values = np.lib.format.open_memmap(tmp_matrix, mode='w+', dtype=self.dtype,
+                                           shape=px.shape, fortran_order=True)
+        values[:] = px.to_numpy(dtype=self.dtype)
+        values.flush()
+        del values
+        index = {
+            'format_version': MATRIX_FORMAT_VERSION,
+            'data_version': data_version,
+            'matrix_file': matrix_file,
+            'first_date': px.index[0].strftime('%Y-%m-%d'),
+            'rows': len(px.index),
+            'tickers': list(px.columns),
+            'ranges': {ticker: [pd.Timestamp(start).strftime('%Y-%m-%d'), pd.Timestamp(end).strftime('%Y-%m-%d')]
+                       for ticker, (start, end) in ranges.items() if ticker in px.columns}
+        }
+        tmp_index = self._path(f'{self.INDEX_FILE}.{os.getpid()}.tmp')
+        with open(tmp_index, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_matrix, self._path(matrix_file))
+        os.replace(tmp_index, self._path(self.INDEX_FILE))
+        self._remove_matrices(keep=matrix_file)
+
+    def _remove_matrices(self, keep: str = None):
+        """Delete the matrix files other than keep (skipping any still open elsewhere)"""
+        for file_name in os.listdir(self.matrix_dir):
+            if file_name.startswith(self.MATRIX_PREFIX) and file_name.endswith('.npy') and file_name != keep:
+                try:
+                    os.remove(self._path(file_name))
+                except OSError:
+                    pass
+
+    def open(self) -> Optional[pd.DataFrame]:
+        """
+        The stored matrix as a read-only DataFrame backed by the memory-mapped file.
+
+        Nothing is read until values are accessed, and then only the pages of the
+        columns used. Returns None if no matrix is stored.
+        """
+        index = self._read_index()
+        if index is None:
+            return None
+        return self._frame(index)
+
+    def _values(self, index: Dict) -> Optional[np.ndarray]:
+        try:
+            values = np.load(self._path(index['matrix_file']), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        if values.shape != (index['rows'], len(index['tickers'])):
+            return None
+        return values
+
+    @staticmethod
+    def _dates(index: Dict) -> pd.DatetimeIndex:
+        return pd.bdate_range(index['first_date'], periods=index['rows'], name='Date')
+
+    def _frame(self, index: Dict) -> Optional[pd.DataFrame]:
+        values = self._values(index)
+        if values is None:
+            return None
+        return pd.DataFrame(values, index=self._dates(index), columns=index['tickers'], copy=False)
+
+    def read(self, requests: Dict[Tuple, List[str]], data_version: str) -> Optional[pd.DataFrame]:
+        """
+        Prices for {(start, end): tickers} requests, as PriceProvider.fetch_ranges()
+        results combined with asfreq('B') would give them.
+
+        Returns:
+            The requested columns (sorted, not forward filled), or None unless every
+            ticker was stored for a range covering its request from the same data_version
+        """
+        index = self._read_index()
+        if index is None or index['data_version'] != data_version:
+            return None
+        for (start, end), tickers in requests.items():
+            for ticker in tickers:
+                stored = index['ranges'].get(ticker)
+                if stored is None or pd.Timestamp(start) < pd.Timestamp(stored[0]) or \
+                        pd.Timestamp(end) > pd.Timestamp(stored[1]):
+                    return None
+        values = self._values(index)
+        if values is None:
+            return None
+
+        # Copy only the requested columns, blanking dates outside each request so the
+        # result matches a fresh load
+        dates = self._dates(index)
+        positions = {ticker: i for i, ticker in enumerate(index['tickers'])}
+        parts = []
+        for (start, end), tickers in requests.items():
+            part = values[:, [positions[ticker] for ticker in tickers]].astype(float, copy=False)
+            part[(dates < pd.Timestamp(start)) | (dates >= pd.Timestamp(end))] = np.nan
+            parts.append(pd.DataFrame(part, index=dates, columns=tickers, copy=False))
+        px = pd.concat(parts, axis=1)
+        px = px.reindex(columns=sorted(px.columns))
+        has_data = px.notna().any(axis=1).to_numpy()
+        if not has_data.any():
+            return None
+        first, last = has_data.argmax(), len(has_data) - has_data[::-1].argmax()
+        return px.iloc[first:last]
+
+    def clear(self):
+        """Remove the stored matrix"""
+        if os.path.exists(self._path(self.INDEX_FILE)):
+            os.remove(self._path(self.INDEX_FILE))
+        self._remove_matrices()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+SMIC Portfolio Analysis Profiling Module
+Stage timers with optional cProfile and tracemalloc capture for analysis runs
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from typing import Dict, Optional
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class RunProfiler:
+    """
+    Records wall time (and optionally peak traced memory) for named pipeline stages.
+
+    Stages are sequential: starting a stage ends the previous one, which matches the
+    checkpoint style of the analysis pipeline. cProfile and tracemalloc are off by
+    default and can be enabled per run or with the SMIC_PROFILE / SMIC_TRACE_MEMORY
+    environment variables.
+    """
+
+    def __init__(self, profile: bool = None, trace_memory: bool = None, top_functions: int = 25):
+        self.profile = _env_flag('SMIC_PROFILE') if profile is None else profile
+        self.trace_memory = _env_flag('SMIC_TRACE_MEMORY') if trace_memory is None else trace_memory
+        self.top_functions = top_functions
+        self.stages = []
+        self._current = None
+        self._started = None
+        self._finished = None
+        self._profiler = None
+        self._owns_tracemalloc = False
+        self._profile_text = None
+
+    def start(self):
+        """Start the run clock and any enabled profilers"""
+        self._started = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def stage(self, name: str):
+        """End the current stage (if any) and start a new one"""
+        if self._started is None:
+            self.start()
+        self._end_stage()
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._current = (name, time.perf_counter())
+
+    def _end_stage(self):
+        if self._current is None:
+            return
+        name, started = self._current
+        entry = {'name': name, 'seconds': time.perf_counter() - started}
+        if self.trace_memory and tracemalloc.is_tracing():
+            entry['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+        self.stages.append(entry)
+        self._current = None
+
+    def finish(self):
+        """End the last stage and stop the profilers"""
+        self._end_stage()
+        if self._finished is None:
+            self._finished = time.perf_counter()
+        if self._profiler is not None:
+            self._profiler.disable()
+            stream = io.StringIO()
+            pstats.Stats(self._profiler, stream=stream).sort_stats('cumulative').print_stats(self.top_functions)
+            self._profile_text = stream.getvalue()
+            self._profiler = None
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        return self
+
+    def record(self) -> Dict:
+        """Structured timing/memory record for the run"""
+        total = 0.0
+        if self._started is not None:
+            total = (self._finished or time.perf_counter()) - self._started
+        record = {
+            'stages': [dict(s) for s in self.stages],
+            'total_seconds': total
+        }
+        peaks = [s['peak_mb'] for s in self.stages if 'peak_mb' in s]
+        if peaks:
+            record['peak_memory_mb'] = max(peaks)
+        if self._profile_text:
+            record['profile'] = self._profile_text
+        return record
+
+
+def add_stage(record: Optional[Dict], name: str, seconds: float):
+    """Add a stage timed after the run (e.g. chart rendering in the GUI) to a RunProfiler record"""
+    if not record:
+        return
+    record['stages'].append({'name': name, 'seconds': seconds})
+    record['total_seconds'] += seconds
+
+
+def format_run_stats(record: Optional[Dict]) -> str:
+    """Format a RunProfiler record as a section of the text report"""
+    if not record:
+        return ""
+    lines = []
+    lines.append(f"{'RUN TIMING':^70}")
+    lines.append("-"*70)
+    for s in record['stages']:
+        line = f"{s['name'] + ':':<19}{s['seconds']:>10.3f} s"
+        if 'peak_mb' in s:
+            line += f"   peak {s['peak_mb']:>9.1f} MB"
+        lines.append(line)
+    lines.append(f"{'Total:':<19}{record['total_seconds']:>10.3f} s")
+    if 'peak_memory_mb' in record:
+        lines.append(f"{'Peak Memory:':<19}{record['peak_memory_mb']:>10.1f} MB")
+    if record.get('profile'):
+        lines.append("")
+        lines.append(record['profile'].rstrip())
+    return "\n".join(lines)
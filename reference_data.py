@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+SMIC Portfolio Analysis Reference Data Module
+Shared, versioned pack of the reference series every analysis needs (the sector
+ETFs and the S&P 500): prices, daily returns and cumulative index levels, rebuilt
+at most once a day and reused by every portfolio and process
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from price_data import CACHE_FORMAT, PriceProvider
+
+# Bump when the pack layout changes; older packs are then rebuilt
+REFERENCE_FORMAT_VERSION = 2
+
+
+def _write_table(frame: pd.DataFrame, path: str):
+    if CACHE_FORMAT == 'parquet':
+        frame.to_parquet(path)
+    else:
+        frame.to_csv(path)
+
+
+def _read_table(path: str) -> pd.DataFrame:
+    if CACHE_FORMAT == 'parquet':
+        frame = pd.read_parquet(path)
+    else:
+        frame = pd.read_csv(path, index_col=0, parse_dates=True)
+    frame.index = pd.DatetimeIndex(frame.index, name='Date')
+    return frame
+
+
+class ReferencePack:
+    """
+    Directory of reference pack versions plus a pointer to the current one.
+
+    Each version holds prices (Adj Close on a business-day calendar, NaN where a
+    ticker did not trade), returns (daily returns of the forward filled prices),
+    levels (forward filled prices rebased to 100 at the pack start) and meta.json
+    with the [start, end) range the data covers, the end it was fetched up to and the
+    build date (None when a ticker failed, so the next read rebuilds it). A new version is written
+    alongside the old ones and made current by replacing current.json, so readers in
+    other processes never see a partial pack. Only the newest MAX_VERSIONS are kept.
+    """
+
+    CURRENT_FILE = 'current.json'
+    META_FILE = 'meta.json'
+    MAX_VERSIONS = 3
+
+    def __init__(self, tickers: List[str], pack_dir: str):
+        self.tickers = sorted(tickers)
+        self.pack_dir = pack_dir
+        os.makedirs(self.pack_dir, exist_ok=True)
+        # Meta of the version read or built last, with its prices
+        self.meta = None
+        self._prices = None
+
+    def _path(self, *names: str) -> str:
+        return os.path.join(self.pack_dir, *names)
+
+    def current(self) -> Optional[Dict]:
+        """Metadata of the current version, or None if there is no readable pack"""
+        try:
+            with open(self._path(self.CURRENT_FILE), 'r') as f:
+                version = json.load(f)['version']
+            with open(self._path(version, self.META_FILE), 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError, KeyError):
+            return None
+        if meta.get('format_version') != REFERENCE_FORMAT_VERSION or meta.get('cache_format') != CACHE_FORMAT \
+                or meta.get('tickers') != self.tickers:
+            return None
+        return meta
+
+    def needs_refresh(self, meta: Optional[Dict], start, end) -> bool:
+        """
+        Whether a version misses part of [start, end), was built before today or
+        had a ticker fail (its data may stop short of the end it was fetched up to)
+        """
+        if meta is None:
+            return True
+        today = pd.Timestamp.now().strftime('%Y-%m-%d')
+        return (meta['built'] != today or pd.Timestamp(start) < pd.Timestamp(meta['start'])
+                or pd.Timestamp(end) > pd.Timestamp(meta['fetched_end']))
+
+    def refresh(self, provider: PriceProvider, start, end) -> Tuple[Dict, Dict[str, Dict]]:
+        """
+        Build a new version covering [start, end) and make it current.
+
+        Args:
+            provider: Source of the prices, normally the PriceCache, so a rebuild only
+                downloads the days added since the last one
+
+        Returns:
+            (meta, per-ticker fetch status of the build)
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        prices = provider.fetch_ranges({(start, end): self.tickers})[(start, end)]
+        status = dict(provider.last_status)
+        prices = prices.asfreq('B') if not prices.empty else prices
+        filled = prices.ffill()
+        returns = filled.pct_change(fill_method=None)
+        levels = 100 * filled / filled.bfill().iloc[0] if not filled.empty else filled
+        # A failed ticker may have fallen back to stale cached prices, so the pack only
+        # covers up to its last date and is not stamped as built
+        failed = any(ticker_status['status'] == 'failed' for ticker_status in status.values())
+        dates = prices.dropna(how='all').index
+        data_end = min(end, dates[-1] + pd.Timedelta(days=1)) if not dates.empty else start
+
+        version = f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+        tmp_dir = self._path(version + '.tmp')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name, frame in (('prices', prices), ('returns', returns), ('levels', levels)):
+            _write_table(frame, os.path.join(tmp_dir, f'{name}.{CACHE_FORMAT}'))
+        meta = {
+            'format_version': REFERENCE_FORMAT_VERSION,
+            'version': version,
+            'built': None if failed else pd.Timestamp.now().strftime('%Y-%m-%d'),
+            'start': start.strftime('%Y-%m-%d'),
+            'end': data_end.strftime('%Y-%m-%d'),
+            'fetched_end': end.strftime('%Y-%m-%d'),
+            'tickers': self.tickers,
+            'available': list(prices.columns),
+            'cache_format': CACHE_FORMAT,
+            'data_version': provider.data_version()
+        }
+        with open(os.path.join(tmp_dir, self.META_FILE), 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_dir, self._path(version))
+
+        tmp_current = self._path(f'{self.CURRENT_FILE}.{os.getpid()}.tmp')
+        with open(tmp_current, 'w') as f:
+            json.dump({'version': version}, f)
+        os.replace(tmp_current, self._path(self.CURRENT_FILE))
+        self.meta, self._prices = meta, prices
+        self.prune()
+        return meta, status
+
+    def table(self, name: str, meta: Dict = None) -> pd.DataFrame:
+        """The 'prices', 'returns' or 'levels' table of a version (default: the current one)"""
+        meta = meta or self.current()
+        if meta is None:
+            raise FileNotFoundError(f"No reference pack in {self.pack_dir}")
+        if name == 'prices' and self.meta is not None and self.meta['version'] == meta['version']:
+            return self._prices
+        frame = _read_table(self._path(meta['version'], f'{name}.{CACHE_FORMAT}'))
+        if name == 'prices':
+            self.meta, self._prices = meta, frame
+        return frame
+
+    def read(self, requests: Dict[Tuple, List[str]], provider: PriceProvider,
+             refresh: bool = True) -> Tuple[pd.DataFrame, Dict[str, Dict]]:
+        """
+        Prices of the reference tickers among {(start, end): tickers} requests.
+
+        The pack is refreshed first when it is missing part of the requested ranges,
+        was built before today or had a ticker fail (unless refresh is False, which
+        uses any pack as is).
+
+        Returns:
+            (prices, status): the reference tickers in the pack, each blanked outside
+            its request and trimmed like a fetch_ranges() result combined with
+            asfreq('B') (not forward filled), and their fetch status
+        """
+        requests = {(pd.Timestamp(start), pd.Timestamp(end)): [t for t in tickers if t in self.tickers]
+                    for (start, end), tickers in requests.items()}
+        requests = {rng: tickers for rng, tickers in requests.items() if tickers}
+        if not requests:
+            return pd.DataFrame(), {}
+        start = min(rng[0] for rng in requests)
+        end = max(rng[1] for rng in requests)
+
+        meta = self.current()
+        status = {}
+        if refresh and self.needs_refresh(meta, start, end):
+            if meta is not None:
+                # Keep the range other portfolios asked for
+                start = min(start, pd.Timestamp(meta['start']))
+                end = max(end, pd.Timestamp(meta['fetched_end']))
+            meta, status = self.refresh(provider, start, end)
+        if meta is None:
+            return pd.DataFrame(), {}
+        prices = self.table('prices', meta)
+
+        columns = {}
+        for (start, end), tickers in requests.items():
+            in_range = (prices.index >= start) & (prices.index < end)
+            for ticker in tickers:
+                if ticker in prices.columns:
+                    columns[ticker] = prices[ticker].where(in_range)
+        if not columns:
+            return pd.DataFrame(), {}
+        px = pd.DataFrame(columns)
+        px = px.reindex(columns=sorted(px.columns))
+        has_data = px.notna().any(axis=1).to_numpy()
+        if not has_data.any():
+            return pd.DataFrame(), {}
+        first, last = has_data.argmax(), len(has_data) - has_data[::-1].argmax()
+        px = px.iloc[first:last]
+        return px, {ticker: status.get(ticker, {'status': 'cached'}) for ticker in px.columns}
+
+    def prune(self):
+        """Delete all but the MAX_VERSIONS newest versions"""
+        versions = sorted(name for name in os.listdir(self.pack_dir)
+                          if os.path.isdir(self._path(name)) and not name.endswith('.tmp'))
+        current = self.current()
+        for version in versions[:-self.MAX_VERSIONS]:
+            if current is None or version != current['version']:
+                shutil.rmtree(self._path(version), ignore_errors=True)
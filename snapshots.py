@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+SMIC Portfolio Analysis Snapshot Module
+Versioned on-disk snapshots of analysis results, keyed by the transactions file
+contents and the price data version, so the last results can be shown at startup
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from price_data import CACHE_FORMAT
+from transactions_store import SQLiteTransactionStore, is_sqlite_ledger
+
+# Bump when the snapshot layout changes; older snapshots are then ignored
+SNAPSHOT_FORMAT_VERSION = 1
+
+# Snapshots live next to the price cache so they also work for the packaged executable
+DEFAULT_SNAPSHOT_DIR = os.environ.get(
+    'SMIC_SNAPSHOT_DIR',
+    os.path.join(os.path.expanduser('~'), '.smic_portfolio', 'snapshots')
+)
+
+
+def transactions_hash(transactions_file: str) -> str:
+    """SHA-256 of a transactions file's contents (of the rows, for a SQLite ledger)"""
+    if is_sqlite_ledger(transactions_file):
+        return SQLiteTransactionStore(transactions_file, create=False).digest()
+    digest = hashlib.sha256()
+    with open(transactions_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_key(transactions_digest: str, price_version: str) -> str:
+    """Snapshot directory name for a transactions hash and price data version"""
+    raw = f"{SNAPSHOT_FORMAT_VERSION}|{transactions_digest}|{price_version}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:24]
+
+
+def _flatten(obj, series: List, frames: List) -> Dict:
+    """Collect the Series/DataFrames of nested dicts into lists; returns the JSON skeleton"""
+    if isinstance(obj, dict):
+        node = {'dict': {str(k): _flatten(v, series, frames) for k, v in obj.items()}}
+        if obj and all(isinstance(k, pd.Timestamp) for k in obj):
+            # e.g. transaction_dates: {sector: {date: [tickers]}}
+            node['timestamp_keys'] = True
+        return node
+    if isinstance(obj, pd.Series):
+        series.append(obj)
+        return {'series': len(series) - 1, 'name': obj.name, 'index_name': obj.index.name}
+    if isinstance(obj, pd.DataFrame):
+        frames.append(obj)
+        return {'frame': len(frames) - 1, 'date_index': isinstance(obj.index, pd.DatetimeIndex)}
+    return {'value': obj}
+
+
+def _unflatten(node: Dict, series: List, read_frame):
+    """Rebuild what _flatten split; read_frame(index, date_index) loads a DataFrame"""
+    if 'dict' in node:
+        convert = pd.Timestamp if node.get('timestamp_keys') else str
+        return {convert(k): _unflatten(v, series, read_frame) for k, v in node['dict'].items()}
+    if 'series' in node:
+        s = series[node['series']].rename(node['name'])
+        s.index.name = node['index_name']
+        return s
+    if 'frame' in node:
+        return read_frame(node['frame'], node['date_index'])
+    return node['value']
+
+
+def _write_table(frame: pd.DataFrame, path: str):
+    if CACHE_FORMAT == 'parquet':
+        frame.to_parquet(path)
+    else:
+        frame.to_csv(path)
+
+
+def _read_table(path: str, date_index: bool = True) -> pd.DataFrame:
+    if CACHE_FORMAT == 'parquet':
+        return pd.read_parquet(path)
+    return pd.read_csv(path, index_col=0, parse_dates=date_index)
+
+
+class SnapshotStore:
+    """
+    Directory of analysis snapshots, one subdirectory per snapshot key.
+
+    Each snapshot holds meta.json (format version, key inputs, creation time), the
+    report text, the summary and YTD tables, every time series of returns_data and
+    the figure inputs (one long table), and any figure JSON already serialized.
+    Only the most recent MAX_SNAPSHOTS are kept.
+    """
+
+    META_FILE = 'meta.json'
+    MAX_SNAPSHOTS = 5
+
+    def __init__(self, snapshot_dir: str = None):
+        self.snapshot_dir = snapshot_dir or DEFAULT_SNAPSHOT_DIR
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    def _path(self, key: str, file_name: str = '') -> str:
+        return os.path.join(self.snapshot_dir, key, file_name)
+
+    def save(self, key: str, transactions_file: str, price_version: str, report_text: str,
+             summary_df: pd.DataFrame, ytd_df: pd.DataFrame, returns_data: Dict,
+             figure_inputs: Dict = None, figure_json: Dict[str, str] = None) -> str:
+        """
+        Write a snapshot (replacing one with the same key) and prune old snapshots.
+
+        Args:
+            key: snapshot_key() of the inputs the results were computed from
+            transactions_file: Transactions file the results belong to
+            price_version: Price data version the results were computed with
+            figure_inputs: LazyFigures.inputs, so figures can be rebuilt after loading
+            figure_json: Serialized figures by name (e.g. figure_payload_json output)
+
+        Returns:
+            Snapshot directory
+        """
+        series, frames = [], []
+        data = {'returns_data': returns_data, 'figure_inputs': figure_inputs or {},
+                'summary_df': summary_df, 'ytd_df': ytd_df}
+        skeleton = _flatten(data, series, frames)
+
+        # Write into a temporary directory and swap it in so readers never see a partial snapshot
+        tmp_dir = self._path(key + '.tmp')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        long_table = pd.concat(
+            [pd.DataFrame({'series': i, 'date': s.index, 'value': s.to_numpy(dtype=float)})
+             for i, s in enumerate(series)],
+            ignore_index=True
+        ) if series else pd.DataFrame({'series': [], 'date': pd.DatetimeIndex([]), 'value': []})
+        _write_table(long_table, os.path.join(tmp_dir, f'series.{CACHE_FORMAT}'))
+        for i, frame in enumerate(frames):
+            _write_table(frame, os.path.join(tmp_dir, f'frame_{i}.{CACHE_FORMAT}'))
+        with open(os.path.join(tmp_dir, 'report.txt'), 'w') as f:
+            f.write(report_text)
+        with open(os.path.join(tmp_dir, 'figures.json'), 'w') as f:
+            json.dump(figure_json or {}, f)
+        meta = {
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'key': key,
+            'transactions_file': os.path.abspath(transactions_file),
+            'price_version': price_version,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'cache_format': CACHE_FORMAT,
+            'series_count': len(series),
+            'skeleton': skeleton
+        }
+        with open(os.path.join(tmp_dir, self.META_FILE), 'w') as f:
+            json.dump(meta, f, default=str)
+
+        final_dir = self._path(key)
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(tmp_dir, final_dir)
+        self.prune()
+        return final_dir
+
+    def _read_meta(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(key, self.META_FILE), 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('format_version') != SNAPSHOT_FORMAT_VERSION or meta.get('cache_format') != CACHE_FORMAT:
+            return None
+        return meta
+
+    def snapshots(self) -> List[Dict]:
+        """Metadata of every readable snapshot, newest first"""
+        metas = []
+        for key in os.listdir(self.snapshot_dir):
+            if key.endswith('.tmp'):
+                continue
+            meta = self._read_meta(key)
+            if meta is not None:
+                metas.append(meta)
+        return sorted(metas, key=lambda m: m['created'], reverse=True)
+
+    def latest(self, transactions_file: str) -> Optional[Dict]:
+        """Metadata of the newest snapshot for a transactions file, or None"""
+        path = os.path.abspath(transactions_file)
+        for meta in self.snapshots():
+            if meta['transactions_file'] == path:
+                return meta
+        return None
+
+    def load(self, key: str) -> Optional[Dict]:
+        """
+        Load a snapshot.
+
+        Returns:
+            None if missing or unreadable, otherwise a dict with 'meta', 'report_text',
+            'summary_df', 'ytd_df', 'returns_data', 'figure_inputs' and 'figure_json'
+        """
+        meta = self._read_meta(key)
+        if meta is None:
+            return None
+        try:
+            long_table = _read_table(self._path(key, f'series.{CACHE_FORMAT}'), date_index=False)
+            grouped = dict(tuple(long_table.groupby('series', sort=True)))
+            empty = pd.DataFrame({'date': pd.DatetimeIndex([]), 'value': []})
+            series = []
+            for i in range(meta['series_count']):
+                part = grouped.get(i, empty)
+                series.append(pd.Series(part['value'].to_numpy(dtype=float), index=pd.DatetimeIndex(part['date'])))
+            
+            def read_frame(i, date_index):
+                return _read_table(self._path(key, f'frame_{i}.{CACHE_FORMAT}'), date_index)
+            
+            data = _unflatten(meta['skeleton'], series, read_frame)
+            with open(self._path(key, 'report.txt'), 'r') as f:
+                report_text = f.read()
+            with open(self._path(key, 'figures.json'), 'r') as f:
+                figure_json = json.load(f)
+        except (OSError, ValueError, KeyError):
+            return None
+        return {
+            'meta': meta,
+            'report_text': report_text,
+            'summary_df': data['summary_df'],
+            'ytd_df': data['ytd_df'],
+            'returns_data': data['returns_data'],
+            'figure_inputs': data['figure_inputs'],
+            'figure_json': figure_json
+        }
+
+    def prune(self):
+        """Delete all but the MAX_SNAPSHOTS newest snapshots"""
+        for meta in self.snapshots()[self.MAX_SNAPSHOTS:]:
+            shutil.rmtree(self._path(meta['key']), ignore_errors=True)
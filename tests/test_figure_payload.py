@@ -0,0 +1,80 @@
+"""Tests for the compact figure serialization (figure_payload.py)"""
+
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from figure_payload import compact_figure, figure_payload, figure_payload_json, figure_tail
+
+
+def decode(values):
+    """Array of a serialized trace attribute: a {dtype, bdata} typed array or a plain list"""
+    if isinstance(values, dict) and 'bdata' in values:
+        return np.frombuffer(base64.b64decode(values['bdata']), dtype=np.dtype(values['dtype']))
+    return np.asarray(values)
+
+
+def epoch_ms(dates) -> np.ndarray:
+    return (pd.DatetimeIndex(dates) - pd.Timestamp('1970-01-01')) // pd.Timedelta(milliseconds=1)
+
+
+@pytest.fixture
+def figure():
+    dates = pd.bdate_range('2024-01-01', periods=300)
+    rng = np.random.default_rng(0)
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=dates, y=100 + np.cumsum(rng.normal(0, 1, len(dates))), name='Portfolio'))
+    fig.add_trace(go.Scatter(x=dates, y=1e6 + np.cumsum(rng.normal(0, 1e3, len(dates))), name='Value'))
+    fig.add_trace(go.Scatter(x=list(dates.strftime('%Y-%m-%d')), y=np.arange(len(dates)), name='Strings'))
+    fig.add_trace(go.Bar(x=['ETF', 'Stocks'], y=[1.5, 2.25], name='Bars'))
+    return fig
+
+
+def test_compact_figure_round_trip(figure):
+    data = json.loads(compact_figure(figure).to_json())
+    layout = data['layout']
+
+    for trace, original in zip(data['data'][:3], figure.data[:3]):
+        np.testing.assert_array_equal(decode(trace['x']), epoch_ms(original.x))
+        np.testing.assert_allclose(decode(trace['y']), original.y, rtol=1e-6)
+    assert decode(data['data'][0]['y']).dtype == np.float32
+    # Too large for float32 to keep 2 decimals
+    assert decode(data['data'][1]['y']).dtype == np.float64
+    assert layout['xaxis']['type'] == 'date'
+    assert list(decode(data['data'][3]['x'])) == ['ETF', 'Stocks']
+
+
+def test_figure_payload_round_trip(figure):
+    payload = json.loads(figure_payload_json(figure))
+    arrays = {key: decode(spec) for key, spec in payload['arrays'].items()}
+
+    # The three date traces share one x array
+    assert len(arrays) == 1
+    for trace, original in zip(payload['data'][:3], figure.data[:3]):
+        np.testing.assert_array_equal(arrays[trace['x']['ref']], epoch_ms(original.x))
+        np.testing.assert_allclose(decode(trace['y']), original.y, rtol=1e-6)
+        assert trace['name'] == original.name
+    assert payload['data'][3]['x'] == ['ETF', 'Stocks']
+    assert payload['layout']['xaxis']['type'] == 'date'
+    assert figure_payload(figure)['arrays'] == payload['arrays']
+
+
+def test_figure_tail(figure):
+    figure = go.Figure(data=figure.data[:3])
+    dates = pd.bdate_range('2024-01-01', periods=305)
+    newer = go.Figure(figure)
+    newer.data[0].update(x=dates, y=np.concatenate([figure.data[0].y[:-1], [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]]))
+    newer.data[0].update(name='Portfolio (+1%)')
+
+    tail = figure_tail(figure, newer)
+
+    assert tail['indices'] == [0]
+    assert tail['keep'] == [299]
+    np.testing.assert_array_equal(tail['x'][0], epoch_ms(dates[299:]))
+    assert tail['y'][0] == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+    assert tail['names'] == {0: 'Portfolio (+1%)'}
+    assert figure_tail(figure, go.Figure(figure).update_layout(title='Other')) is None
@@ -0,0 +1,139 @@
+"""Tests for the holdings engine (holdings.py)"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from holdings import HoldingsCache, PortfolioHoldings, build_units
+
+SECTOR_ETFS = {'Technology': 'VGT', 'Healthcare': 'VHT'}
+SECTOR_MAP = {'Technology': 'Technology', 'Healthcare': 'Healthcare'}
+
+
+@pytest.fixture
+def px():
+    dates = pd.bdate_range('2024-01-01', periods=120, name='Date')
+    rng = np.random.default_rng(0)
+    tickers = ['AAPL', 'BND', 'JNJ', 'MSFT', 'VGT', 'VHT']
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), len(tickers))), axis=0))
+    prices[:20, 2] = np.nan  # JNJ starts trading later
+    return pd.DataFrame(prices, index=dates, columns=tickers).ffill()
+
+
+@pytest.fixture
+def transactions():
+    return pd.DataFrame([
+        ('Technology', 'VGT', '2024-01-02', 0.0, 10000.0),
+        ('Healthcare', 'VHT', '2024-01-02', 0.0, 8000.0),
+        ('Fixed_Income', 'BND', '2024-01-06', 0.0, 2000.0),
+        ('Technology', 'AAPL', '2024-02-05', 5.0, 600.0),
+        ('Healthcare', 'JNJ', '2024-02-20', 0.0, 900.0),
+        ('Technology', 'MSFT', '2024-03-11', 0.0, 1200.0),
+        ('Technology', 'AAPL', '2024-04-15', 0.0, 300.0),
+    ], columns=['sector', 'ticker', 'invest_date', 'shares', 'amount_invested'])
+
+
+def baseline_units(transactions, px, sector_etfs, sector_map):
+    """The original row-by-row units loop that build_units replaced"""
+    units = pd.DataFrame(0.0, index=px.index, columns=px.columns)
+    transaction_dates = {}
+    for _, row in transactions.sort_values('invest_date', kind='stable').iterrows():
+        dt = px.index[px.index.get_indexer([pd.Timestamp(row['invest_date'])], method='nearest')[0]]
+        ticker, sector, usd = row['ticker'], row['sector'], row['amount_invested']
+        shares = row.get('shares', 0)
+        if sector == 'Cash' or ticker == 'CASH' or pd.isna(usd) or usd <= 0 or ticker not in px.columns:
+            continue
+        if ticker in sector_etfs.values() or sector == 'Fixed_Income':
+            units.loc[dt:, ticker] += shares if shares > 0 else usd / px.loc[dt, ticker]
+            continue
+        sector_key = sector_map.get(sector)
+        if not sector_key:
+            if sector.replace('_', ' ') in sector_etfs:
+                sector_key = sector.replace('_', ' ')
+            else:
+                sector_key = next((k for k in sector_etfs if k.startswith(sector.split('_')[0])), None)
+        if not sector_key or sector_key not in sector_etfs or sector_etfs[sector_key] not in px.columns:
+            continue
+        etf = sector_etfs[sector_key]
+        etf_price = px.loc[dt, etf]
+        transaction_dates.setdefault(sector_key, {}).setdefault(
+            pd.Timestamp(row['invest_date']).normalize(), []).append(ticker)
+        if shares > 0:
+            units.loc[dt:, ticker] += shares
+        else:
+            stock_price = px.loc[dt, ticker]
+            if pd.isna(stock_price) or stock_price <= 0:
+                continue
+            units.loc[dt:, ticker] += usd / stock_price
+        if not (pd.isna(etf_price) or etf_price <= 0):
+            units.loc[dt:, etf] -= usd / etf_price
+    return units, transaction_dates
+
+
+def assert_same_holdings(holdings, expected):
+    pd.testing.assert_frame_equal(holdings.units, expected.units)
+    pd.testing.assert_frame_equal(holdings.holdings_value, expected.holdings_value)
+    pd.testing.assert_frame_equal(holdings.group_values, expected.group_values)
+    pd.testing.assert_series_equal(holdings.invested_value, expected.invested_value)
+    assert holdings.transaction_dates == expected.transaction_dates
+
+
+def test_append_matches_full_build(px, transactions):
+    cache = HoldingsCache()
+    cache.get(transactions.iloc[:4], px, SECTOR_ETFS, SECTOR_MAP)
+    holdings = cache.get(transactions, px, SECTOR_ETFS, SECTOR_MAP)
+
+    assert cache.last_update == 'incremental'
+    assert_same_holdings(holdings, PortfolioHoldings.build(transactions, px, SECTOR_ETFS, SECTOR_MAP))
+
+
+def test_new_trading_days_match_full_build(px, transactions):
+    cache = HoldingsCache()
+    cache.get(transactions.iloc[:5], px.iloc[:70], SECTOR_ETFS, SECTOR_MAP)
+    holdings = cache.get(transactions, px, SECTOR_ETFS, SECTOR_MAP)
+
+    assert cache.last_update == 'incremental'
+    assert_same_holdings(holdings, PortfolioHoldings.build(transactions, px, SECTOR_ETFS, SECTOR_MAP))
+
+
+def test_changed_prices_rebuild(px, transactions):
+    cache = HoldingsCache()
+    cache.get(transactions.iloc[:5], px.iloc[:70], SECTOR_ETFS, SECTOR_MAP)
+    adjusted = px.copy()
+    adjusted.iloc[:, 0] /= 10  # e.g. history re-adjusted after a split
+    holdings = cache.get(transactions, adjusted, SECTOR_ETFS, SECTOR_MAP)
+
+    assert cache.last_update == 'full'
+    assert_same_holdings(holdings, PortfolioHoldings.build(transactions, adjusted, SECTOR_ETFS, SECTOR_MAP))
+
+
+def test_transaction_after_last_trading_day_rebuilds(px, transactions):
+    # Placed on the last of the first 40 trading days, but on its own day once more days exist
+    early = transactions.iloc[:4].copy()
+    early.loc[3, 'invest_date'] = '2024-03-29'
+    holdings = PortfolioHoldings.build(early, px.iloc[:40], SECTOR_ETFS, SECTOR_MAP)
+
+    assert not holdings.extends(early, px)
+    assert holdings.extends(early, px.iloc[:40])
+
+
+def test_build_units_matches_baseline_loop(px):
+    rng = np.random.default_rng(1)
+    tickers = ['AAPL', 'BND', 'JNJ', 'MSFT', 'VGT', 'VHT', 'CASH', 'UNKNOWN']
+    sectors = {'AAPL': 'Technology', 'MSFT': 'Technology_Software', 'JNJ': 'Healthcare', 'VGT': 'Technology',
+               'VHT': 'Healthcare', 'BND': 'Fixed_Income', 'CASH': 'Cash', 'UNKNOWN': 'Technology'}
+    picked = rng.choice(tickers, 200)
+    transactions = pd.DataFrame({
+        'sector': [sectors[t] for t in picked],
+        'ticker': picked,
+        # Includes weekends, dates before JNJ trades and dates after the last price
+        'invest_date': pd.Timestamp('2023-12-25') + pd.to_timedelta(rng.integers(0, 190, 200), unit='D'),
+        'shares': np.where(rng.random(200) < 0.3, rng.integers(1, 10, 200), 0).astype(float),
+        'amount_invested': np.where(rng.random(200) < 0.05, np.nan, rng.uniform(-50, 2000, 200)),
+    })
+
+    units, transaction_dates = build_units(transactions, px, SECTOR_ETFS, SECTOR_MAP)
+    expected_units, expected_dates = baseline_units(transactions, px, SECTOR_ETFS, SECTOR_MAP)
+
+    pd.testing.assert_frame_equal(units, expected_units, rtol=1e-12, atol=1e-9)
+    assert transaction_dates == expected_dates
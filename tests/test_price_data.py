@@ -0,0 +1,66 @@
+"""Tests for the price cache (price_data.py)"""
+
+import pandas as pd
+
+from analysis_core import load_prices
+from price_data import NO_DATA_ERROR, PriceCache, PriceProvider
+
+START, END = pd.Timestamp('2025-01-06'), pd.Timestamp('2025-02-03')
+
+
+class FakeProvider(PriceProvider):
+    """Prices for every ticker but those in missing, which come back without data; records each request"""
+
+    name = 'fake'
+
+    def __init__(self, missing=(), down=False):
+        self.missing = set(missing)
+        self.down = down
+        self.requested = []
+
+    def fetch(self, tickers, start, end):
+        self.requested.extend(tickers)
+        dates = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1))
+        ok = [] if self.down else sorted(t for t in tickers if t not in self.missing)
+        self.last_status = {t: {'status': 'ok'} if t in ok else {'status': 'failed', 'error': NO_DATA_ERROR}
+                            for t in tickers}
+        return pd.DataFrame({t: range(1, len(dates) + 1) for t in ok}, index=dates, dtype=float)
+
+    def data_version(self):
+        return 'fake'
+
+
+def test_missing_ticker_is_not_requested_again(tmp_path):
+    provider = FakeProvider(missing=['GONE'])
+    cache = PriceCache(provider, str(tmp_path))
+    cache.fetch_ranges({(START, END): ['AAA', 'GONE']})
+    assert cache.last_status['GONE']['status'] == 'failed'
+    assert cache.failed_until('GONE') > pd.Timestamp.now()
+
+    provider.requested.clear()
+    cache = PriceCache(provider, str(tmp_path))
+    cache.fetch_ranges({(START, END): ['AAA', 'GONE']})
+    assert provider.requested == []
+    assert cache.last_status['GONE']['status'] == 'failed'
+    assert not cache.missing_requests({(START, END): ['AAA', 'GONE']})
+
+
+def test_failures_are_not_recorded_when_provider_is_down(tmp_path):
+    cache = PriceCache(FakeProvider(down=True), str(tmp_path))
+    cache.fetch_ranges({(START, END): ['AAA', 'GONE']})
+    assert cache.failed_until('AAA') is None and cache.failed_until('GONE') is None
+    assert cache.missing_requests({(START, END): ['AAA', 'GONE']})
+
+
+def test_price_matrix_answers_despite_missing_ticker(tmp_path, monkeypatch):
+    provider = FakeProvider(missing=['GONE'])
+    first = load_prices(['AAA', 'GONE'], START, END, cache_dir=str(tmp_path), price_provider=provider)
+
+    def read_cache(self, requests):
+        raise AssertionError("prices read from the cache files instead of the price matrix")
+
+    monkeypatch.setattr(PriceCache, 'fetch_ranges', read_cache)
+    px, status = load_prices(['AAA', 'GONE'], START, END, cache_dir=str(tmp_path),
+                             price_provider=provider, return_status=True)
+    assert status['AAA']['status'] == 'cached' and status['GONE']['status'] == 'failed'
+    pd.testing.assert_frame_equal(px, first, check_freq=False)
@@ -0,0 +1,56 @@
+"""Tests for the shared reference pack (reference_data.py)"""
+
+import pandas as pd
+import pytest
+
+from analysis_core import load_prices
+from price_data import PriceCache, PriceProvider
+from reference_data import ReferencePack
+
+TICKERS = ['^GSPC', 'XLK']
+START, END = pd.Timestamp('2025-01-06'), pd.Timestamp('2025-02-03')
+
+
+class FakeProvider(PriceProvider):
+    """Prices up to last_date for the tickers not in failing, which fail to download"""
+
+    name = 'fake'
+
+    def __init__(self, last_date, failing=()):
+        self.last_date = pd.Timestamp(last_date)
+        self.failing = set(failing)
+
+    def fetch(self, tickers, start, end):
+        dates = pd.bdate_range(start, min(pd.Timestamp(end) - pd.Timedelta(days=1), self.last_date))
+        ok = sorted(t for t in tickers if t not in self.failing)
+        self.last_status = {t: {'status': 'ok'} for t in ok}
+        self.last_status.update({t: {'status': 'failed', 'error': 'connection failed'}
+                                 for t in tickers if t in self.failing})
+        return pd.DataFrame({t: range(1, len(dates) + 1) for t in ok}, index=dates, dtype=float)
+
+
+def test_refresh_covers_requested_range(tmp_path):
+    pack = ReferencePack(TICKERS, str(tmp_path / 'reference'))
+    meta, status = pack.refresh(FakeProvider(END), START, END)
+    assert meta['built'] == pd.Timestamp.now().strftime('%Y-%m-%d')
+    assert meta['end'] == '2025-02-01' and meta['fetched_end'] == '2025-02-03'
+    assert not pack.needs_refresh(pack.current(), START, END)
+
+
+def test_failed_refresh_is_not_current(tmp_path):
+    cache = PriceCache(FakeProvider('2025-01-17'), str(tmp_path / 'cache'))
+    cache.fetch_ranges({(START, pd.Timestamp('2025-01-18')): TICKERS})
+    # Provider down: the cache falls back to the prices it holds for XLK
+    cache.provider = FakeProvider(END, failing=['XLK'])
+    pack = ReferencePack(TICKERS, str(tmp_path / 'reference'))
+    meta, status = pack.refresh(cache, START, END)
+    assert status['XLK']['status'] == 'failed'
+    assert meta['built'] is None
+    assert meta['end'] == '2025-02-01'
+    assert pack.needs_refresh(pack.current(), START, END)
+
+
+def test_offline_first_run_reports_no_data(tmp_path):
+    cache = PriceCache(FakeProvider(END, failing=TICKERS), str(tmp_path / 'cache'))
+    with pytest.raises(RuntimeError, match='No price data downloaded'):
+        load_prices(TICKERS, START, END, price_provider=cache)
@@ -0,0 +1,118 @@
+"""Tests for the transactions ledger writers and the SQLite store (transactions_store.py)"""
+
+import pandas as pd
+import pytest
+
+from transactions_store import (SQLiteTransactionStore, TRANSACTION_COLUMNS, append_transactions, read_header,
+                                rewrite_transactions)
+
+LEDGER_CSV = """sector,ticker,invest_date,shares,purchase_price,amount_invested
+Technology,VGT,2024-01-02,,,10000.0
+Technology,AAPL,2024-10-17,6.0,232.23,1393.38
+Healthcare,JNJ,2024-11-18,,,900.5
+Fixed_Income,BND,2025-01-06,10.0,72.1,721.0
+"""
+
+
+@pytest.fixture
+def ledger_csv(tmp_path):
+    path = tmp_path / 'transactions.csv'
+    path.write_text(LEDGER_CSV)
+    return str(path)
+
+
+def test_sqlite_round_trip(ledger_csv, tmp_path):
+    store = SQLiteTransactionStore(str(tmp_path / 'ledger.db'))
+    assert store.import_csv(ledger_csv) == 4
+    exported = str(tmp_path / 'exported.csv')
+    assert store.export_csv(exported) == 4
+
+    with open(exported) as f:
+        assert f.read() == LEDGER_CSV
+    pd.testing.assert_frame_equal(store.read(), pd.read_csv(ledger_csv, parse_dates=['invest_date']))
+
+
+def test_sqlite_filters(ledger_csv, tmp_path):
+    store = SQLiteTransactionStore(str(tmp_path / 'ledger.db'))
+    store.import_csv(ledger_csv)
+
+    assert store.read(tickers=['AAPL', 'BND'])['ticker'].tolist() == ['AAPL', 'BND']
+    assert store.read(sectors=['Technology'])['ticker'].tolist() == ['VGT', 'AAPL']
+    assert store.read(start='2024-10-17', end='2025-01-06')['ticker'].tolist() == ['AAPL', 'JNJ']
+
+
+def test_digest_is_stable(ledger_csv, tmp_path):
+    store = SQLiteTransactionStore(str(tmp_path / 'a.db'))
+    store.import_csv(ledger_csv)
+    digest = store.digest()
+
+    # Same contents in another database, and read through another store object
+    other = SQLiteTransactionStore(str(tmp_path / 'b.db'))
+    other.import_csv(ledger_csv)
+    assert other.digest() == digest
+    assert SQLiteTransactionStore(str(tmp_path / 'a.db'), create=False).digest() == digest
+
+    store.append([{'sector': 'Energy', 'ticker': 'VDE', 'invest_date': '2025-02-03', 'amount_invested': 50.0}])
+    assert store.digest() != digest
+    store.replace(other.rows())
+    assert store.digest() == digest
+
+
+def test_append_keeps_existing_columns(tmp_path):
+    path = str(tmp_path / 'short.csv')
+    with open(path, 'w') as f:
+        f.write("sector,ticker,invest_date,amount_invested\nTechnology,VGT,2024-01-02,100.0")
+
+    append_transactions([
+        {'sector': 'Technology', 'ticker': 'AAPL', 'invest_date': pd.Timestamp('2024-03-01'),
+         'amount_invested': 50.0, 'shares': None},
+        {'sector': 'Healthcare', 'ticker': 'VHT', 'invest_date': '2024-03-04', 'amount_invested': 25.0},
+    ], path)
+
+    with open(path) as f:
+        assert f.read() == ("sector,ticker,invest_date,amount_invested\n"
+                            "Technology,VGT,2024-01-02,100.0\n"
+                            "Technology,AAPL,2024-03-01,50.0\n"
+                            "Healthcare,VHT,2024-03-04,25.0\n")
+
+
+def test_append_rejects_values_for_missing_columns(tmp_path):
+    path = str(tmp_path / 'short.csv')
+    with open(path, 'w') as f:
+        f.write("sector,ticker,invest_date,amount_invested\nTechnology,VGT,2024-01-02,100.0\n")
+
+    with pytest.raises(ValueError):
+        append_transactions([{'sector': 'Technology', 'ticker': 'AAPL', 'invest_date': '2024-03-01',
+                              'amount_invested': 50.0, 'shares': 2.0}], path)
+    with open(path) as f:
+        assert f.read() == "sector,ticker,invest_date,amount_invested\nTechnology,VGT,2024-01-02,100.0\n"
+
+
+def test_append_creates_ledger(tmp_path):
+    path = str(tmp_path / 'data' / 'new.csv')
+    append_transactions([{'sector': 'Technology', 'ticker': 'VGT', 'invest_date': '2024-01-02',
+                          'amount_invested': 100.0}], path)
+    assert read_header(path) == TRANSACTION_COLUMNS
+
+
+def test_rewrite_keeps_dataframe_columns(tmp_path):
+    path = str(tmp_path / 'short.csv')
+    with open(path, 'w') as f:
+        f.write("sector,ticker,invest_date,amount_invested\n"
+                "Technology,VGT,2024-01-02,100.0\nTechnology,AAPL,2024-03-01,50.0\n")
+
+    df = pd.read_csv(path, parse_dates=['invest_date'])
+    rewrite_transactions(df[df['ticker'] != 'AAPL'], path)
+
+    with open(path) as f:
+        assert f.read() == "sector,ticker,invest_date,amount_invested\nTechnology,VGT,2024-01-02,100.0\n"
+    assert not (tmp_path / 'short.csv.tmp').exists()
+
+
+def test_rewrite_dicts_fill_missing_columns(tmp_path):
+    path = str(tmp_path / 'ledger.csv')
+    rewrite_transactions([{'sector': 'Technology', 'ticker': 'VGT', 'invest_date': '2024-01-02',
+                           'amount_invested': 100.0}], path)
+
+    with open(path) as f:
+        assert f.read() == ','.join(TRANSACTION_COLUMNS) + "\nTechnology,VGT,2024-01-02,,,100.0\n"
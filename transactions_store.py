@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+SMIC Portfolio Analysis Transactions Store
+Durable writes to the transactions CSV: appends touch only the end of the file,
+full rewrites go through a temporary file that atomically replaces the ledger.
+Ledgers can also be kept in an indexed SQLite database (.db/.sqlite files)
+"""
+
+import csv
+import hashlib
+import io
+import math
+import os
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_TRANSACTIONS_FILE = 'data/transactions.csv'
+
+# Column order of new ledgers (existing files keep their own header order)
+TRANSACTION_COLUMNS = ['sector', 'ticker', 'invest_date', 'shares', 'purchase_price', 'amount_invested']
+
+# Ledger paths with these suffixes are SQLite databases (see SQLiteTransactionStore)
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+
+def is_sqlite_ledger(path: str) -> bool:
+    """Whether a ledger path refers to a SQLite database rather than a CSV"""
+    return str(path).lower().endswith(SQLITE_SUFFIXES)
+
+
+def _format_value(value) -> str:
+    """CSV text of one field: blanks for missing values, ISO dates"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, datetime):
+        if (value.hour, value.minute, value.second, value.microsecond) == (0, 0, 0, 0):
+            return value.strftime('%Y-%m-%d')
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def _fsync_dir(path: str):
+    """Flush a directory entry change (new or replaced file) to disk where the OS supports it"""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        # Directories cannot be opened on Windows; the rename itself is durable there
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def read_header(path: str = DEFAULT_TRANSACTIONS_FILE) -> Optional[List[str]]:
+    """Column names of an existing ledger (first line only), or None if it is missing or empty"""
+    try:
+        with open(path, 'r', newline='') as f:
+            first_line = f.readline()
+    except FileNotFoundError:
+        return None
+    if not first_line.strip():
+        return None
+    return next(csv.reader([first_line]))
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) in (b'\n', b'\r')
+
+
+def _csv_text(rows: Iterable[Dict], columns: List[str], header: bool) -> str:
+    """Rows as CSV text in column order; raises ValueError for values of unknown columns"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if header:
+        writer.writerow(columns)
+    known = set(columns)
+    for row in rows:
+        unknown = [key for key, value in row.items() if key not in known and _format_value(value) != '']
+        if unknown:
+            raise ValueError(f"Transaction has columns not in the ledger: {unknown}")
+        writer.writerow([_format_value(row.get(column)) for column in columns])
+    return buffer.getvalue()
+
+
+def append_transactions(rows: Iterable[Dict], path: str = DEFAULT_TRANSACTIONS_FILE) -> int:
+    """
+    Append transactions to the ledger in a single write.
+
+    Only the header line and the last byte of an existing file are read, so the
+    cost does not grow with the ledger. The write is flushed and fsynced before
+    returning; a crash can at worst leave a partial last line, never damage
+    earlier rows. A missing or empty file is created with TRANSACTION_COLUMNS.
+
+    Args:
+        rows: Transactions as dicts keyed by column name (missing columns are left blank)
+        path: Transactions CSV (or SQLite ledger, see SQLiteTransactionStore.append)
+
+    Returns:
+        Number of rows appended
+    """
+    if is_sqlite_ledger(path):
+        return SQLiteTransactionStore(path).append(rows)
+    rows = list(rows)
+    if not rows:
+        return 0
+    header = read_header(path)
+    columns = header or TRANSACTION_COLUMNS
+    text = _csv_text(rows, columns, header=header is None)
+
+    created = not os.path.exists(path)
+    if created:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    elif header is not None and not _ends_with_newline(path):
+        # Last row written without a line break (e.g. by an editor)
+        text = '\n' + text
+    mode = 'ab' if header is not None else 'wb'
+    with open(path, mode) as f:
+        f.write(text.encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+    if created:
+        _fsync_dir(path)
+    return len(rows)
+
+
+def append_transaction(row: Dict, path: str = DEFAULT_TRANSACTIONS_FILE):
+    """Append one transaction (see append_transactions)"""
+    append_transactions([row], path)
+
+
+def rewrite_transactions(rows, path: str = DEFAULT_TRANSACTIONS_FILE, columns: List[str] = None):
+    """
+    Replace the whole ledger atomically (for edits and deletions).
+
+    The new contents are written and fsynced to a temporary file in the same
+    directory, which then replaces the ledger with os.replace, so readers see
+    either the old or the new file in full.
+
+    Args:
+        rows: Transactions as dicts, or a DataFrame with the ledger columns
+        path: Transactions CSV (or SQLite ledger, see SQLiteTransactionStore.replace)
+        columns: Column order (defaults to the DataFrame's columns or TRANSACTION_COLUMNS)
+    """
+    if hasattr(rows, 'to_dict'):
+        columns = columns or [str(c) for c in rows.columns]
+        rows = rows.to_dict('records')
+    if is_sqlite_ledger(path):
+        SQLiteTransactionStore(path).replace(rows)
+        return
+    text = _csv_text(rows, columns or TRANSACTION_COLUMNS, header=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(text.encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path)
+
+
+class SQLiteTransactionStore:
+    """
+    Transaction ledger in a SQLite database.
+
+    Rows keep the CSV schema (sector, ticker, invest_date, shares, purchase_price,
+    amount_invested) plus an autoincrement id that preserves ledger order. ticker,
+    sector and invest_date are indexed, and the database runs in WAL mode so the
+    analysis can read while the GUI form appends. Every call uses its own
+    connection, so a store can be shared between threads.
+    """
+
+    NUMERIC_COLUMNS = ('shares', 'purchase_price', 'amount_invested')
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sector TEXT NOT NULL,
+            ticker TEXT NOT NULL,
+            invest_date TEXT NOT NULL,
+            shares REAL,
+            purchase_price REAL,
+            amount_invested REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_transactions_ticker ON transactions (ticker);
+        CREATE INDEX IF NOT EXISTS idx_transactions_sector ON transactions (sector);
+        CREATE INDEX IF NOT EXISTS idx_transactions_invest_date ON transactions (invest_date);
+    """
+
+    def __init__(self, path: str, create: bool = True):
+        """
+        Args:
+            path: Database file
+            create: Create the database if missing (otherwise raise FileNotFoundError)
+        """
+        self.path = path
+        if not os.path.exists(path):
+            if not create:
+                raise FileNotFoundError(f"Transaction database not found: {path}")
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            # WAL is a property of the database file; it persists once set
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        # Durable at checkpoints and safe against corruption in WAL mode, without an fsync per commit
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _row_values(self, row: Dict) -> tuple:
+        """SQL parameters for one transaction dict (blanks become NULL)"""
+        unknown = [key for key, value in row.items()
+                   if key not in TRANSACTION_COLUMNS and _format_value(value) != '']
+        if unknown:
+            raise ValueError(f"Transaction has columns not in the ledger: {unknown}")
+        values = []
+        for column in TRANSACTION_COLUMNS:
+            text = _format_value(row.get(column))
+            if text == '':
+                values.append(None)
+            elif column in self.NUMERIC_COLUMNS:
+                values.append(float(text))
+            else:
+                values.append(text)
+        return tuple(values)
+
+    def _insert(self, conn: sqlite3.Connection, rows: Iterable[Dict]) -> int:
+        placeholders = ', '.join('?' * len(TRANSACTION_COLUMNS))
+        cursor = conn.executemany(
+            f"INSERT INTO transactions ({', '.join(TRANSACTION_COLUMNS)}) VALUES ({placeholders})",
+            (self._row_values(row) for row in rows))
+        return cursor.rowcount
+
+    def append(self, rows: Iterable[Dict]) -> int:
+        """Insert transactions (dicts keyed by column name) in one database transaction; returns the count"""
+        with closing(self._connect()) as conn, conn:
+            return self._insert(conn, rows)
+
+    def replace(self, rows: Iterable[Dict]) -> int:
+        """Replace all transactions in one database transaction; returns the new count"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute('DELETE FROM transactions')
+            return self._insert(conn, rows)
+
+    def count(self) -> int:
+        """Number of transactions"""
+        with closing(self._connect()) as conn:
+            return conn.execute('SELECT COUNT(*) FROM transactions').fetchone()[0]
+
+    def read(self, tickers: List[str] = None, sectors: List[str] = None, start=None, end=None):
+        """
+        Transactions in ledger order as a DataFrame shaped like a read of the CSV.
+
+        Args:
+            tickers: Only these tickers
+            sectors: Only these sectors
+            start: Only transactions on or after this date
+            end: Only transactions before this date
+
+        Returns:
+            pd.DataFrame with TRANSACTION_COLUMNS, invest_date parsed as datetimes
+        """
+        import pandas as pd
+
+        clauses, params = [], []
+        for column, values in (('ticker', tickers), ('sector', sectors)):
+            if values is not None:
+                values = list(values)
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        if start is not None:
+            clauses.append('invest_date >= ?')
+            params.append(_format_value(pd.Timestamp(start)))
+        if end is not None:
+            clauses.append('invest_date < ?')
+            params.append(_format_value(pd.Timestamp(end)))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(TRANSACTION_COLUMNS)} FROM transactions{where} ORDER BY id", params).fetchall()
+        df = pd.DataFrame.from_records(rows, columns=TRANSACTION_COLUMNS)
+        df['invest_date'] = pd.to_datetime(df['invest_date'])
+        for column in self.NUMERIC_COLUMNS:
+            df[column] = df[column].astype(float)
+        return df
+
+    def rows(self) -> List[Dict]:
+        """All transactions in ledger order as dicts (None for blanks)"""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(f"SELECT {', '.join(TRANSACTION_COLUMNS)} FROM transactions ORDER BY id")
+            return [dict(zip(TRANSACTION_COLUMNS, row)) for row in cursor]
+
+    def digest(self) -> str:
+        """SHA-256 of the ledger contents (the database file alone misses changes still in the WAL)"""
+        digest = hashlib.sha256()
+        with closing(self._connect()) as conn:
+            for row in conn.execute(f"SELECT {', '.join(TRANSACTION_COLUMNS)} FROM transactions ORDER BY id"):
+                digest.update(repr(row).encode())
+        return digest.hexdigest()
+
+    def import_csv(self, csv_path: str, replace: bool = True) -> int:
+        """
+        Load a transactions CSV (streamed, no pandas) into the database.
+
+        Args:
+            csv_path: CSV with the ledger columns
+            replace: Replace the current transactions instead of appending
+
+        Returns:
+            Number of rows imported
+        """
+        with open(csv_path, 'r', newline='') as f:
+            reader = csv.DictReader(f)
+            with closing(self._connect()) as conn, conn:
+                if replace:
+                    conn.execute('DELETE FROM transactions')
+                return self._insert(conn, reader)
+
+    def export_csv(self, csv_path: str) -> int:
+        """Write the ledger to a CSV with TRANSACTION_COLUMNS (atomically); returns the row count"""
+        rows = self.rows()
+        rewrite_transactions(rows, csv_path, columns=TRANSACTION_COLUMNS)
+        return len(rows)